@@ -17,6 +17,7 @@ from backend.core.settings import settings
 from backend.db.apply_schema import Base
 
 import backend.models.sql_models
+from backend.db.online_migrations import CHECKPOINTS, session_timeouts
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -49,6 +50,22 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# full-text search objects created by DDL hooks, not mapped (see sql_models.py)
+SEARCH_OBJECTS = {
+    "search_vector",
+    "ix_projects_search_vector",
+    "ix_documents_file_name_trgm",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (
+        name in SEARCH_OBJECTS
+        or name == CHECKPOINTS.name
+        or (name or "").startswith(("projects_fts", "documents_fts"))
+    )
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -65,11 +82,16 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
+        if url.startswith("postgresql"):
+            for statement in session_timeouts():
+                context.execute(statement)
         context.run_migrations()
 
 
@@ -87,7 +109,23 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        if connection.dialect.name == "postgresql":
+            # fail fast instead of holding up traffic waiting for a lock
+            for statement in session_timeouts():
+                connection.exec_driver_sql(statement)
+            connection.commit()
+        elif connection.dialect.name == "sqlite":
+            # batch mode drops the original of every table it rebuilds; with
+            # foreign keys on, that would cascade to the rows referencing it
+            connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+            connection.commit()
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # a rerun after a timeout starts at the migration that failed
+            transaction_per_migration=True,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
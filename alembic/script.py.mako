@@ -1,4 +1,7 @@
-"""${message}
+<%
+    # `alembic -x online revision -m ...` starts from the large-table helpers
+    online = "online" in ((config.cmd_opts and config.cmd_opts.x) or [])
+%>"""${message}
 
 Revision ID: ${up_revision}
 Revises: ${down_revision | comma,n}
@@ -9,6 +12,9 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+% if online:
+from backend.db import online_migrations as online
+% endif
 ${imports if imports else ""}
 
 # revision identifiers, used by Alembic.
@@ -20,9 +26,22 @@ depends_on: Union[str, Sequence[str], None] = ${repr(depends_on)}
 
 def upgrade() -> None:
     """Upgrade schema."""
+% if online:
+    # Keep large tables writable; see backend/db/online_migrations.py.
+    # online.add_column("documents", sa.Column("checksum", sa.String(64)))
+    # online.backfill("documents", "checksum = ''", where="checksum IS NULL")
+    # online.set_not_null("documents", "checksum")
+    # online.create_index_concurrently(
+    #     "ix_documents_checksum", "documents", ["checksum"]
+    # )
+% endif
     ${upgrades if upgrades else "pass"}
 
 
 def downgrade() -> None:
     """Downgrade schema."""
+% if online:
+    # online.drop_index_concurrently("ix_documents_checksum", "documents")
+    # op.drop_column("documents", "checksum")
+% endif
     ${downgrades if downgrades else "pass"}
@@ -0,0 +1,35 @@
+"""add_user_tokens_valid_after
+
+Revision ID: b6f2d8a4c9e3
+Revises: a3e9c5d7b2f1
+Create Date: 2026-10-19 23:05:51.318247
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.db import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b6f2d8a4c9e3"
+down_revision: Union[str, None] = "a3e9c5d7b2f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nullable: a catalog-only change, no rewrite of the users table
+    online.add_column(
+        "users", sa.Column("tokens_valid_after", sa.DateTime(timezone=True))
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("tokens_valid_after")
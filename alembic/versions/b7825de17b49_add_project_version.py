@@ -0,0 +1,32 @@
+"""add_project_version
+
+Revision ID: b7825de17b49
+Revises: 228e2ff9f57e
+Create Date: 2026-10-19 09:12:44.318520
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7825de17b49"
+down_revision: Union[str, None] = "228e2ff9f57e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "projects",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("projects", "version")
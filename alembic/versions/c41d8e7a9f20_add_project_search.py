@@ -0,0 +1,90 @@
+"""add_project_search
+
+Revision ID: c41d8e7a9f20
+Revises: b7825de17b49
+Create Date: 2026-10-19 14:05:12.604211
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41d8e7a9f20"
+down_revision: Union[str, None] = "b7825de17b49"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER projects_fts_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO projects_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER projects_fts_delete AFTER DELETE ON projects BEGIN
+        INSERT INTO projects_fts(projects_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER projects_fts_update AFTER UPDATE OF name, description
+    ON projects BEGIN
+        INSERT INTO projects_fts(projects_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO projects_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # the stored generated column is filled by a table rewrite under an
+        # exclusive lock; the index is then built without blocking writes
+        op.execute(
+            """
+            ALTER TABLE projects ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(name, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED
+            """
+        )
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_projects_search_vector "
+                "ON projects USING GIN (search_vector)"
+            )
+    elif dialect == "sqlite":
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                name, description, content='projects', content_rowid='id',
+                tokenize='porter unicode61'
+            )
+            """
+        )
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(trigger)
+        op.execute("INSERT INTO projects_fts(projects_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_projects_search_vector")
+        op.drop_column("projects", "search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS projects_fts_{trigger}")
+        op.execute("DROP TABLE IF EXISTS projects_fts")
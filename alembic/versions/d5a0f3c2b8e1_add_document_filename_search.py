@@ -0,0 +1,79 @@
+"""add_document_filename_search
+
+Revision ID: d5a0f3c2b8e1
+Revises: c41d8e7a9f20
+Create Date: 2026-10-19 15:31:47.918034
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a0f3c2b8e1"
+down_revision: Union[str, None] = "c41d8e7a9f20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, file_name)
+        VALUES (new.id, new.file_name);
+    END
+    """,
+    """
+    CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, file_name)
+        VALUES ('delete', old.id, old.file_name);
+    END
+    """,
+    """
+    CREATE TRIGGER documents_fts_update AFTER UPDATE OF file_name
+    ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, file_name)
+        VALUES ('delete', old.id, old.file_name);
+        INSERT INTO documents_fts(rowid, file_name)
+        VALUES (new.id, new.file_name);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # needs a role allowed to create extensions; pg_trgm is trusted since 13
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_file_name_trgm "
+                "ON documents USING GIN (file_name gin_trgm_ops)"
+            )
+    elif dialect == "sqlite":
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                file_name, content='documents', content_rowid='id', tokenize='trigram'
+            )
+            """
+        )
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(trigger)
+        op.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_file_name_trgm")
+    elif dialect == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS documents_fts_{trigger}")
+        op.execute("DROP TABLE IF EXISTS documents_fts")
@@ -0,0 +1,76 @@
+"""add_change_log
+
+Revision ID: e8b2c6d4a1f3
+Revises: d5a0f3c2b8e1
+Create Date: 2026-10-19 17:02:26.511873
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8b2c6d4a1f3"
+down_revision: Union[str, None] = "d5a0f3c2b8e1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "change_log",
+        sa.Column(
+            "seq",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            nullable=False,
+        ),
+        sa.Column("txid", sa.BigInteger(), nullable=False),
+        sa.Column("project_id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=True),
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.BigInteger(), nullable=False),
+        sa.Column("op", sa.String(length=10), nullable=False),
+        sa.Column(
+            "changed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("seq"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index(
+        "ix_change_log_project_position",
+        "change_log",
+        ["project_id", "txid", "seq"],
+    )
+    op.create_index(
+        "ix_change_log_user_position", "change_log", ["user_id", "txid", "seq"]
+    )
+
+    # existing rows become the start of the feed, so a first sync returns all
+    # of them; txid 0 sorts them before every real transaction
+    op.execute(
+        "INSERT INTO change_log (txid, project_id, entity, entity_id, op) "
+        "SELECT 0, id, 'project', id, 'upsert' FROM projects ORDER BY id"
+    )
+    op.execute(
+        "INSERT INTO change_log (txid, project_id, entity, entity_id, op) "
+        "SELECT 0, project_id, 'participant', user_id, 'upsert' "
+        "FROM project_participants ORDER BY project_id, user_id"
+    )
+    op.execute(
+        "INSERT INTO change_log (txid, project_id, entity, entity_id, op) "
+        "SELECT 0, project_id, 'document', id, 'upsert' FROM documents ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_change_log_user_position", table_name="change_log")
+    op.drop_index("ix_change_log_project_position", table_name="change_log")
+    op.drop_table("change_log")
@@ -0,0 +1,78 @@
+"""add_hot_query_indexes
+
+Revision ID: f7c3a9e1b4d6
+Revises: e8b2c6d4a1f3
+Create Date: 2026-10-19 18:40:12.604219
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.db import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f7c3a9e1b4d6"
+down_revision: Union[str, None] = "e8b2c6d4a1f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, where); each index is built before the one it replaces
+# is dropped, so no query loses its index in between
+NEW_INDEXES = [
+    (
+        "ix_documents_project_created",
+        "documents",
+        ["project_id", "created_at", "id"],
+        None,
+    ),
+    (
+        "ix_project_participants_project_user",
+        "project_participants",
+        ["project_id", "user_id"],
+        None,
+    ),
+    (
+        "ix_change_log_user_rows",
+        "change_log",
+        ["user_id", "txid", "seq"],
+        "user_id IS NOT NULL",
+    ),
+]
+REPLACED_INDEXES = [
+    ("ix_documents_project_id", "documents", ["project_id"], None),
+    ("ix_change_log_user_position", "change_log", ["user_id", "txid", "seq"], None),
+]
+
+
+def _rename_user_index(old: str, new: str) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER INDEX {old} RENAME TO {new}")
+    else:
+        # SQLite cannot rename an index; rebuild it under the new name
+        _, table, columns, where = NEW_INDEXES[-1]
+        op.create_index(new, table, columns, sqlite_where=sa.text(where))
+        op.drop_index(old, table_name=table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns, where in NEW_INDEXES:
+        online.create_index_concurrently(name, table, columns, where=where)
+    for name, table, _, _ in REPLACED_INDEXES:
+        online.drop_index_concurrently(name, table)
+    # the partial user index takes over the name the models use
+    _rename_user_index("ix_change_log_user_rows", "ix_change_log_user_position")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rename_user_index("ix_change_log_user_position", "ix_change_log_user_rows")
+    for name, table, columns, where in REPLACED_INDEXES:
+        online.create_index_concurrently(name, table, columns, where=where)
+    for name, table, _, _ in NEW_INDEXES:
+        online.drop_index_concurrently(name, table)
@@ -0,0 +1,227 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# shed first -> shed last
+EXPENSIVE, WRITE, READ = "expensive", "write", "read"
+
+# logins and registrations hash with bcrypt; uploads, imports and exports hold
+# a DB connection for the whole transfer
+_EXPENSIVE = [
+    ("POST", re.compile(r"^/(login|auth)$")),
+    ("POST", re.compile(r"^/projects/\d+/documents")),
+    ("POST", re.compile(r"^/projects/import$")),
+    ("GET", re.compile(r"^/projects/export$")),
+    ("PUT", re.compile(r"^/documents/\d+$")),
+]
+EXEMPT_PATHS = {"/", "/ping", "/docs", "/redoc", "/openapi.json"}
+# open for as long as the client listens: rate limited but not counted as in
+# flight, the event hub caps them itself
+LONG_LIVED_PATHS = {"/events"}
+
+
+def classify(method: str, path: str) -> str:
+    for expensive_method, pattern in _EXPENSIVE:
+        if method == expensive_method and pattern.match(path):
+            return EXPENSIVE
+    return READ if method in ("GET", "HEAD") else WRITE
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """0 when a token was taken, else seconds until one is available"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class PoolWaitMonitor:
+    """Time requests spend waiting for a pooled DB connection, as a moving
+    average that decays when no samples arrive, so shedding cannot lock itself
+    in once DB traffic stops."""
+
+    HALF_LIFE = 1.0
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._average = 0.0
+        self._updated = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._average = self.alpha * wait + (1 - self.alpha) * self._decayed(now)
+            self._updated = now
+
+    def _decayed(self, now: float) -> float:
+        return self._average * 0.5 ** ((now - self._updated) / self.HALF_LIFE)
+
+    def current(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._average = 0.0
+
+
+pool_wait = PoolWaitMonitor()
+
+
+class AdmissionController:
+    """Decides, before any DB work, whether a request is let in.
+
+    Each user gets a token bucket. On top, in-flight requests are capped per
+    class: uploads and logins may only use part of the capacity and writes a
+    bit more, so under pressure they are refused first and cheap reads keep
+    flowing. When DB connection checkouts start waiting longer than the
+    target, expensive requests and then writes are refused before reads.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        user_rate: float,
+        user_burst: float,
+        pool_wait_target: float,
+        max_buckets: int = 100_000,
+    ):
+        self.max_in_flight = max_in_flight
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.pool_wait_target = pool_wait_target
+        self.max_buckets = max_buckets
+        self.limits = {
+            EXPENSIVE: max(1, int(max_in_flight * 0.5)),
+            WRITE: max(1, int(max_in_flight * 0.8)),
+            READ: max_in_flight,
+        }
+        self.in_flight = 0
+        self.buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.rejected = {429: 0, 503: 0}
+
+    def check_rate(self, client_key: str) -> float:
+        now = time.monotonic()
+        bucket = self.buckets.get(client_key)
+        if bucket is None:
+            bucket = self.buckets[client_key] = TokenBucket(self.user_burst, now)
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client_key)
+        return bucket.take(self.user_rate, self.user_burst, now)
+
+    def check_capacity(self, request_class: str) -> Optional[str]:
+        """None to admit, else why the request is shed"""
+        if self.in_flight >= self.limits[request_class]:
+            return "Server is busy, please retry shortly"
+
+        wait = pool_wait.current()
+        target = self.pool_wait_target
+        over = {EXPENSIVE: target, WRITE: 2 * target, READ: 4 * target}
+        if wait > over[request_class]:
+            return "Database is saturated, please retry shortly"
+        return None
+
+    def reset(self) -> None:
+        self.in_flight = 0
+        self.buckets.clear()
+        self.rejected = {429: 0, 503: 0}
+        pool_wait.reset()
+
+
+admission = AdmissionController(
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    user_rate=settings.ADMISSION_USER_RATE,
+    user_burst=settings.ADMISSION_USER_BURST,
+    pool_wait_target=settings.ADMISSION_POOL_WAIT_TARGET_MS / 1000,
+)
+
+
+def client_key(scope) -> str:
+    """the token's subject when it verifies, else the client address"""
+    from .security import decode_token
+
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                payload = decode_token(token)
+                if payload and payload.get("sub"):
+                    return f"user:{payload['sub']}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    admission.rejected[status_code] += 1
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionControlMiddleware:
+    """Sheds load with fast 429/503 responses before any DB work happens."""
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.ADMISSION_CONTROL_ENABLED
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        retry_after = controller.check_rate(client_key(scope))
+        if retry_after:
+            response = _reject(429, "Too many requests", retry_after)
+            await response(scope, receive, send)
+            return
+        if scope["path"] in LONG_LIVED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        request_class = classify(scope["method"], scope["path"])
+        reason = controller.check_capacity(request_class)
+        if reason is not None:
+            logger.warning(
+                f"Shedding {request_class} request {scope['method']} "
+                f"{scope['path']}: {reason}"
+            )
+            response = _reject(503, reason, 1)
+            await response(scope, receive, send)
+            return
+
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
@@ -0,0 +1,144 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import orjson
+
+from .settings import settings
+
+
+class CacheBackend(ABC):
+    """Byte store behind the response cache.
+
+    The in-process LRU is the default. A key-value service shared by all workers
+    only has to implement these three methods on top of its own get/set/delete.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """the stored value, or None when missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        """store value for ttl seconds"""
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """remove the keys, ignoring missing ones"""
+
+    def clear(self) -> None:
+        """drop everything; only needed by tests"""
+
+
+class LRUCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+ROLES = ("owner", "participant")
+CACHED_ROUTES = ("project", "documents")
+
+
+class ResponseCache:
+    """Pre-encoded JSON bodies of per-project responses.
+
+    Entries are keyed by route, project and the caller's role, and carry the
+    project version they were built from. Writes invalidate the project's keys
+    after commit; the version check covers other workers whose local cache did
+    not see the invalidation.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    @staticmethod
+    def key(route: str, project_id: int, role: str) -> str:
+        return f"resp:{route}:{project_id}:{role}"
+
+    def get(
+        self, route: str, project_id: int, role: str, version: int, window: int = 0
+    ) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        raw = self.backend.get(self.key(route, project_id, role))
+        if raw is None:
+            return None
+        header, _, body = raw.partition(b"\n")
+        if orjson.loads(header) != {"version": version, "window": window}:
+            return None
+        return body
+
+    def set(
+        self,
+        route: str,
+        project_id: int,
+        role: str,
+        body: bytes,
+        version: int,
+        window: int = 0,
+        ttl: Optional[int] = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        # one header line with the validators, then the body untouched
+        header = orjson.dumps({"version": version, "window": window})
+        self.backend.set(
+            self.key(route, project_id, role),
+            header + b"\n" + body,
+            self.ttl if ttl is None else ttl,
+        )
+
+    def invalidate_project(self, project_id: int) -> None:
+        keys = [
+            self.key(route, project_id, role)
+            for route in CACHED_ROUTES
+            for role in ROLES
+        ]
+        self.backend.delete_many(keys)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+response_cache = ResponseCache(
+    LRUCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES),
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+)
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Optional
+
+import orjson
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# queued for a subscriber in place of the events it could not keep up with
+RESYNC = {"type": "resync"}
+# queued for every subscriber when the hub shuts down
+CLOSED = {"type": "closed"}
+
+
+class Broker(ABC):
+    """Carries events between the workers of a deployment.
+
+    Every event published on any worker is handed to the deliver callback of
+    every worker, including the publishing one.
+    """
+
+    @abstractmethod
+    async def start(
+        self, deliver: Callable[[dict], None], missed: Callable[[], None]
+    ) -> None:
+        """begin handing received events to deliver, on the running loop, and
+        call missed when events may have been lost, e.g. after a reconnect"""
+
+    @abstractmethod
+    async def publish(self, events: list[dict]) -> None:
+        """send events to all workers"""
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalBroker(Broker):
+    """Single worker: events are delivered straight back to the local hub."""
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[dict], None]] = None
+
+    async def start(
+        self, deliver: Callable[[dict], None], missed: Callable[[], None]
+    ) -> None:
+        self._deliver = deliver
+
+    async def publish(self, events: list[dict]) -> None:
+        if self._deliver is not None:
+            for event in events:
+                self._deliver(event)
+
+
+class RedisBroker(Broker):
+    """Fan-out through a Redis pub/sub channel (optional redis package).
+
+    When the connection drops the reader resubscribes with exponential
+    backoff; pub/sub keeps nothing for absent subscribers, so once back it
+    reports the gap through missed.
+    """
+
+    RECONNECT_DELAY = 0.5
+    MAX_RECONNECT_DELAY = 30.0
+
+    def __init__(self, url: str, channel: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("EVENTS_BROKER=redis requires the redis package") from e
+        self.channel = channel
+        self._redis = redis.from_url(url)
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(
+        self, deliver: Callable[[dict], None], missed: Callable[[], None]
+    ) -> None:
+        await self._subscribe()
+        self._reader = asyncio.create_task(self._read(deliver, missed))
+
+    async def _subscribe(self) -> None:
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+
+    async def _read(
+        self, deliver: Callable[[dict], None], missed: Callable[[], None]
+    ) -> None:
+        delay = self.RECONNECT_DELAY
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    logger.info(f"Resubscribed to event channel {self.channel!r}")
+                    delay = self.RECONNECT_DELAY
+                    missed()
+                async for message in self._pubsub.listen():
+                    try:
+                        for event in orjson.loads(message["data"]):
+                            deliver(event)
+                    except Exception as e:
+                        logger.warning(f"Dropping malformed event message: {e}")
+                error = "subscription ended"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            logger.error(
+                f"Lost event channel {self.channel!r} ({error}), "
+                f"reconnecting in {delay:g}s"
+            )
+            await self._drop_pubsub()
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, self.MAX_RECONNECT_DELAY)
+
+    async def _drop_pubsub(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def publish(self, events: list[dict]) -> None:
+        await self._redis.publish(self.channel, orjson.dumps(events))
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        await self._drop_pubsub()
+        await self._redis.aclose()
+
+
+def create_broker(kind: Optional[str] = None) -> Broker:
+    kind = kind or settings.EVENTS_BROKER
+    if kind == "local":
+        return LocalBroker()
+    if kind == "redis":
+        if not settings.EVENTS_REDIS_URL:
+            raise RuntimeError("EVENTS_BROKER=redis requires EVENTS_REDIS_URL")
+        return RedisBroker(settings.EVENTS_REDIS_URL, settings.EVENTS_REDIS_CHANNEL)
+    raise RuntimeError(f"Unknown EVENTS_BROKER {kind!r}")
+
+
+class Subscription:
+    """One listener: a user and the projects whose events reach them, either
+    all their projects, following membership changes, or a fixed selection.
+
+    Events wait in a bounded queue. A listener that falls behind has its
+    backlog replaced by a single RESYNC, after which it gets nothing more.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        project_ids: Iterable[int],
+        queue_size: int,
+        follow_memberships: bool = True,
+    ):
+        self.user_id = user_id
+        self.project_ids = set(project_ids)
+        # whether projects the user joins or loses are added or dropped
+        self.follow_memberships = follow_memberships
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.closed = False
+
+    def deliver(self, event: dict) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.end(RESYNC)
+
+    def end(self, final: dict) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(final)
+        self.closed = True
+
+
+class EventHub:
+    """In-process pub/sub for project changes.
+
+    Writers publish from any thread once their transaction commits; the
+    broker brings the events to the hub of every worker, which passes each to
+    the subscriptions of its project, or of its user for events meant for one
+    user. Subscriptions are plain queues on the event loop, so thousands of
+    idle listeners cost memory only.
+    """
+
+    def __init__(self, broker_factory: Callable[[], Broker], queue_size: int):
+        self.broker_factory = broker_factory
+        self.queue_size = queue_size
+        self.broker: Optional[Broker] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._by_project: dict[int, set[Subscription]] = {}
+        self._by_user: dict[int, set[Subscription]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._by_user.values())
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self.broker is not None:
+                return
+            broker = self.broker_factory()
+            await broker.start(self._dispatch, self._missed)
+            self._loop = asyncio.get_running_loop()
+            self.broker = broker
+
+    async def close(self) -> None:
+        for subs in self._by_user.values():
+            for subscription in subs:
+                subscription.end(CLOSED)
+        self._by_project.clear()
+        self._by_user.clear()
+        if self.broker is not None:
+            await self.broker.close()
+        self.broker = None
+        self._loop = None
+        self._start_lock = asyncio.Lock()
+
+    async def subscribe(
+        self,
+        user_id: int,
+        project_ids: Iterable[int],
+        follow_memberships: bool = True,
+    ) -> Subscription:
+        await self.start()
+        subscription = Subscription(
+            user_id, project_ids, self.queue_size, follow_memberships
+        )
+        self._by_user.setdefault(user_id, set()).add(subscription)
+        for project_id in subscription.project_ids:
+            self._by_project.setdefault(project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._discard(self._by_user, subscription.user_id, subscription)
+        for project_id in subscription.project_ids:
+            self._discard(self._by_project, project_id, subscription)
+
+    @staticmethod
+    def _discard(index: dict, key: int, subscription: Subscription) -> None:
+        subs = index.get(key)
+        if subs is not None:
+            subs.discard(subscription)
+            if not subs:
+                del index[key]
+
+    def publish(self, events: list[dict]) -> None:
+        """Hand events to the broker; callable from any thread. Dropped while
+        the hub is not started, as nobody on this worker is listening then."""
+        loop = self._loop
+        if not events or loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            task = loop.create_task(self._publish(events))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(self._publish(events), loop)
+
+    async def _publish(self, events: list[dict]) -> None:
+        try:
+            await self.broker.publish(events)
+        except Exception as e:
+            logger.error(f"Publishing {len(events)} events failed: {e}")
+
+    def _missed(self) -> None:
+        """events from other workers were lost: every listener must resync"""
+        for subs in self._by_user.values():
+            for subscription in subs:
+                if not subscription.closed:
+                    subscription.end(RESYNC)
+
+    def _dispatch(self, event: dict) -> None:
+        user_id = event.get("user_id")
+        project_id = event["project_id"]
+        payload = {key: value for key, value in event.items() if key != "user_id"}
+        if user_id is None:
+            targets = list(self._by_project.get(project_id, ()))
+        else:
+            targets = [
+                subscription
+                for subscription in self._by_user.get(user_id, ())
+                if subscription.follow_memberships
+                or project_id in subscription.project_ids
+            ]
+            for subscription in targets:
+                if subscription.follow_memberships:
+                    self._follow(subscription, event)
+        for subscription in targets:
+            subscription.deliver(payload)
+
+    def _follow(self, subscription: Subscription, event: dict) -> None:
+        """keep a user's subscriptions in step with their memberships"""
+        project_id = event["project_id"]
+        if event["op"] == "grant" or (
+            event["op"] == "upsert" and event["entity"] == "project"
+        ):
+            # joined, or created: a new project is announced to its owner alone
+            subscription.project_ids.add(project_id)
+            self._by_project.setdefault(project_id, set()).add(subscription)
+        elif event["op"] == "delete" and event["entity"] == "project":
+            subscription.project_ids.discard(project_id)
+            self._discard(self._by_project, project_id, subscription)
+
+
+def sse_message(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+event_hub = EventHub(create_broker, settings.EVENTS_QUEUE_SIZE)
@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from abc import abstractmethod
+from typing import Optional
+
+import orjson
+from starlette.responses import JSONResponse
+
+from .admission import client_key
+from .cache import CacheBackend, LRUCacheBackend
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+# creates that clients retry on timeouts
+IDEMPOTENT_ROUTES = [
+    ("POST", re.compile(r"^/projects$")),
+    ("POST", re.compile(r"^/projects/\d+/documents$")),
+]
+# answers a retry may legitimately change: not logged in, no access yet, shed
+_NOT_REPLAYED = {401, 403, 408, 429}
+_PENDING = orjson.dumps({"pending": True}) + b"\n"
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+POLL_SECONDS = 0.05
+
+
+class IdempotencyStore(CacheBackend):
+    """Byte store that can also claim a key.
+
+    A key-value service shared by all workers implements add() with its
+    set-if-absent (SET NX, ADD), so only one worker runs a given request.
+    """
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: int) -> bool:
+        """store value unless the key holds one that has not expired; True
+        when stored"""
+
+
+class MemoryIdempotencyStore(LRUCacheBackend, IdempotencyStore):
+    def add(self, key: str, value: bytes, ttl: int) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._drop_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._entries[key] = (now + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def _drop_expired(self, now: float) -> None:
+        # the least recently used end is where expired records collect
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at > now:
+                return
+            self._entries.popitem(last=False)
+
+
+idempotency_store = MemoryIdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class Fingerprint:
+    """sha256 of the query string, the media type and the body, fed chunk by
+    chunk as the body arrives.
+
+    Multipart boundaries are left out: clients pick a new one per attempt, so
+    the same files sent again would otherwise never match.
+    """
+
+    def __init__(self, scope):
+        content_type = _header(scope, b"content-type") or ""
+        media_type, _, params = content_type.partition(";")
+        boundary = _BOUNDARY.search(params)
+        self._boundary = f"--{boundary.group(1)}".encode() if boundary else b""
+        self._tail = b""
+        self._hash = hashlib.sha256(
+            scope.get("query_string", b"")
+            + b"\n"
+            + media_type.strip().lower().encode("latin-1")
+            + b"\n"
+        )
+        self.complete = False
+
+    def update(self, chunk: bytes) -> None:
+        if not self._boundary:
+            self._hash.update(chunk)
+            return
+        # hold back what could be the start of a boundary split across chunks
+        *parts, rest = (self._tail + chunk).split(self._boundary)
+        for part in parts:
+            self._hash.update(part + b"--")
+        cut = max(len(rest) - len(self._boundary) + 1, 0)
+        self._hash.update(rest[:cut])
+        self._tail = rest[cut:]
+
+    def finish(self) -> None:
+        self._hash.update(self._tail)
+        self._tail = b""
+        self.complete = True
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def _reply(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code)
+
+
+class IdempotencyMiddleware:
+    """Runs a create sent with an Idempotency-Key once per user and key.
+
+    The first request claims the key in the store, runs, and stores its final
+    response with the request's fingerprint for `ttl` seconds; a repeat with
+    the same body gets that response back (marked Idempotent-Replayed) and a
+    different body gets 422. A duplicate arriving while the first attempt
+    runs waits for it instead of uploading the files again. Server errors and
+    the statuses in _NOT_REPLAYED are not kept, so a retry runs afresh; so
+    does a duplicate whose first attempt held the key longer than `lock_ttl`.
+
+    A repeat's body is still read to compare fingerprints, but nothing is
+    written to storage or the database.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: IdempotencyStore = idempotency_store,
+        ttl: int = settings.IDEMPOTENCY_TTL_SECONDS,
+        lock_ttl: int = settings.IDEMPOTENCY_LOCK_SECONDS,
+        max_response_bytes: int = settings.IDEMPOTENCY_MAX_RESPONSE_BYTES,
+    ):
+        self.app = app
+        self.store = store
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.max_response_bytes = max_response_bytes
+        # first attempts running in this worker, for duplicates to wait on
+        self._running: dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        key = None
+        if scope["type"] == "http" and settings.IDEMPOTENCY_ENABLED:
+            if any(
+                scope["method"] == method and pattern.match(scope["path"])
+                for method, pattern in IDEMPOTENT_ROUTES
+            ):
+                key = _header(scope, b"idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(key) <= MAX_KEY_LENGTH:
+            response = _reply(
+                400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+            )
+            await response(scope, receive, send)
+            return
+
+        store_key = f"idem:{client_key(scope)}:{scope['method']} {scope['path']}:{key}"
+        fingerprint = Fingerprint(scope)
+        while True:
+            raw = self.store.get(store_key)
+            if raw is None:
+                if self.store.add(store_key, _PENDING, self.lock_ttl):
+                    break
+                continue
+            header, _, body = raw.partition(b"\n")
+            record = orjson.loads(header)
+            if record.get("pending"):
+                await self._wait(store_key)
+                continue
+            await self._replay(scope, receive, send, fingerprint, record, body)
+            return
+
+        await self._run(scope, receive, send, fingerprint, store_key)
+
+    async def _wait(self, store_key: str) -> None:
+        running = self._running.get(store_key)
+        if running is None:
+            # the first attempt runs in another worker
+            await asyncio.sleep(POLL_SECONDS)
+            return
+        try:
+            await asyncio.wait_for(running.wait(), POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _replay(self, scope, receive, send, fingerprint, record, body):
+        while not fingerprint.complete:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            fingerprint.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                fingerprint.finish()
+
+        if fingerprint.hexdigest() != record["fingerprint"]:
+            response = _reply(
+                422, "Idempotency-Key was already used with a different request"
+            )
+            await response(scope, receive, send)
+            return
+
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in record["headers"]
+        ]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": record["status"],
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def _run(self, scope, receive, send, fingerprint, store_key):
+        running = self._running[store_key] = asyncio.Event()
+        start = None
+        chunks: list[bytes] = []
+        size = 0
+        sent = False
+
+        async def hashing_receive():
+            message = await receive()
+            if message["type"] == "http.request" and not fingerprint.complete:
+                fingerprint.update(message.get("body", b""))
+                if not message.get("more_body", False):
+                    fingerprint.finish()
+            return message
+
+        async def capturing_send(message):
+            nonlocal start, size, sent
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= self.max_response_bytes:
+                    chunks.append(body)
+                sent = not message.get("more_body", False)
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, hashing_receive, capturing_send)
+            if (
+                sent
+                and fingerprint.complete
+                and start["status"] < 500
+                and start["status"] not in _NOT_REPLAYED
+                and size <= self.max_response_bytes
+            ):
+                record = {
+                    "fingerprint": fingerprint.hexdigest(),
+                    "status": start["status"],
+                    "headers": [
+                        (name.decode("latin-1"), value.decode("latin-1"))
+                        for name, value in start.get("headers", [])
+                    ],
+                }
+                self.store.set(
+                    store_key, orjson.dumps(record) + b"\n" + b"".join(chunks), self.ttl
+                )
+                stored = True
+            elif size > self.max_response_bytes:
+                logger.warning(
+                    f"Response to {scope['method']} {scope['path']} is too large "
+                    f"to keep for Idempotency-Key retries ({size} bytes)"
+                )
+        finally:
+            if not stored:
+                # let the next attempt run
+                self.store.delete_many([store_key])
+            if self._running.get(store_key) is running:
+                del self._running[store_key]
+            running.set()
@@ -0,0 +1,50 @@
+from typing import AsyncIterable, AsyncIterator, Optional
+
+import orjson
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_line(value) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z) + b"\n"
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int
+) -> AsyncIterator[tuple[int, Optional[bytes]]]:
+    """(line number, line) pairs from a chunked body, numbered from 1.
+
+    Only the current partial line is buffered. Blank lines are skipped but
+    still counted. A line longer than max_line_bytes comes out as None and
+    the rest of it is discarded as it arrives.
+    """
+    buffer = bytearray()
+    number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline == -1:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+            number += 1
+            if oversized:
+                yield number, None
+            else:
+                buffer += chunk[start:newline]
+                if len(buffer) > max_line_bytes:
+                    yield number, None
+                elif buffer.strip():
+                    yield number, bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = newline + 1
+    if oversized:
+        yield number + 1, None
+    elif buffer.strip():
+        yield number + 1, bytes(buffer)
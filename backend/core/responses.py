@@ -0,0 +1,36 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
+from starlette.types import Receive, Scope, Send
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson.
+
+    For the values list endpoints return (str, int, None, datetime) the bytes are
+    identical to FastAPI's default encoding of the matching pydantic models, but
+    there is no validation pass and no jsonable_encoder walk.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body generator may still read the request body.
+
+    On ASGI servers older than spec 2.4, Starlette watches receive() for a
+    disconnect while streaming. That steals the request body chunks the
+    generator is reading. Here the body is streamed directly instead, and a
+    dropped client shows up as a failing send.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
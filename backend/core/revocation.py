@@ -0,0 +1,296 @@
+"""Revoked access tokens, checked without a database round trip.
+
+Tokens carry a random id (jti). Revoking one adds a row to revoked_tokens;
+every worker mirrors the unexpired rows into a Bloom filter, which answers
+"certainly not revoked" for almost every token with a few hashes and no I/O.
+The rare positives, revoked tokens and about REVOCATION_FILTER_ERROR_RATE of
+the others, are settled exactly: by the ids the worker already knows to be
+revoked, else by one lookup whose answer is then kept.
+
+In the background, workers read the rows added since their last look every
+refresh interval, so a token revoked through another worker stops working
+within that interval; through this one, at once. The filter is rebuilt from
+the table periodically to drop expired tokens, and earlier when it fills up.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.models import sql_models
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+START = (-1, 0)
+
+
+def new_token_id() -> str:
+    return uuid.uuid4().hex
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about error_rate false
+    positives up to capacity items, in -ln(error_rate) / ln(2)^2 bits per item:
+    1.2 MB per million items at 1%."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(
+            64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+def _unexpired():
+    return sql_models.RevokedToken.expires_at > datetime.now(timezone.utc)
+
+
+def revocations_stmt(dialect: str, after: tuple[int, int]):
+    """unexpired revocations past `after`, in position order; on PostgreSQL
+    only those of transactions older than every running one, as in
+    backend/db/changes.py, so none is skipped when commits land out of order"""
+    revoked = sql_models.RevokedToken
+    stmt = select(revoked.txid, revoked.seq, revoked.jti).where(
+        tuple_(revoked.txid, revoked.seq) > tuple_(*after), _unexpired()
+    )
+    if dialect == "postgresql":
+        stmt = stmt.where(
+            revoked.txid < func.txid_snapshot_xmin(func.txid_current_snapshot())
+        )
+    return stmt.order_by(revoked.txid, revoked.seq)
+
+
+def is_revoked_stmt(jti: str):
+    return select(sql_models.RevokedToken.seq).where(sql_models.RevokedToken.jti == jti)
+
+
+class RevocationList:
+    """Per-worker mirror of revoked_tokens; see the module docstring.
+
+    Requests only read it. A background task started by the lifespan loads
+    it, then refreshes and rebuilds it in the threadpool with its own session.
+    Until the first load succeeds every token passes, so a worker whose
+    database is down at startup logs it and keeps retrying.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        refresh_interval: float,
+        rebuild_interval: float,
+        max_checked: int = 10_000,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.max_checked = max_checked
+        self._filter = BloomFilter(capacity, error_rate)
+        self._position: Optional[tuple[int, int]] = None
+        self._rebuilt = 0.0
+        # exact answers for ids the filter let through: True for revoked ones
+        self._checked: OrderedDict[str, bool] = OrderedDict()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"lookups": 0, "false_positives": 0, "rebuilds": 0}
+
+    def check(self, jti: str) -> Optional[bool]:
+        """in memory only: whether the token is revoked, or None for a filter
+        hit not settled yet (see confirm())"""
+        if jti not in self._filter:
+            return False
+        with self._lock:
+            revoked = self._checked.get(jti)
+            if revoked is not None:
+                self._checked.move_to_end(jti)
+            return revoked
+
+    def confirm(self, db: Session, jti: str) -> bool:
+        """settle a filter hit with one lookup and remember the answer"""
+        self.stats["lookups"] += 1
+        revoked = db.scalar(is_revoked_stmt(jti)) is not None
+        if not revoked:
+            self.stats["false_positives"] += 1
+        self._remember(jti, revoked)
+        return revoked
+
+    def add(self, jti: str) -> None:
+        """a revocation committed by this worker, effective at once"""
+        self._filter.add(jti)
+        self._remember(jti, True)
+
+    def _remember(self, jti: str, revoked: bool) -> None:
+        with self._lock:
+            self._checked[jti] = revoked
+            self._checked.move_to_end(jti)
+            while len(self._checked) > self.max_checked:
+                self._checked.popitem(last=False)
+
+    def sync(self, db: Session) -> None:
+        """rebuild when due or when the filter is full, else read new rows"""
+        if (
+            self._position is None
+            or time.monotonic() - self._rebuilt >= self.rebuild_interval
+            or self._filter.count > self._filter.capacity
+        ):
+            self.rebuild(db)
+        else:
+            self.refresh(db)
+
+    def refresh(self, db: Session) -> None:
+        dialect = db.get_bind().dialect.name
+        rows = db.execute(revocations_stmt(dialect, self._position)).all()
+        for txid, seq, jti in rows:
+            self._filter.add(jti)
+            self._remember(jti, True)
+        if rows:
+            self._position = (rows[-1].txid, rows[-1].seq)
+
+    def rebuild(self, db: Session) -> None:
+        """load the unexpired rows into a new filter, then swap it in"""
+        dialect = db.get_bind().dialect.name
+        count = db.scalar(
+            select(func.count())
+            .select_from(sql_models.RevokedToken)
+            .where(_unexpired())
+        )
+        bloom = BloomFilter(max(self.capacity, 2 * count), self.error_rate)
+        position = START
+        for txid, seq, jti in db.execute(revocations_stmt(dialect, START)):
+            bloom.add(jti)
+            position = (txid, seq)
+        with self._lock:
+            # revocations added meanwhile are re-read by the next refresh
+            self._filter = bloom
+            self._checked.clear()
+            self._position = position
+            self._rebuilt = time.monotonic()
+        self.stats["rebuilds"] += 1
+
+    def _sync_in_own_session(self) -> None:
+        from backend.db.apply_schema import SessionLocal
+
+        with SessionLocal() as db:
+            self.sync(db)
+
+    async def _sync_off_loop(self) -> None:
+        try:
+            await run_in_threadpool(self._sync_in_own_session)
+        except Exception as e:
+            logger.warning(f"Could not refresh the revoked tokens: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self._sync_off_loop()
+
+    async def start(self) -> None:
+        await self._sync_off_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def reset(self) -> None:
+        """forget everything and count as loaded; only needed by tests"""
+        with self._lock:
+            self._filter = BloomFilter(self.capacity, self.error_rate)
+            self._checked.clear()
+            self._position = START
+            self._rebuilt = time.monotonic()
+
+
+revocations = RevocationList(
+    capacity=settings.REVOCATION_FILTER_CAPACITY,
+    error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+    refresh_interval=settings.REVOCATION_REFRESH_SECONDS,
+    rebuild_interval=settings.REVOCATION_REBUILD_SECONDS,
+)
+
+
+def revoke_token(db: Session, payload: dict, user_id: int) -> None:
+    """Record the revocation of a decoded token and commit; rows of tokens
+    that have expired since are pruned on the way. Revoking a token twice, as
+    two workers may within a refresh interval, is not an error."""
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported on {dialect_name}")
+
+    revoked = sql_models.RevokedToken
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    stmt = (
+        insert(revoked)
+        .values(jti=payload["jti"], user_id=user_id, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=["jti"])
+    )
+    if dialect_name == "postgresql":
+        stmt = stmt.values(txid=func.txid_current())
+    db.execute(delete(revoked).where(~_unexpired()))
+    db.execute(stmt)
+    db.commit()
+    revocations.add(payload["jti"])
+
+
+def revoke_user_tokens(user: sql_models.User) -> None:
+    """Refuse every token issued to the user until now, e.g. on a password
+    change; the caller commits. Checked against the user row that
+    get_current_user loads anyway, so it costs no query and no filter space."""
+    user.tokens_valid_after = datetime.now(timezone.utc)
+
+
+def issued_before_cutoff(payload: dict, user: sql_models.User) -> bool:
+    cutoff = user.tokens_valid_after
+    if cutoff is None:
+        return False
+    if cutoff.tzinfo is None:
+        # SQLite hands the stored UTC time back without its zone
+        cutoff = cutoff.replace(tzinfo=timezone.utc)
+    return payload.get("iat", 0) < cutoff.timestamp()
@@ -1,6 +1,5 @@
-import boto3
-from botocore.client import Config
 import os
+import threading
 from botocore.exceptions import ClientError
 from fastapi import UploadFile, HTTPException
 import logging
@@ -22,44 +21,160 @@ AWS_ACCESS_KEY = settings.AWS_ACCESS_KEY_ID
 AWS_SECRET_KEY = settings.AWS_SECRET_ACCESS_KEY
 AWS_REGION = settings.AWS_REGION
 
-if not all([S3_INTERNAL_ENDPOINT, BUCKET, AWS_ACCESS_KEY, AWS_SECRET_KEY]):
 
-    raise RuntimeError("Missing critical S3 configuration environment variables.")
-if not S3_PUBLIC_ENDPOINT:
-    print(
-        "Warning: PUBLIC_S3_HOST is not set. Presigned URLs for browser might not use public host."
+def s3_pool_size() -> int:
+    """enough connections for every request thread to hold one while a single
+    multipart transfer fans out fully; beyond that botocore opens throwaway
+    connections and logs "Connection pool is full"."""
+    if settings.S3_MAX_POOL_CONNECTIONS:
+        return settings.S3_MAX_POOL_CONNECTIONS
+    return settings.THREADPOOL_SIZE + settings.S3_TRANSFER_MAX_CONCURRENCY
+
+
+class S3PoolMetrics:
+    """In-flight S3 calls against the pool size, and connections thrown away
+    because the pool was full (each one costs a new TCP and TLS handshake)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool_size = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.saturated_requests = 0
+        self.pool_full_discards = 0
+
+    def request_started(self, **kwargs) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self.pool_size and self.in_flight > self.pool_size:
+                self.saturated_requests += 1
+
+    def request_finished(self, **kwargs) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def connection_discarded(self) -> None:
+        with self._lock:
+            self.pool_full_discards += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "saturated_requests": self.saturated_requests,
+                "pool_full_discards": self.pool_full_discards,
+            }
+
+
+class _PoolFullFilter(logging.Filter):
+    """counts urllib3's pool-full warnings; it has no hook for them otherwise"""
+
+    def __init__(self, metrics: S3PoolMetrics):
+        super().__init__()
+        self.metrics = metrics
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.getMessage().startswith("Connection pool is full"):
+            self.metrics.connection_discarded()
+        return True
+
+
+s3_pool_metrics = S3PoolMetrics()
+logging.getLogger("urllib3.connectionpool").addFilter(_PoolFullFilter(s3_pool_metrics))
+
+
+def create_transfer_config():
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=settings.S3_TRANSFER_MAX_CONCURRENCY,
     )
 
 
-boto_client_kwargs = {
-    "endpoint_url": S3_INTERNAL_ENDPOINT,
-    "aws_access_key_id": AWS_ACCESS_KEY,
-    "aws_secret_access_key": AWS_SECRET_KEY,
-    # --- ADD S3 CONFIGURATION FOR PATH STYLE ---
-    "config": Config(s3={"addressing_style": "path", "signature_version": "s3v4"}),
-    # Explicitly setting signature_version to s3v4 is also good practice with MinIO
-}
+def create_s3_client():
+    """build the boto3 client; boto3 and its service model load here, not on import"""
+    if not all([S3_INTERNAL_ENDPOINT, BUCKET, AWS_ACCESS_KEY, AWS_SECRET_KEY]):
+
+        raise RuntimeError("Missing critical S3 configuration environment variables.")
+    if not S3_PUBLIC_ENDPOINT:
+        print(
+            "Warning: PUBLIC_S3_HOST is not set. Presigned URLs for browser might not use public host."
+        )
+
+    import boto3
+    from botocore.client import Config
 
+    boto_client_kwargs = {
+        "endpoint_url": S3_INTERNAL_ENDPOINT,
+        "aws_access_key_id": AWS_ACCESS_KEY,
+        "aws_secret_access_key": AWS_SECRET_KEY,
+        # --- ADD S3 CONFIGURATION FOR PATH STYLE ---
+        "config": Config(
+            s3={"addressing_style": "path", "signature_version": "s3v4"},
+            # Explicitly setting signature_version to s3v4 is also good practice with MinIO
+            max_pool_connections=s3_pool_size(),
+            tcp_keepalive=settings.S3_TCP_KEEPALIVE,
+            connect_timeout=settings.S3_CONNECT_TIMEOUT,
+            read_timeout=settings.S3_READ_TIMEOUT,
+            retries={
+                "mode": settings.S3_RETRY_MODE,
+                "max_attempts": settings.S3_MAX_ATTEMPTS,
+            },
+        ),
+    }
 
-try:
-    s3_client = boto3.client("s3", **boto_client_kwargs)
+    client = boto3.client("s3", **boto_client_kwargs)
+    s3_pool_metrics.pool_size = s3_pool_size()
+    client.meta.events.register_first("before-call.s3", s3_pool_metrics.request_started)
+    client.meta.events.register("after-call.s3", s3_pool_metrics.request_finished)
+    client.meta.events.register("after-call-error.s3", s3_pool_metrics.request_finished)
     logger.info(
         f"S3_UTILS: Boto3 S3 client initialized for endpoint: {S3_INTERNAL_ENDPOINT} with path-style addressing."
     )
-except Exception as e:
-    logger.critical(
-        f"S3_UTILS: FATAL - Could not create boto3 S3 client. Error: {e}", exc_info=True
-    )
-    s3_client = None
+    return client
 
 
 class S3Store:
     def __init__(self):
-        self.client = s3_client
+        self._client = None
+        self._transfer_config = None
+        self._client_lock = threading.Lock()
         self.bucket = BUCKET
         self.internal = S3_INTERNAL_ENDPOINT
         self.public = S3_PUBLIC_ENDPOINT or S3_INTERNAL_ENDPOINT
 
+    @property
+    def client(self):
+        """created on first use; boto3 clients are thread-safe once built"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = create_s3_client()
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+
+    @property
+    def transfer_config(self):
+        """multipart threshold, part size and concurrency for upload_fileobj"""
+        if self._transfer_config is None:
+            self._transfer_config = create_transfer_config()
+        return self._transfer_config
+
+    def warm_up(self) -> None:
+        """build the client and open a pooled connection to the bucket"""
+        self.client.head_bucket(Bucket=self.bucket)
+
     @staticmethod
     def make_key(project_id: int, filename: str) -> str:
         """generate a unique S3 key for a file"""
@@ -78,6 +193,7 @@ class S3Store:
                 self.bucket,
                 key,
                 ExtraArgs={"ContentType": file.content_type},
+                Config=self.transfer_config,
             )
             return key
         except ClientError as ce:
@@ -93,7 +209,41 @@ class S3Store:
             print(f"[S3 Delete Error] key={key}: {ce}")
             return False
 
-    def presign(self, key: str, expires: int = 3600) -> Optional[str]:
+    def delete_many(self, keys: list[str]) -> list[str]:
+        """DeleteObjects in batches of 1000; returns the keys that failed"""
+        failed: list[str] = []
+        for start in range(0, len(keys), 1000):
+            end = start + 1000
+            batch = keys[start:end]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+                )
+            except ClientError as ce:
+                logger.error(f"S3 batch delete of {len(batch)} keys failed: {ce}")
+                failed.extend(batch)
+                continue
+            failed.extend(error["Key"] for error in response.get("Errors", []))
+        return failed
+
+    def head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as ce:
+            if ce.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    def get_range(self, key: str, byte_range: Optional[str] = None):
+        """the streaming body of the object, or of a 'bytes=start-end' range"""
+        params = {"Bucket": self.bucket, "Key": key}
+        if byte_range:
+            params["Range"] = byte_range
+        return self.client.get_object(**params)["Body"]
+
+    def presign(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        expires = expires or settings.PRESIGNED_URL_EXPIRES_SECONDS
         try:
             internal_url = self.client.generate_presigned_url(
                 "get_object",
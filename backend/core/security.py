@@ -7,6 +7,7 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from backend.core.revocation import issued_before_cutoff, new_token_id, revocations
 from backend.core.settings import settings
 from backend.db.apply_schema import get_db
 
@@ -29,11 +30,17 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
-    expire = datetime.now(timezone.utc) + (
-        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
-
-    to_encode = {"exp": expire, "sub": str(subject)}
+    issued = datetime.now(timezone.utc)
+    expire = issued + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+    # the id lets this one token be revoked before it expires; the fractional
+    # issue time orders it against a password change in the same second
+    to_encode = {
+        "exp": expire,
+        "iat": issued.timestamp(),
+        "sub": str(subject),
+        "jti": new_token_id(),
+    }
 
     encoded_jwt = jwt.encode(to_encode, JWT_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -69,11 +76,20 @@ async def get_current_user(
     if login is None:
         raise credentials_exception
 
+    # a few hashes in memory for all but revoked tokens and rare false positives
+    jti = payload.get("jti")
+    if jti is not None:
+        revoked = revocations.check(jti)
+        if revoked is None:
+            revoked = revocations.confirm(db, jti)
+        if revoked:
+            raise credentials_exception
+
     user: sql_models.User | None = (
         db.query(sql_models.User).filter_by(login=login).first()
     )
 
-    if user is None:
+    if user is None or issued_before_cutoff(payload, user):
         raise credentials_exception
 
     return user
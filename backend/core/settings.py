@@ -14,6 +14,14 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # revoked tokens are mirrored per worker into a Bloom filter sized for at
+    # least this many ids, re-read for new revocations every refresh interval
+    # and rebuilt, dropping expired ones, every rebuild interval
+    REVOCATION_FILTER_CAPACITY: int = 100_000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.01
+    REVOCATION_REFRESH_SECONDS: float = 2.0
+    REVOCATION_REBUILD_SECONDS: float = 3600.0
+
     DATABASE_URL: str
 
     S3_BUCKET_NAME: str
@@ -22,6 +30,90 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_S3_ENDPOINT_URL: Optional[str] = None
     AWS_REGION: Optional[str] = "eu-west-3"
+    PRESIGNED_URL_EXPIRES_SECONDS: int = 3600
+
+    # "s3" (boto3 in the thread pool), "s3-async" (aiobotocore), "filesystem"
+    # or "memory"
+    STORAGE_BACKEND: str = "s3"
+    # filesystem backend: where objects live, the key signing download URLs
+    # (defaults to JWT_KEY), the URL prefix clients reach the API under, and
+    # an nginx internal location to hand downloads to with X-Accel-Redirect
+    STORAGE_ROOT: str = "./storage"
+    STORAGE_SIGNING_KEY: Optional[str] = None
+    STORAGE_PUBLIC_BASE_URL: str = ""
+    STORAGE_ACCEL_REDIRECT_PREFIX: Optional[str] = None
+
+    # worker threads for sync endpoints and blocking calls (anyio's default is 40)
+    THREADPOOL_SIZE: int = 40
+
+    # S3 HTTP pool; None sizes it from THREADPOOL_SIZE and the transfer concurrency
+    S3_MAX_POOL_CONNECTIONS: Optional[int] = None
+    S3_TCP_KEEPALIVE: bool = True
+    S3_CONNECT_TIMEOUT: float = 5.0
+    S3_READ_TIMEOUT: float = 60.0
+    S3_RETRY_MODE: str = "adaptive"
+    S3_MAX_ATTEMPTS: int = 5
+    S3_MULTIPART_THRESHOLD: int = 16 * 1024 * 1024
+    S3_MULTIPART_CHUNKSIZE: int = 16 * 1024 * 1024
+    S3_TRANSFER_MAX_CONCURRENCY: int = 8
+
+    # connect to the database and S3 before the worker reports ready
+    STARTUP_WARMUP: bool = False
+
+    # load shedding before any DB work: per-user token buckets, an in-flight
+    # cap, and the DB connection wait beyond which writes and uploads are refused
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 64
+    ADMISSION_USER_RATE: float = 20.0
+    ADMISSION_USER_BURST: float = 40.0
+    ADMISSION_POOL_WAIT_TARGET_MS: float = 100.0
+
+    SQL_QUERY_TRACKING: bool = True
+    SQL_QUERY_WARN_THRESHOLD: int = 30
+    SQL_REPEATED_QUERY_THRESHOLD: int = 5
+
+    # rows per transaction in the NDJSON project import, and the longest line
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_MAX_LINE_BYTES: int = 64 * 1024
+    # rows fetched per round trip from the export's server-side cursor
+    EXPORT_BATCH_SIZE: int = 1000
+
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10_000
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+
+    # concurrent identical document-list builds share one execution per worker
+    SINGLE_FLIGHT_MAX_KEYS: int = 1024
+    SINGLE_FLIGHT_WAIT_SECONDS: float = 10.0
+
+    # Idempotency-Key on POST /projects and uploads: how long final responses
+    # are kept for retries, how long a first attempt may hold its key before a
+    # duplicate runs on its own, and the largest response body kept
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_LOCK_SECONDS: int = 300
+    IDEMPOTENCY_MAX_ENTRIES: int = 10_000
+    IDEMPOTENCY_MAX_RESPONSE_BYTES: int = 1024 * 1024
+
+    # change notifications on GET /events: "local" for a single worker, "redis"
+    # to fan out across workers through EVENTS_REDIS_URL
+    EVENTS_BROKER: str = "local"
+    EVENTS_REDIS_URL: Optional[str] = None
+    EVENTS_REDIS_CHANNEL: str = "project-events"
+    # events buffered per listener before it is told to resync
+    EVENTS_QUEUE_SIZE: int = 256
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    EVENTS_MAX_SUBSCRIBERS: int = 10_000
+
+    # alembic on PostgreSQL: give up on a lock or a statement after this long
+    # rather than queue traffic behind it (builds and validations of the online
+    # helpers in backend/db/online_migrations.py are exempt from the latter)
+    MIGRATION_LOCK_TIMEOUT: str = "5s"
+    MIGRATION_STATEMENT_TIMEOUT: str = "60s"
+    # rows per backfill transaction, and the pause after each batch as a
+    # multiple of the time the batch took
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 5000
+    MIGRATION_BACKFILL_THROTTLE: float = 1.0
 
 
 settings = Settings()
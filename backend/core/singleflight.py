@@ -0,0 +1,86 @@
+import logging
+import threading
+from typing import Callable, Hashable, TypeVar
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Lets concurrent identical computations share one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and get the same result or exception. Nothing is kept after the
+    call finishes, so this only merges requests that overlap in time. Callers
+    must be authorized before calling, and the key must contain everything the
+    result depends on.
+
+    Works for the thread pool that runs sync endpoints. At most max_keys
+    computations are tracked; beyond that callers simply run their own. A
+    follower that waits longer than wait_timeout runs its own too, so a stuck
+    leader cannot hold the others.
+    """
+
+    def __init__(self, max_keys: int, wait_timeout: float):
+        self.max_keys = max_keys
+        self.wait_timeout = wait_timeout
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "shared": 0, "bypassed": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None and len(self._calls) >= self.max_keys:
+                self.stats["bypassed"] += 1
+                leader = None
+            elif call is None:
+                call = self._calls[key] = _Call()
+                self.stats["leaders"] += 1
+                leader = True
+            else:
+                self.stats["shared"] += 1
+                leader = False
+
+        if leader is None:
+            return fn()
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                logger.warning(f"Single-flight wait timed out for {key!r}")
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+document_flights = SingleFlight(
+    max_keys=settings.SINGLE_FLIGHT_MAX_KEYS,
+    wait_timeout=settings.SINGLE_FLIGHT_WAIT_SECONDS,
+)
@@ -0,0 +1,57 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from .events import event_hub
+from .revocation import revocations
+from .settings import settings
+from .storage import close_storage, get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_database() -> None:
+    from backend.db.apply_schema import engine
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+
+
+async def warm_up() -> None:
+    """Pay the first-request costs up front: open a pooled database connection,
+    build the storage client and connect it. Failures are logged, not fatal, so
+    a slow dependency cannot keep the worker from starting."""
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(warm_up_database)
+    except Exception as e:
+        logger.warning(f"Warm-up: database not reachable: {e}")
+    try:
+        await get_storage().warm_up()
+    except Exception as e:
+        logger.warning(f"Warm-up: storage not reachable: {e}")
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.3f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # sync endpoints and run_in_threadpool share this limiter; the S3 pool is
+    # sized from the same setting
+    anyio.to_thread.current_default_thread_limiter().total_tokens = (
+        settings.THREADPOOL_SIZE
+    )
+    if settings.STARTUP_WARMUP:
+        await warm_up()
+    # started here so changes are published to other workers from the start;
+    # closing ends the open event streams, which would otherwise hold shutdown
+    await event_hub.start()
+    # loaded before the first request, then kept fresh off the request path
+    await revocations.start()
+    yield
+    await revocations.close()
+    await event_hub.close()
+    await close_storage()
@@ -0,0 +1,449 @@
+import asyncio
+import itertools
+import logging
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class ObjectInfo:
+    key: str
+    size: int
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+
+
+def make_key(project_id: int, filename: str) -> str:
+    """generate a unique storage key for a file"""
+    return f"projects/{project_id}/uploads/{uuid.uuid4()}_{filename}"
+
+
+def parse_range(byte_range: Optional[str], size: int) -> tuple[int, int]:
+    """'bytes=start-end' (end inclusive, either side optional) as a half-open
+    [start, stop) slice of an object of the given size"""
+    if not byte_range:
+        return 0, size
+    start_s, _, end_s = byte_range.removeprefix("bytes=").partition("-")
+    if not start_s:
+        return max(size - int(end_s), 0), size
+    stop = min(int(end_s) + 1, size) if end_s else size
+    return int(start_s), stop
+
+
+class StorageBackend(ABC):
+    """Where document bodies live.
+
+    All I/O is async so handlers never block the event loop. Presigning is
+    the exception: it is local signing with no network round trip, so it stays
+    synchronous and cheap enough to call once per listed document.
+    """
+
+    @abstractmethod
+    async def upload(self, file: UploadFile, project_id: int) -> str:
+        """stream the upload into storage and return its key"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """False when the object could not be deleted"""
+
+    @abstractmethod
+    async def delete_many(self, keys: list[str]) -> list[str]:
+        """delete in as few round trips as possible; returns the keys that failed"""
+
+    @abstractmethod
+    def presign(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        """time-limited download URL, None when it cannot be generated"""
+
+    def presign_many(
+        self, keys: list[str], expires: Optional[int] = None
+    ) -> list[Optional[str]]:
+        return [self.presign(key, expires) for key in keys]
+
+    @abstractmethod
+    async def head(self, key: str) -> Optional[ObjectInfo]:
+        """size and type of the object, None when it does not exist"""
+
+    @abstractmethod
+    def open_range(
+        self, key: str, byte_range: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """stream the object, or the 'bytes=start-end' part of it, in chunks"""
+
+    async def warm_up(self) -> None:
+        """open connections ahead of the first request"""
+
+    async def close(self) -> None:
+        """release connections on shutdown"""
+
+    def stats(self) -> dict:
+        """counters worth watching in production, reported by /ping"""
+        return {}
+
+
+class ThreadedS3Storage(StorageBackend):
+    """The boto3 S3Store with every blocking call moved to the thread pool."""
+
+    def __init__(self, store=None):
+        if store is None:
+            from .s3_utils import s3_store as store
+        self.store = store
+
+    async def upload(self, file: UploadFile, project_id: int) -> str:
+        return await run_in_threadpool(self.store.upload, file, project_id)
+
+    async def delete(self, key: str) -> bool:
+        return await run_in_threadpool(self.store.delete, key)
+
+    async def delete_many(self, keys: list[str]) -> list[str]:
+        return await run_in_threadpool(self.store.delete_many, keys)
+
+    def presign(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        return self.store.presign(key, expires)
+
+    async def head(self, key: str) -> Optional[ObjectInfo]:
+        response = await run_in_threadpool(self.store.head, key)
+        if response is None:
+            return None
+        return ObjectInfo(
+            key=key,
+            size=response["ContentLength"],
+            content_type=response.get("ContentType"),
+            etag=response.get("ETag"),
+        )
+
+    async def open_range(
+        self, key: str, byte_range: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        body = await run_in_threadpool(self.store.get_range, key, byte_range)
+        try:
+            while chunk := await run_in_threadpool(body.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    async def warm_up(self) -> None:
+        await run_in_threadpool(self.store.warm_up)
+
+    def stats(self) -> dict:
+        from .s3_utils import s3_pool_metrics
+
+        return {"s3_pool": s3_pool_metrics.snapshot()}
+
+
+async def _numbered_parts(file: UploadFile, first: bytes):
+    """(part number, bytes) of multipart-sized parts, starting with what was
+    already read"""
+    size = settings.S3_MULTIPART_CHUNKSIZE
+    buffer = first
+    for number in itertools.count(1):
+        while len(buffer) < size:
+            more = await file.read(size - len(buffer))
+            if not more:
+                break
+            buffer += more
+        if not buffer:
+            return
+        yield number, buffer[:size]
+        buffer = buffer[size:]
+
+
+class AioS3Storage(StorageBackend):
+    """Native async S3 on aiobotocore (optional dependency).
+
+    Presigned URLs are signed by the boto3 client of S3Store, which never
+    touches the network for that.
+    """
+
+    def __init__(self, store=None):
+        try:
+            from aiobotocore.session import get_session
+        except ImportError as e:
+            raise RuntimeError(
+                "STORAGE_BACKEND=s3-async requires the aiobotocore package"
+            ) from e
+        if store is None:
+            from .s3_utils import s3_store as store
+        self.store = store
+        self.bucket = store.bucket
+        self._session = get_session()
+        self._client = None
+        self._client_cm = None
+        self._lock = asyncio.Lock()
+
+    async def client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    from aiobotocore.config import AioConfig
+
+                    from .s3_utils import s3_pool_size
+
+                    self._client_cm = self._session.create_client(
+                        "s3",
+                        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                        region_name=settings.AWS_REGION,
+                        config=AioConfig(
+                            s3={"addressing_style": "path"},
+                            signature_version="s3v4",
+                            max_pool_connections=s3_pool_size(),
+                            connect_timeout=settings.S3_CONNECT_TIMEOUT,
+                            read_timeout=settings.S3_READ_TIMEOUT,
+                            retries={
+                                "mode": settings.S3_RETRY_MODE,
+                                "max_attempts": settings.S3_MAX_ATTEMPTS,
+                            },
+                        ),
+                    )
+                    self._client = await self._client_cm.__aenter__()
+        return self._client
+
+    async def upload(self, file: UploadFile, project_id: int) -> str:
+        from botocore.exceptions import ClientError
+
+        key = make_key(project_id, file.filename or "unnamed")
+        client = await self.client()
+        try:
+            first = await file.read(settings.S3_MULTIPART_THRESHOLD)
+            if len(first) < settings.S3_MULTIPART_THRESHOLD:
+                await client.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=first,
+                    ContentType=file.content_type or "application/octet-stream",
+                )
+            else:
+                await self._multipart_upload(client, key, file, first)
+        except ClientError as ce:
+            msg = ce.response.get("Error", {}).get("Message", str(ce))
+            raise HTTPException(500, f"S3 upload failed: {msg}")
+        return key
+
+    async def _multipart_upload(self, client, key, file: UploadFile, first: bytes):
+        upload = await client.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            ContentType=file.content_type or "application/octet-stream",
+        )
+        upload_id = upload["UploadId"]
+        parts = []
+        try:
+            async for number, part in _numbered_parts(file, first):
+                response = await client.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=part,
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": number})
+            await client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            await client.abort_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise
+
+    async def delete(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        client = await self.client()
+        try:
+            await client.delete_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as ce:
+            logger.warning(f"S3 delete failed for {key}: {ce}")
+            return False
+
+    async def delete_many(self, keys: list[str]) -> list[str]:
+        from botocore.exceptions import ClientError
+
+        client = await self.client()
+        failed: list[str] = []
+        for start in range(0, len(keys), 1000):
+            end = start + 1000
+            batch = keys[start:end]
+            try:
+                response = await client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+                )
+            except ClientError as ce:
+                logger.warning(f"S3 batch delete of {len(batch)} keys failed: {ce}")
+                failed.extend(batch)
+                continue
+            failed.extend(error["Key"] for error in response.get("Errors", []))
+        return failed
+
+    def presign(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        return self.store.presign(key, expires)
+
+    async def head(self, key: str) -> Optional[ObjectInfo]:
+        from botocore.exceptions import ClientError
+
+        client = await self.client()
+        try:
+            response = await client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as ce:
+            if ce.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        return ObjectInfo(
+            key=key,
+            size=response["ContentLength"],
+            content_type=response.get("ContentType"),
+            etag=response.get("ETag"),
+        )
+
+    async def open_range(
+        self, key: str, byte_range: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        client = await self.client()
+        params = {"Bucket": self.bucket, "Key": key}
+        if byte_range:
+            params["Range"] = byte_range
+        response = await client.get_object(**params)
+        async with response["Body"] as body:
+            while chunk := await body.read(CHUNK_SIZE):
+                yield chunk
+
+    async def warm_up(self) -> None:
+        client = await self.client()
+        await client.head_bucket(Bucket=self.bucket)
+
+    async def close(self) -> None:
+        if self._client_cm is not None:
+            await self._client_cm.__aexit__(None, None, None)
+            self._client = self._client_cm = None
+
+
+@dataclass
+class _StoredObject:
+    data: bytes
+    content_type: Optional[str]
+
+
+class MemoryStorage(StorageBackend):
+    """Objects kept in a dict, for tests and local runs without S3."""
+
+    def __init__(
+        self,
+        base_url: str = "memory://",
+        key_factory: Callable[[int, str], str] = make_key,
+        url_suffix: str = "",
+    ):
+        self.base_url = base_url
+        self.key_factory = key_factory
+        self.url_suffix = url_suffix
+        self.objects: dict[str, _StoredObject] = {}
+        self._lock = threading.Lock()
+
+    async def upload(self, file: UploadFile, project_id: int) -> str:
+        key = self.key_factory(project_id, file.filename or "unnamed")
+        data = await file.read()
+        with self._lock:
+            self.objects[key] = _StoredObject(data, file.content_type)
+        return key
+
+    async def delete(self, key: str) -> bool:
+        with self._lock:
+            self.objects.pop(key, None)
+        return True
+
+    async def delete_many(self, keys: list[str]) -> list[str]:
+        with self._lock:
+            for key in keys:
+                self.objects.pop(key, None)
+        return []
+
+    def presign(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        return f"{self.base_url}{key}{self.url_suffix}"
+
+    async def head(self, key: str) -> Optional[ObjectInfo]:
+        stored = self.objects.get(key)
+        if stored is None:
+            return None
+        return ObjectInfo(
+            key=key, size=len(stored.data), content_type=stored.content_type
+        )
+
+    async def open_range(
+        self, key: str, byte_range: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        stored = self.objects[key]
+        start, stop = parse_range(byte_range, len(stored.data))
+        for offset in range(start, stop, CHUNK_SIZE):
+            end = min(offset + CHUNK_SIZE, stop)
+            yield stored.data[offset:end]
+
+
+async def delete_stored_objects(storage: StorageBackend, keys: list[str]) -> None:
+    """Remove the objects of rows already deleted, e.g. as a background task;
+    an object that survives is an orphan to log, not an error to report."""
+    failed = await storage.delete_many(keys)
+    if failed:
+        logger.warning(
+            f"{len(failed)} of {len(keys)} deleted documents left objects behind, "
+            f"e.g. {failed[:5]}"
+        )
+
+
+def create_storage(kind: Optional[str] = None) -> StorageBackend:
+    kind = kind or settings.STORAGE_BACKEND
+    if kind == "s3":
+        return ThreadedS3Storage()
+    if kind == "s3-async":
+        return AioS3Storage()
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "filesystem":
+        from .fs_storage import FilesystemStorage
+
+        return FilesystemStorage(
+            settings.STORAGE_ROOT,
+            signing_key=settings.STORAGE_SIGNING_KEY or settings.JWT_KEY,
+            public_base_url=settings.STORAGE_PUBLIC_BASE_URL,
+            accel_redirect_prefix=settings.STORAGE_ACCEL_REDIRECT_PREFIX,
+        )
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {kind!r}")
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """FastAPI dependency returning the configured backend; tests override it"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def storage_stats() -> dict:
+    """stats of the backend in use; empty until a request has created it"""
+    return _storage.stats() if _storage is not None else {}
+
+
+async def close_storage() -> None:
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
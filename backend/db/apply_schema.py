@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+import sqlite3
+import time
+
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import declarative_base
 from backend.core.settings import settings
+from backend.core.admission import pool_wait
 
 
 if not settings.DATABASE_URL:
@@ -12,7 +16,33 @@ if not DATABASE_URL_STR:
     raise ValueError("DATABASE_URL becomes empty string in apply_schema.py")
 
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, echo=False)
+# SQLite connections are handed between the threadpool workers serving requests
+connect_args = (
+    {"check_same_thread": False} if DATABASE_URL_STR.startswith("sqlite") else {}
+)
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record) -> None:
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+
+
+def enable_sqlite_foreign_keys(engine: Engine) -> None:
+    """SQLite ignores foreign keys, ON DELETE CASCADE included, unless asked.
+
+    Only for engines serving the application: alembic's batch mode rebuilds a
+    table by copying it and dropping the original, and with foreign keys on
+    that drop would cascade to every child row.
+    """
+    event.listen(engine, "connect", _enable_sqlite_foreign_keys)
+
+
+engine = create_engine(
+    settings.DATABASE_URL, pool_pre_ping=True, echo=False, connect_args=connect_args
+)
+enable_sqlite_foreign_keys(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=True, bind=engine)
 
@@ -22,6 +52,13 @@ Base = declarative_base()
 def get_db():
     db = SessionLocal()
     try:
+        # check the connection out up front so admission control sees how long
+        # requests wait for the pool
+        started = time.perf_counter()
+        try:
+            db.connection()
+        finally:
+            pool_wait.record(time.perf_counter() - started)
         yield db
     finally:
         db.close()
@@ -0,0 +1,275 @@
+"""Change feed behind GET /sync.
+
+Every write appends rows to change_log in its own transaction, so a client
+that remembers the position of the last row it saw only has to read what came
+after it. Positions are (txid, seq). On PostgreSQL sequence values are handed
+out at insert time but become visible at commit, possibly out of order, so a
+reader only takes rows of transactions older than every transaction still
+running (the snapshot xmin); later ones are picked up on the next sync. SQLite
+runs one writer at a time, so seq alone orders the feed there and txid is 0.
+
+Once a transaction commits, its rows are also published to the event hub,
+which notifies the listeners of GET /events.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import Select, event, func, insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+import backend.models.sql_models as db_models
+from backend.core.events import event_hub
+from backend.db.queries import accessible_project_ids, model_columns
+from backend.models.models import ProjectOut
+
+PROJECT, PARTICIPANT, DOCUMENT = "project", "participant", "document"
+# grant: the user just gained access to the whole project
+UPSERT, DELETE, GRANT = "upsert", "delete", "grant"
+
+_PENDING_KEY = "pending_change_events"
+
+START = (-1, 0)
+MAX_SEQ = 2**63 - 1
+
+
+def change(
+    project_id: int,
+    entity: str,
+    entity_id: int,
+    op: str = UPSERT,
+    user_id: Optional[int] = None,
+) -> dict:
+    return {
+        "project_id": project_id,
+        "entity": entity,
+        "entity_id": entity_id,
+        "op": op,
+        "user_id": user_id,
+    }
+
+
+def record_changes(db: Session, changes: Iterable[dict]) -> None:
+    """Append changes (see change()) to the feed, in the caller's transaction."""
+    changes = list(changes)
+    if not changes:
+        return
+    stmt = insert(db_models.ChangeLog)
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = stmt.values(txid=func.txid_current())
+    db.execute(stmt, changes)
+    db.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_changes(session: Session) -> None:
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        event_hub.publish(
+            [
+                {
+                    "entity": c["entity"],
+                    "op": c["op"],
+                    "project_id": c["project_id"],
+                    "id": c["entity_id"],
+                    "user_id": c["user_id"],
+                }
+                for c in changes
+            ]
+        )
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changes(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def record_project_deleted(db: Session, project: db_models.Project) -> None:
+    """A tombstone for the owner and every participant, who lose access to the
+    project and so would not see a project-wide row."""
+    participant_ids = db.scalars(
+        select(db_models.ProjectParticipant.user_id).where(
+            db_models.ProjectParticipant.project_id == project.id
+        )
+    ).all()
+    record_changes(
+        db,
+        (
+            change(project.id, PROJECT, project.id, DELETE, user_id=user_id)
+            for user_id in [project.owner_id, *participant_ids]
+        ),
+    )
+
+
+def encode_token(position: tuple[int, int]) -> str:
+    return f"{position[0]}.{position[1]}"
+
+
+def decode_token(token: Optional[str]) -> tuple[int, int]:
+    """position after which to read; ValueError if invalid"""
+    if not token:
+        return START
+    txid, _, seq = token.partition(".")
+    return int(txid), int(seq)
+
+
+def feed_head(db: Session) -> tuple[int, int]:
+    """The furthest position a reader may move to now: every row up to it is
+    committed, and every row committed later lies beyond it."""
+    log = db_models.ChangeLog
+    if db.get_bind().dialect.name == "postgresql":
+        xmin = db.scalar(select(func.txid_snapshot_xmin(func.txid_current_snapshot())))
+        return xmin - 1, MAX_SEQ
+    return 0, db.scalar(select(func.coalesce(func.max(log.seq), 0)))
+
+
+def changes_stmt(
+    user_id: int, after: tuple[int, int], head: tuple[int, int], limit: int
+) -> Select:
+    log = db_models.ChangeLog
+    position = tuple_(log.txid, log.seq)
+    return (
+        select(log.txid, log.seq, log.project_id, log.entity, log.entity_id, log.op)
+        .where(
+            position > tuple_(*after),
+            position <= tuple_(*head),
+            or_(
+                log.user_id == user_id,
+                log.user_id.is_(None)
+                & log.project_id.in_(accessible_project_ids(user_id)),
+            ),
+        )
+        .order_by(log.txid, log.seq)
+        .limit(limit)
+    )
+
+
+def _project_rows(db: Session, user_id: int, project_ids: set[int]) -> list[dict]:
+    project = db_models.Project
+    stmt = select(*model_columns(ProjectOut, project)).where(
+        project.id.in_(sorted(project_ids)),
+        project.id.in_(accessible_project_ids(user_id)),
+    )
+    return [dict(row._mapping) for row in db.execute(stmt.order_by(project.id))]
+
+
+def _participant_rows(db: Session, where) -> list[dict]:
+    participants = db_models.ProjectParticipant
+    stmt = (
+        select(
+            participants.project_id,
+            participants.user_id,
+            db_models.User.login,
+            participants.role,
+            participants.added_at,
+        )
+        .join(db_models.User, db_models.User.id == participants.user_id)
+        .where(where)
+        .order_by(participants.project_id, participants.user_id)
+    )
+    return [dict(row._mapping) for row in db.execute(stmt)]
+
+
+def _document_rows(db: Session, where) -> list[dict]:
+    documents = db_models.Document
+    stmt = (
+        select(
+            documents.id,
+            documents.project_id,
+            documents.file_name,
+            documents.file_type,
+            documents.uploader_id,
+            documents.created_at,
+            documents.updated_at,
+        )
+        .where(where)
+        .order_by(documents.id)
+    )
+    return [dict(row._mapping) for row in db.execute(stmt)]
+
+
+def read_changes(db: Session, user_id: int, after: tuple[int, int], limit: int) -> dict:
+    """Current state of everything the user's next `limit` feed rows touch.
+
+    Several changes of one object collapse into its current row, or into a
+    tombstone when it is gone or no longer accessible. The work and the
+    response grow with the number of changes, not with the workspace, except
+    for a grant, which brings the whole newly shared project.
+    """
+    head = feed_head(db)
+    rows = db.execute(changes_stmt(user_id, after, head, limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest: dict[tuple, tuple[str, int]] = {}
+    granted: set[int] = set()
+    for row in rows:
+        if row.entity == PARTICIPANT:
+            key = (PARTICIPANT, row.project_id, row.entity_id)
+        else:
+            key = (row.entity, row.entity_id)
+        latest[key] = (row.op, row.project_id)
+        if row.op == GRANT:
+            granted.add(row.project_id)
+
+    wanted = {PROJECT: set(granted), PARTICIPANT: set(), DOCUMENT: set()}
+    deleted = []
+    for key, (op, project_id) in latest.items():
+        if op == DELETE:
+            deleted.append({"entity": key[0], "id": key[-1], "project_id": project_id})
+        else:
+            wanted[key[0]].add(key[1:] if key[0] == PARTICIPANT else key[1])
+
+    participants = db_models.ProjectParticipant
+    documents = db_models.Document
+    visible = accessible_project_ids(user_id)
+    projects = _project_rows(db, user_id, wanted[PROJECT]) if wanted[PROJECT] else []
+    participant_rows = []
+    if wanted[PARTICIPANT] or granted:
+        participant_rows = _participant_rows(
+            db,
+            participants.project_id.in_(visible)
+            & or_(
+                tuple_(participants.project_id, participants.user_id).in_(
+                    sorted(wanted[PARTICIPANT])
+                ),
+                participants.project_id.in_(sorted(granted)),
+            ),
+        )
+    document_rows = []
+    if wanted[DOCUMENT] or granted:
+        document_rows = _document_rows(
+            db,
+            documents.project_id.in_(visible)
+            & or_(
+                documents.id.in_(sorted(wanted[DOCUMENT])),
+                documents.project_id.in_(sorted(granted)),
+            ),
+        )
+
+    # wanted but not found: deleted since, or out of reach
+    found_projects = {p["id"] for p in projects}
+    found_participants = {(p["project_id"], p["user_id"]) for p in participant_rows}
+    found_documents = {d["id"] for d in document_rows}
+    for key, (op, project_id) in latest.items():
+        entity, entity_id = key[0], key[-1]
+        missing = (
+            (entity == PROJECT and entity_id not in found_projects)
+            or (entity == PARTICIPANT and key[1:] not in found_participants)
+            or (entity == DOCUMENT and entity_id not in found_documents)
+        )
+        if op != DELETE and missing:
+            deleted.append(
+                {"entity": entity, "id": entity_id, "project_id": project_id}
+            )
+
+    # once caught up, skip past the rows of others too
+    position = (rows[-1].txid, rows[-1].seq) if has_more else max(head, after)
+    return {
+        "projects": projects,
+        "participants": participant_rows,
+        "documents": document_rows,
+        "deleted": deleted,
+        "next_token": encode_token(position),
+        "has_more": has_more,
+    }
@@ -0,0 +1,224 @@
+"""Schema changes that keep large tables online, for alembic migrations.
+
+Generate a migration that uses them with `alembic -x online revision -m ...`.
+On PostgreSQL:
+
+- indexes are built and dropped CONCURRENTLY, outside the migration's
+  transaction, so writes go on while they build;
+- a column is added nullable, which only touches the catalog, then filled by
+  backfill() in short transactions that pause between batches and record
+  their progress, so an interrupted backfill resumes where it stopped;
+- NOT NULL is added through a NOT VALID check constraint, validated without
+  blocking writes.
+
+Everything else runs under the lock and statement timeouts set by env.py, so
+a migration that cannot get its lock fails within seconds instead of queueing
+traffic behind it; rerun it later. Other dialects get the plain operations.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from backend.core.settings import settings
+
+logger = logging.getLogger("alembic.online")
+
+CHECKPOINTS = sa.Table(
+    "online_migration_checkpoints",
+    sa.MetaData(),
+    sa.Column("name", sa.String(255), primary_key=True),
+    sa.Column("last_id", sa.BigInteger, nullable=False),
+    sa.Column(
+        "updated_at",
+        sa.DateTime(timezone=True),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+)
+
+
+def session_timeouts() -> list[str]:
+    """SET statements for the migration connection (PostgreSQL)"""
+    return [
+        f"SET lock_timeout = '{settings.MIGRATION_LOCK_TIMEOUT}'",
+        f"SET statement_timeout = '{settings.MIGRATION_STATEMENT_TIMEOUT}'",
+    ]
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _offline() -> bool:
+    return op.get_context().as_sql
+
+
+@contextmanager
+def _without_statement_timeout():
+    """for builds and validations expected to outlast the statement timeout;
+    they take no lock that blocks writes, and lock_timeout still applies"""
+    op.execute("SET statement_timeout = 0")
+    try:
+        yield
+    finally:
+        op.execute(f"SET statement_timeout = '{settings.MIGRATION_STATEMENT_TIMEOUT}'")
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    *,
+    unique: bool = False,
+    using: Optional[str] = None,
+    where: Optional[str] = None,
+) -> None:
+    """columns are SQL, e.g. "file_name gin_trgm_ops" with using="GIN" """
+    if not _is_postgres():
+        op.create_index(
+            name,
+            table,
+            list(columns),
+            unique=unique,
+            sqlite_where=sa.text(where) if where else None,
+        )
+        return
+
+    ddl = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS "
+        f"{name} ON {table}"
+        + (f" USING {using}" if using else "")
+        + f" ({', '.join(columns)})"
+        + (f" WHERE {where}" if where else "")
+    )
+    with op.get_context().autocommit_block(), _without_statement_timeout():
+        # a failed or cancelled build leaves an invalid index behind, which
+        # IF NOT EXISTS would then take for the finished one
+        if not _offline() and op.get_bind().scalar(
+            sa.text(
+                "SELECT NOT indisvalid FROM pg_index "
+                "WHERE indexrelid = to_regclass(:name)"
+            ),
+            {"name": name},
+        ):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        op.execute(ddl)
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    if not _is_postgres():
+        op.drop_index(name, table_name=table)
+        return
+    with op.get_context().autocommit_block(), _without_statement_timeout():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def add_column(table: str, column: sa.Column) -> None:
+    """Add a column without rewriting the table: nullable, or with a constant
+    server default (PostgreSQL 11+ stores it in the catalog). For a required
+    column, add it nullable, backfill() it, then set_not_null()."""
+    if not column.nullable and column.server_default is None:
+        raise ValueError(
+            f"{table}.{column.name}: add it nullable, backfill, then set_not_null"
+        )
+    op.add_column(table, column)
+
+
+def _save_checkpoint(connection, name: str, last_id: int) -> None:
+    updated = connection.execute(
+        CHECKPOINTS.update()
+        .where(CHECKPOINTS.c.name == name)
+        .values(last_id=last_id, updated_at=sa.func.now())
+    )
+    if not updated.rowcount:
+        connection.execute(CHECKPOINTS.insert().values(name=name, last_id=last_id))
+
+
+def backfill(
+    table: str,
+    values: str,
+    *,
+    where: Optional[str] = None,
+    key: str = "id",
+    batch_size: Optional[int] = None,
+    throttle: Optional[float] = None,
+    checkpoint: Optional[str] = None,
+) -> int:
+    """Run `UPDATE table SET values [WHERE where]` over consecutive ranges of
+    the integer key, each in its own short transaction, and return the number
+    of rows updated.
+
+    After each batch it sleeps `throttle` times as long as the batch took, so
+    it keeps the database at most 1 / (1 + throttle) busy and slows down by
+    itself when the database is loaded. The last finished range is recorded
+    under `checkpoint` (default: table and values) and a rerun starts after
+    it. Batches may run twice after a crash, so the update must be idempotent,
+    typically `where="col IS NULL"`. Rows written after the backfill started
+    are not visited: the application must already be setting the column.
+    """
+    batch_size = batch_size or settings.MIGRATION_BACKFILL_BATCH_SIZE
+    throttle = settings.MIGRATION_BACKFILL_THROTTLE if throttle is None else throttle
+    checkpoint = checkpoint or f"{table}: {values}"[:255]
+    condition = f" AND ({where})" if where else ""
+
+    if _offline():
+        # a script for offline review cannot loop; emit the whole update
+        op.execute(
+            f"UPDATE {table} SET {values}" + (f" WHERE {where}" if where else "")
+        )
+        return 0
+
+    update = sa.text(
+        f"UPDATE {table} SET {values} WHERE {key} > :low AND {key} <= :high{condition}"
+    )
+    total = 0
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        CHECKPOINTS.create(connection, checkfirst=True)
+        low = connection.scalar(
+            sa.select(CHECKPOINTS.c.last_id).where(CHECKPOINTS.c.name == checkpoint)
+        )
+        if low is None:
+            low = connection.scalar(sa.text(f"SELECT min({key}) - 1 FROM {table}"))
+        else:
+            logger.info(f"Resuming backfill {checkpoint!r} after {key} {low}")
+        stop = connection.scalar(sa.text(f"SELECT max({key}) FROM {table}"))
+
+        while low is not None and stop is not None and low < stop:
+            upper = min(low + batch_size, stop)
+            started = time.monotonic()
+            # autocommit: each batch holds its row locks only for itself
+            total += connection.execute(update, {"low": low, "high": upper}).rowcount
+            _save_checkpoint(connection, checkpoint, upper)
+            elapsed = time.monotonic() - started
+            logger.info(f"Backfill {checkpoint!r}: {key} up to {upper} of {stop}")
+            low = upper
+            time.sleep(elapsed * throttle)
+
+        connection.execute(CHECKPOINTS.delete().where(CHECKPOINTS.c.name == checkpoint))
+    return total
+
+
+def set_not_null(table: str, column: str) -> None:
+    """NOT NULL on a filled column; on PostgreSQL the full check runs as a
+    constraint validation, which does not block writes, and SET NOT NULL then
+    trusts it (12+)."""
+    if not _is_postgres():
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, nullable=False)
+        return
+
+    constraint = f"{table}_{column}_not_null"
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {constraint} "
+        f"CHECK ({column} IS NOT NULL) NOT VALID"
+    )
+    with op.get_context().autocommit_block(), _without_statement_timeout():
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+    op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}")
@@ -0,0 +1,131 @@
+from typing import Iterable
+
+from pydantic import BaseModel
+from sqlalchemy import Result, Select, func, or_, select
+
+import backend.models.sql_models as db_models
+from backend.models.models import DocumentList, ProjectOut
+
+
+def model_columns(model: type[BaseModel], table, exclude: Iterable[str] = ()):
+    """table columns named and ordered like the fields of the output model"""
+    return [getattr(table, name) for name in model.model_fields if name not in exclude]
+
+
+def model_dict(model: type[BaseModel], obj) -> dict:
+    """attributes of an ORM object named and ordered like the output model"""
+    return {name: getattr(obj, name) for name in model.model_fields}
+
+
+def rows_as_dicts(result: Result) -> list[dict]:
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def accessible_projects_filter(user_id: int):
+    """projects the user owns or participates in"""
+    participant_projects = select(db_models.ProjectParticipant.project_id).where(
+        db_models.ProjectParticipant.user_id == user_id
+    )
+    return or_(
+        db_models.Project.owner_id == user_id,
+        db_models.Project.id.in_(participant_projects),
+    )
+
+
+def accessible_project_ids(user_id: int) -> Select:
+    return select(db_models.Project.id).where(accessible_projects_filter(user_id))
+
+
+def accessible_projects_stmt(user_id: int) -> Select:
+    """accessible projects as plain ProjectOut columns"""
+    return (
+        select(*model_columns(ProjectOut, db_models.Project))
+        .where(accessible_projects_filter(user_id))
+        .order_by(db_models.Project.id)
+    )
+
+
+def accessible_projects_version_stmt(user_id: int) -> Select:
+    """cheap validators that change whenever the user's project list changes.
+
+    Every change of the user's memberships (a project created, shared with
+    them or deleted) appends change_log rows addressed to them, and the log is
+    append-only, so their count only grows; while it stands still the set of
+    projects is the same, and any write to one of them raises the sum of
+    their versions.
+    """
+    membership_changes = (
+        select(func.count())
+        .select_from(db_models.ChangeLog)
+        .where(db_models.ChangeLog.user_id == user_id)
+        .scalar_subquery()
+    )
+    return select(
+        membership_changes, func.coalesce(func.sum(db_models.Project.version), 0)
+    ).where(accessible_projects_filter(user_id))
+
+
+def insert_participants_stmt(dialect_name: str, rows: list[dict]):
+    """one multi-row INSERT that skips existing memberships and returns the
+    user ids actually added"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported on {dialect_name}")
+
+    participants = db_models.ProjectParticipant
+    return (
+        insert(participants)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["user_id", "project_id"])
+        .returning(participants.user_id)
+    )
+
+
+def project_documents_stmt(project_id: int) -> Select:
+    """DocumentList columns (minus the computed download_url) plus the s3 key"""
+    return (
+        select(
+            *model_columns(DocumentList, db_models.Document, exclude={"download_url"}),
+            db_models.Document.s3_key,
+        )
+        .where(db_models.Document.project_id == project_id)
+        .order_by(db_models.Document.created_at.desc(), db_models.Document.id.desc())
+    )
+
+
+def export_participants_stmt(user_id: int) -> Select:
+    participants = db_models.ProjectParticipant
+    return (
+        select(
+            participants.project_id,
+            participants.user_id,
+            db_models.User.login,
+            participants.role,
+            participants.added_at,
+        )
+        .join(db_models.User, db_models.User.id == participants.user_id)
+        .where(participants.project_id.in_(accessible_project_ids(user_id)))
+        .order_by(participants.project_id, participants.user_id)
+    )
+
+
+def export_documents_stmt(user_id: int) -> Select:
+    """document metadata only: keys and download URLs are not exported"""
+    documents = db_models.Document
+    return (
+        select(
+            documents.id,
+            documents.project_id,
+            documents.file_name,
+            documents.file_type,
+            documents.uploader_id,
+            documents.created_at,
+            documents.updated_at,
+        )
+        .where(documents.project_id.in_(accessible_project_ids(user_id)))
+        .order_by(documents.project_id, documents.created_at, documents.id)
+    )
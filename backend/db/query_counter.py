@@ -0,0 +1,131 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from backend.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """SQL statements executed while serving one request."""
+
+    label: str = ""
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    lazy_loads: list[str] = field(default_factory=list)
+
+    def repeated(self, min_repeats: int = 2) -> dict[str, int]:
+        """identical statements executed at least min_repeats times (N+1 pattern)"""
+        return {sql: n for sql, n in self.statements.most_common() if n >= min_repeats}
+
+    def summary(self) -> str:
+        parts = [f"{self.label}: {self.count} queries in {self.duration * 1000:.1f}ms"]
+        for sql, n in self.repeated().items():
+            parts.append(f"  x{n} {' '.join(sql.split())[:200]}")
+        for lazy in self.lazy_loads:
+            parts.append(f"  lazy load {lazy}")
+        return "\n".join(parts)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+# callbacks receiving the stats of every finished request (used by the test suite)
+_observers: list[Callable[[QueryStats], None]] = []
+
+
+def add_observer(callback: Callable[[QueryStats], None]) -> None:
+    _observers.append(callback)
+
+
+def remove_observer(callback: Callable[[QueryStats], None]) -> None:
+    _observers.remove(callback)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - context._query_start
+    stats.statements[statement] += 1
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_orm_execute(orm_execute_state: ORMExecuteState):
+    stats = _current_stats.get()
+    if (
+        stats is None
+        or not orm_execute_state.is_relationship_load
+        or orm_execute_state.lazy_loaded_from is None
+    ):
+        return
+    owner = orm_execute_state.lazy_loaded_from.class_.__name__
+    path = orm_execute_state.loader_strategy_path
+    attribute = path.natural_path[-1].key if path else "?"
+    stats.lazy_loads.append(f"{owner}.{attribute}")
+
+
+@contextmanager
+def track_queries(label: str = "") -> Iterator[QueryStats]:
+    """count the statements issued inside the block, e.g. in scripts or tests"""
+    stats = QueryStats(label=label)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def report(stats: QueryStats) -> None:
+    for callback in list(_observers):
+        callback(stats)
+
+    repeated = stats.repeated(settings.SQL_REPEATED_QUERY_THRESHOLD)
+    if stats.count > settings.SQL_QUERY_WARN_THRESHOLD or repeated:
+        logger.warning("Query budget exceeded\n%s", stats.summary())
+    elif stats.lazy_loads:
+        logger.info("Lazy loads during request\n%s", stats.summary())
+
+
+class QueryCounterMiddleware:
+    """Counts the statements each HTTP request issues and reports them when done."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_QUERY_TRACKING:
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                route = scope.get("route")
+                path = getattr(route, "path", scope["path"])
+                stats.label = f"{scope['method']} {path}"
+                report(stats)
@@ -0,0 +1,159 @@
+import base64
+from typing import Optional
+
+import orjson
+from sqlalchemy import (
+    Float,
+    Select,
+    cast,
+    column,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    tuple_,
+)
+
+import backend.models.sql_models as db_models
+from backend.db.queries import (
+    accessible_project_ids,
+    accessible_projects_filter,
+    model_columns,
+)
+from backend.models.models import ProjectOut
+
+# FTS5 trigrams find only patterns of at least three characters in their
+# index; shorter ones would read every row of documents_fts
+SQLITE_MIN_DOCUMENT_QUERY = 3
+
+# name matches count ten times as much as description matches, like the A/B
+# weights of the PostgreSQL search_vector
+FTS5_WEIGHTS = (10.0, 1.0)
+
+
+def encode_cursor(rank: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([rank, row_id])).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """(rank, id) of the last hit on the previous page; ValueError if invalid"""
+    try:
+        rank, row_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(rank, (int, float)) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return float(rank), row_id
+
+
+def fts5_query(q: str) -> Optional[str]:
+    """every word quoted, so input cannot use the FTS5 query syntax; the
+    words are ANDed like websearch_to_tsquery does"""
+    words = q.split()
+    if not words:
+        return None
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def project_search_stmt(
+    dialect_name: str,
+    user_id: int,
+    q: str,
+    limit: int,
+    after: Optional[tuple[float, int]] = None,
+) -> Select:
+    """Accessible projects matching q as ProjectOut columns plus a rank, best
+    first. Pages are keyed on (rank, id) so deep pages cost the same as the
+    first one."""
+    project = db_models.Project
+    columns = model_columns(ProjectOut, project)
+
+    if dialect_name == "postgresql":
+        query = func.websearch_to_tsquery("english", q)
+        vector = literal_column("projects.search_vector")
+        # real (float4) otherwise: psycopg2 reads it back rounded, and the
+        # cursor's rank would then never equal the column in the keyset
+        # comparison, splitting runs of tied ranks across pages wrongly
+        rank = cast(func.ts_rank_cd(vector, query), Float(53))
+        stmt = select(*columns, rank.label("rank")).where(vector.op("@@")(query))
+    elif dialect_name == "sqlite":
+        fts = table("projects_fts", column("rowid"))
+        fts_table = literal_column("projects_fts")
+        # bm25 is lower for better matches
+        rank = -func.bm25(fts_table, *FTS5_WEIGHTS)
+        stmt = (
+            select(*columns, rank.label("rank"))
+            .select_from(fts)
+            .join(project, project.id == fts.c.rowid)
+            .where(fts_table.op("MATCH")(fts5_query(q)))
+        )
+    else:
+        raise NotImplementedError(
+            f"Full-text search is not supported on {dialect_name}"
+        )
+
+    stmt = stmt.where(accessible_projects_filter(user_id))
+    if after is not None:
+        stmt = stmt.where(tuple_(rank, project.id) < tuple_(*after))
+    return stmt.order_by(rank.desc(), project.id.desc()).limit(limit)
+
+
+def like_pattern(q: str) -> str:
+    """substring pattern with the LIKE wildcards in q escaped by backslash"""
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def document_search_stmt(
+    dialect_name: str,
+    user_id: int,
+    q: str,
+    limit: int,
+    after: Optional[tuple[float, int]] = None,
+) -> Select:
+    """Documents in accessible projects whose file name contains q, or on
+    PostgreSQL also resembles it, with a rank, best first, keyed on (rank, id).
+
+    Returns the s3 key for the caller to presign; DocumentList columns
+    otherwise."""
+    document = db_models.Document
+    columns = [
+        document.id,
+        document.project_id,
+        document.file_name,
+        document.file_type,
+        document.created_at,
+        document.s3_key,
+    ]
+
+    if dialect_name == "postgresql":
+        # both conditions are served by the trigram GIN index; the real
+        # similarity is cast like the project rank, names often tie exactly
+        rank = cast(func.word_similarity(q, document.file_name), Float(53))
+        stmt = select(*columns, rank.label("rank")).where(
+            or_(
+                document.file_name.ilike(like_pattern(q), escape="\\"),
+                literal(q).op("<%")(document.file_name),
+            )
+        )
+    elif dialect_name == "sqlite":
+        fts = table("documents_fts", column("rowid"), column("file_name"))
+        # how much of the name the match covers
+        rank = cast(func.length(q), Float) / func.length(document.file_name)
+        # the trigram index answers the LIKE only as a set of rowids; joined
+        # row by row, every document of the projects is checked instead
+        matches = select(fts.c.rowid).where(fts.c.file_name.like(f"%{q}%"))
+        stmt = select(*columns, rank.label("rank")).where(document.id.in_(matches))
+        if "%" in q or "_" in q:
+            # FTS5 only indexes LIKE without ESCAPE: let the wildcards through
+            # and check the candidates for the literal substring
+            stmt = stmt.where(func.instr(func.lower(document.file_name), q.lower()) > 0)
+    else:
+        raise NotImplementedError(f"Filename search is not supported on {dialect_name}")
+
+    stmt = stmt.where(document.project_id.in_(accessible_project_ids(user_id)))
+    if after is not None:
+        stmt = stmt.where(tuple_(rank, document.id) < tuple_(*after))
+    return stmt.order_by(rank.desc(), document.id.desc()).limit(limit)
@@ -0,0 +1,52 @@
+from typing import Iterable
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+import backend.models.sql_models as db_models
+from backend.core.cache import response_cache
+
+_CHANGED_KEY = "changed_project_ids"
+
+
+def mark_project_changed(db: Session, project_id: int) -> None:
+    """Drop the project's cached responses once the current transaction commits."""
+    db.info.setdefault(_CHANGED_KEY, set()).add(project_id)
+
+
+def bump_project_version(db: Session, project_id: int) -> None:
+    """Mark the project or its documents as changed, in the caller's transaction.
+
+    updated_at is left alone: it describes the project row itself, while the
+    version also moves when documents are added, replaced or removed.
+    """
+    bump_project_versions(db, [project_id])
+
+
+def bump_project_versions(db: Session, project_ids: Iterable[int]) -> None:
+    """bump_project_version() for several projects in one UPDATE"""
+    project_ids = sorted(set(project_ids))
+    if not project_ids:
+        return
+    db.execute(
+        update(db_models.Project)
+        .where(db_models.Project.id.in_(project_ids))
+        .values(
+            version=db_models.Project.version + 1,
+            updated_at=db_models.Project.updated_at,
+        )
+    )
+    for project_id in project_ids:
+        mark_project_changed(db, project_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_projects(session: Session) -> None:
+    for project_id in session.info.pop(_CHANGED_KEY, ()):
+        response_cache.invalidate_project(project_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_projects(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_CHANGED_KEY, None)
@@ -3,10 +3,26 @@ from backend.routes import projects
 from backend.routes import auth
 from backend.routes import users
 from backend.routes import documents
-
-app = FastAPI()
+from backend.routes import files
+from backend.routes import search
+from backend.routes import sync
+from backend.routes import events
+from backend.db.query_counter import QueryCounterMiddleware
+from backend.core.startup import lifespan
+from backend.core.admission import AdmissionControlMiddleware
+from backend.core.idempotency import IdempotencyMiddleware
+from backend.core.storage import storage_stats
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(QueryCounterMiddleware)
+# inside admission control, so shed requests never claim their key
+app.add_middleware(IdempotencyMiddleware)
+# added last so it runs first and rejects before anything else does work
+app.add_middleware(AdmissionControlMiddleware)
 
 api_router = APIRouter()
+# before the projects router, whose /projects/{project_id} would match first
+api_router.include_router(search.router, tags=["Search"])
 api_router.include_router(projects.router, prefix="/projects", tags=["Projects"])
 
 api_router.include_router(auth.router, tags=["Authentication"])
@@ -15,6 +31,12 @@ api_router.include_router(users.router, prefix="/users", tags=["Oauth2scheme"])
 
 api_router.include_router(documents.router, tags=["Documents"])
 
+api_router.include_router(files.router, tags=["Documents"])
+
+api_router.include_router(sync.router, tags=["Sync"])
+
+api_router.include_router(events.router, tags=["Events"])
+
 app.include_router(api_router)
 
 
@@ -25,4 +47,5 @@ async def read_root():
 
 @app.get("/ping")
 async def get_ping():
-    return {"message": "pong"}
+    # e.g. the S3 pool: calls in flight against its size, connections discarded
+    return {"message": "pong", **storage_stats()}
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
 import re
-from typing import Optional
+from typing import Literal, Optional
 
 
 class ProjectCreate(BaseModel):
@@ -19,6 +19,15 @@ class ProjectOut(ProjectCreate):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProjectSearchHit(ProjectOut):
+    rank: float
+
+
+class ProjectSearchPage(BaseModel):
+    items: list[ProjectSearchHit]
+    next_cursor: Optional[str] = None
+
+
 class UserBase(BaseModel):
     login: str = Field(
         ..., min_length=3, max_length=50, description="Username (3-50characters)"
@@ -48,6 +57,30 @@ class UserCreate(UserBase):
     model_config = ConfigDict(extra="forbid")
 
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str = Field(
+        ...,
+        min_length=8,
+        max_length=100,
+        description="Password(8-100 characters, requires A-Z, a-z, 0-9)",
+    )
+
+    @field_validator("new_password")
+    @classmethod
+    def new_password_validator(cls, value):
+        if not re.search(r"[a-z]", value):
+            raise ValueError("Password must contain a lowercase letter")
+        if not re.search(r"[A-Z]", value):
+            raise ValueError("Password must contain an uppercase letter")
+        if not re.search(r"\d", value):
+            raise ValueError("Password must contain a digit")
+
+        return value
+
+    model_config = ConfigDict(extra="forbid")
+
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -68,6 +101,39 @@ class TokenData(BaseModel):
     subject: str | None = None
 
 
+class ParticipantInvite(BaseModel):
+    login: str
+    role: str = Field("participant", min_length=1, max_length=50)
+    model_config = ConfigDict(extra="forbid")
+
+    @field_validator("role")
+    @classmethod
+    def role_is_not_owner(cls, value):
+        if value == "owner":
+            raise ValueError("Ownership cannot be granted by invitation")
+        return value
+
+
+class BatchInvite(BaseModel):
+    participants: list[ParticipantInvite] = Field(..., min_length=1, max_length=1000)
+    model_config = ConfigDict(extra="forbid")
+
+
+class InviteResult(BaseModel):
+    login: str
+    status: Literal["added", "already_present", "unknown"]
+
+
+class BatchDocumentDelete(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=1000)
+    model_config = ConfigDict(extra="forbid")
+
+
+class DocumentDeleteResult(BaseModel):
+    id: int
+    status: Literal["deleted", "not_found", "forbidden"]
+
+
 class DocumentBase(BaseModel):
     file_name: str
     file_type: Optional[str]
@@ -90,4 +156,45 @@ class DocumentList(DocumentBase):
     download_url: str
 
 
+class DocumentSearchHit(DocumentList):
+    project_id: int
+    rank: float
+
+
+class DocumentSearchPage(BaseModel):
+    items: list[DocumentSearchHit]
+    next_cursor: Optional[str] = None
+
+
 # No from attributes=True because of download_url that is computed here
+
+
+class SyncParticipant(BaseModel):
+    project_id: int
+    user_id: int
+    login: str
+    role: str
+    added_at: datetime
+
+
+class SyncDocument(DocumentBase):
+    id: int
+    project_id: int
+    uploader_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class Tombstone(BaseModel):
+    entity: Literal["project", "participant", "document"]
+    id: int
+    project_id: int
+
+
+class SyncResponse(BaseModel):
+    projects: list[ProjectOut]
+    participants: list[SyncParticipant]
+    documents: list[SyncDocument]
+    deleted: list[Tombstone]
+    next_token: str
+    has_more: bool
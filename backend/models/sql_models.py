@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    DDL,
     Column,
     Integer,
     String,
@@ -7,6 +8,9 @@ from sqlalchemy import (
     DateTime,
     func,
     BigInteger,
+    Index,
+    event,
+    text,
 )
 from sqlalchemy.orm import relationship
 from backend.db.apply_schema import Base
@@ -18,6 +22,8 @@ class User(Base):
     id = Column(Integer, primary_key=True)
     login = Column(String(255), unique=True, nullable=False, index=True)
     hashed_password = Column(String(255), nullable=False)
+    # tokens issued before this are refused (see backend/core/revocation.py)
+    tokens_valid_after = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -45,15 +51,28 @@ class Project(Base):
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
     updated_at = Column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
     )
+    # bumped on every write to the project or its documents; feeds ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     owner = relationship("User", back_populates="projects")
+    # the foreign keys cascade in the database; the ORM does not load the rows
+    # of a deleted project to delete them one by one
     documents = relationship(
-        "Document", back_populates="project", cascade="all, delete-orphan"
+        "Document",
+        back_populates="project",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     participants = relationship(
-        "ProjectParticipant", back_populates="project", cascade="all, delete-orphan"
+        "ProjectParticipant",
+        back_populates="project",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
@@ -65,7 +84,6 @@ class Document(Base):
         Integer,
         ForeignKey("projects.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
     file_name = Column(String(255), nullable=False)
     s3_key = Column(String(1024), unique=True, nullable=False)
@@ -84,6 +102,12 @@ class Document(Base):
     uploader = relationship("User")
     project = relationship("Project", back_populates="documents")
 
+    __table_args__ = (
+        # a project's documents newest first, without a sort; also serves every
+        # lookup by project_id
+        Index("ix_documents_project_created", "project_id", "created_at", "id"),
+    )
+
 
 class ProjectParticipant(Base):
     __tablename__ = "project_participants"
@@ -101,3 +125,177 @@ class ProjectParticipant(Base):
 
     user = relationship("User", back_populates="participations")
     project = relationship("Project", back_populates="participants")
+
+    # the primary key serves lookups by user; this one the members of a project
+    __table_args__ = (
+        Index("ix_project_participants_project_user", "project_id", "user_id"),
+    )
+
+
+class RevokedToken(Base):
+    """Access tokens refused before they expire (see backend/core/revocation.py).
+
+    Workers mirror the table in memory and read only the rows added since
+    their last look, by (txid, seq) position as in the change feed. Rows are
+    pruned once the token has expired anyway.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # writing transaction on PostgreSQL, 0 elsewhere
+    txid = Column(BigInteger, nullable=False, default=0)
+    jti = Column(String(32), unique=True, nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_revoked_tokens_position", "txid", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ChangeLog(Base):
+    """Append-only feed of writes, read by GET /sync (see backend/db/changes.py).
+
+    Rows without user_id concern everyone with access to the project; rows
+    with one only that user, e.g. the tombstone of a deleted project or the
+    grant of a new membership.
+    """
+
+    __tablename__ = "change_log"
+
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # writing transaction on PostgreSQL, 0 elsewhere
+    txid = Column(BigInteger, nullable=False, default=0)
+    project_id = Column(BigInteger, nullable=False)
+    user_id = Column(BigInteger, nullable=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(BigInteger, nullable=False)
+    op = Column(String(10), nullable=False)
+    changed_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_change_log_project_position", "project_id", "txid", "seq"),
+        # only the few rows addressed to one user; project-wide rows, with no
+        # user, are read through the project index
+        Index(
+            "ix_change_log_user_position",
+            "user_id",
+            "txid",
+            "seq",
+            postgresql_where=text("user_id IS NOT NULL"),
+            sqlite_where=text("user_id IS NOT NULL"),
+        ),
+        {"sqlite_autoincrement": True},
+    )
+
+
+# Full-text search over project names and descriptions (see backend/db/search.py).
+# PostgreSQL keeps a weighted tsvector in a generated column with a GIN index.
+# SQLite keeps an external-content FTS5 table in step through triggers. Neither
+# is mapped on the model; the alembic env skips them when autogenerating.
+PROJECT_SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE projects ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(name, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX ix_projects_search_vector ON projects USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+            name, description, content='projects', content_rowid='id',
+            tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER projects_fts_insert AFTER INSERT ON projects BEGIN
+            INSERT INTO projects_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER projects_fts_delete AFTER DELETE ON projects BEGIN
+            INSERT INTO projects_fts(projects_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER projects_fts_update AFTER UPDATE OF name, description
+        ON projects BEGIN
+            INSERT INTO projects_fts(projects_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO projects_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+        """,
+    ],
+}
+
+# Filename search (see backend/db/search.py). PostgreSQL indexes trigrams of
+# file_name with pg_trgm for substring and fuzzy matches. SQLite has no fuzzy
+# matching; an FTS5 trigram table serves the substring LIKE queries.
+DOCUMENT_SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX ix_documents_file_name_trgm ON documents "
+        "USING GIN (file_name gin_trgm_ops)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            file_name, content='documents', content_rowid='id', tokenize='trigram'
+        )
+        """,
+        """
+        CREATE TRIGGER documents_fts_insert AFTER INSERT ON documents BEGIN
+            INSERT INTO documents_fts(rowid, file_name)
+            VALUES (new.id, new.file_name);
+        END
+        """,
+        """
+        CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, file_name)
+            VALUES ('delete', old.id, old.file_name);
+        END
+        """,
+        """
+        CREATE TRIGGER documents_fts_update AFTER UPDATE OF file_name
+        ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, file_name)
+            VALUES ('delete', old.id, old.file_name);
+            INSERT INTO documents_fts(rowid, file_name)
+            VALUES (new.id, new.file_name);
+        END
+        """,
+    ],
+}
+
+
+def _install_search_ddl(table, statements_by_dialect: dict, fts_table: str) -> None:
+    for dialect, statements in statements_by_dialect.items():
+        for statement in statements:
+            event.listen(
+                table, "after_create", DDL(statement).execute_if(dialect=dialect)
+            )
+    event.listen(
+        table,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {fts_table}").execute_if(dialect="sqlite"),
+    )
+
+
+_install_search_ddl(Project.__table__, PROJECT_SEARCH_DDL, "projects_fts")
+_install_search_ddl(Document.__table__, DOCUMENT_SEARCH_DDL, "documents_fts")
@@ -4,7 +4,15 @@ from sqlalchemy.orm import Session
 from backend.models.models import UserCreate, UserOut, Token
 import backend.models.sql_models as db_models
 from backend.db.apply_schema import get_db
-from backend.core.security import hash_password, verify_password, create_access_token
+from backend.core.revocation import revoke_token
+from backend.core.security import (
+    create_access_token,
+    decode_token,
+    get_current_user,
+    hash_password,
+    oauth2_scheme,
+    verify_password,
+)
 from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter()
@@ -50,3 +58,20 @@ async def login_user(
 
     access_token = create_access_token(subject=db_user.login)
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, tags=["Authentication"])
+async def logout_user(
+    token: str = Depends(oauth2_scheme),
+    current_user: db_models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Revoke the token the request was made with, on every worker."""
+    payload = decode_token(token)
+    if payload.get("jti") is None:
+        # issued before tokens had ids; it expires on its own
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This token cannot be revoked",
+        )
+    revoke_token(db, payload, current_user.id)
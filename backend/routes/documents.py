@@ -1,14 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+import anyio.from_thread
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    status,
+    File,
+    UploadFile,
+)
 from fastapi.responses import RedirectResponse
+from sqlalchemy import delete, or_, select
 from sqlalchemy.orm import Session
 
 
 import backend.models.sql_models as db_models
 from backend.db.apply_schema import get_db
 from backend.core.security import get_current_user
-from backend.core.s3_utils import s3_store
+from backend.core.storage import StorageBackend, delete_stored_objects, get_storage
 from backend.routes.projects import verify_project_access
-from backend.models.models import DocumentOut
+from backend.models.models import (
+    BatchDocumentDelete,
+    DocumentDeleteResult,
+    DocumentOut,
+)
+from backend.db.versioning import bump_project_version, bump_project_versions
+from backend.db.changes import DELETE, DOCUMENT, change, record_changes
 
 router = APIRouter(tags=["Documents"])
 
@@ -22,6 +38,7 @@ def download_document(
     document_id: int,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
 ) -> RedirectResponse:
 
     doc = db.query(db_models.Document).filter_by(id=document_id).first()
@@ -32,7 +49,7 @@ def download_document(
 
     verify_project_access(db, doc.project_id, current_user.id)
 
-    url = s3_store.presign(doc.s3_key)
+    url = storage.presign(doc.s3_key)
 
     if url is None:
         raise HTTPException(
@@ -43,20 +60,29 @@ def download_document(
     return RedirectResponse(url=url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
 
 
+# plain def, so the synchronous session runs in the threadpool; the storage
+# calls hop back to the event loop
 @router.delete("/documents/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_document(
     document_id: int,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
 ):
 
-    doc = db.query(db_models.Document).filter_by(id=document_id).first()
-    if not doc:
+    row = (
+        db.query(db_models.Document, db_models.Project.owner_id)
+        .join(db_models.Project, db_models.Document.project_id == db_models.Project.id)
+        .filter(db_models.Document.id == document_id)
+        .first()
+    )
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
         )
+    doc, project_owner_id = row
 
-    is_project_owner = doc.project.owner_id == current_user.id
+    is_project_owner = project_owner_id == current_user.id
     is_project_uploader = doc.uploader_id == current_user.id
 
     if not (is_project_owner or is_project_uploader):
@@ -67,7 +93,7 @@ def delete_document(
 
     s3_key_to_delete = doc.s3_key
 
-    key_deletion_successful = s3_store.delete(s3_key_to_delete)
+    key_deletion_successful = anyio.from_thread.run(storage.delete, s3_key_to_delete)
 
     if not key_deletion_successful:
         raise HTTPException(
@@ -77,6 +103,8 @@ def delete_document(
 
     try:
         db.delete(doc)
+        bump_project_version(db, doc.project_id)
+        record_changes(db, [change(doc.project_id, DOCUMENT, doc.id, DELETE)])
         db.commit()
 
     except Exception as e:
@@ -91,6 +119,79 @@ def delete_document(
         )
 
 
+@router.post(
+    "/documents:batch-delete",
+    response_model=list[DocumentDeleteResult],
+    status_code=status.HTTP_200_OK,
+    summary="Delete several documents",
+)
+async def batch_delete_documents(
+    batch: BatchDocumentDelete,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
+) -> list[DocumentDeleteResult]:
+    """Delete the documents the caller may delete, as delete_document allows:
+    as owner of their project or as their uploader. Every id gets an outcome;
+    one failing id does not stop the others.
+
+    The permission check and the delete are one statement, which hands back
+    the storage keys; the objects are removed in batches after the response.
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    documents = db_models.Document
+    owned_projects = select(db_models.Project.id).where(
+        db_models.Project.owner_id == current_user.id
+    )
+    deleted = db.execute(
+        delete(documents)
+        .where(
+            documents.id.in_(ids),
+            or_(
+                documents.uploader_id == current_user.id,
+                documents.project_id.in_(owned_projects),
+            ),
+        )
+        .returning(documents.id, documents.project_id, documents.s3_key)
+    ).all()
+
+    deleted_ids = {row.id for row in deleted}
+    forbidden: set[int] = set()
+    if len(deleted_ids) < len(ids):
+        # left over: either gone already or not the caller's to delete
+        forbidden = set(
+            db.scalars(
+                select(documents.id).where(
+                    documents.id.in_([i for i in ids if i not in deleted_ids])
+                )
+            )
+        )
+
+    if deleted:
+        bump_project_versions(db, (row.project_id for row in deleted))
+        record_changes(
+            db, [change(row.project_id, DOCUMENT, row.id, DELETE) for row in deleted]
+        )
+    db.commit()
+
+    if deleted:
+        background_tasks.add_task(
+            delete_stored_objects, storage, [row.s3_key for row in deleted]
+        )
+    return [
+        DocumentDeleteResult(
+            id=document_id,
+            status=(
+                "deleted"
+                if document_id in deleted_ids
+                else "forbidden" if document_id in forbidden else "not_found"
+            ),
+        )
+        for document_id in ids
+    ]
+
+
 @router.put(
     "/documents/{document_id}",
     response_model=DocumentOut,
@@ -102,6 +203,7 @@ def update_document(
     file: UploadFile = File(..., description="New file to replace existing"),
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
 ) -> DocumentOut:
     doc = db.query(db_models.Document).filter_by(id=document_id).first()
     if not doc:
@@ -114,19 +216,21 @@ def update_document(
     new_filename = file.filename or "unnamed"
 
     try:
-        new_key = s3_store.upload(file, doc.project_id)
+        new_key = anyio.from_thread.run(storage.upload, file, doc.project_id)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"S3 upload failed: {str(e)}",
         )
 
-    s3_store.delete(old_s3_key)
+    anyio.from_thread.run(storage.delete, old_s3_key)
 
     doc.file_name = new_filename
     doc.s3_key = new_key
     doc.file_type = file.content_type
     db.add(doc)
+    bump_project_version(db, doc.project_id)
+    record_changes(db, [change(doc.project_id, DOCUMENT, doc.id)])
     db.commit()
     db.refresh(doc)
 
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+import backend.models.sql_models as db_models
+from backend.core.events import CLOSED, RESYNC, event_hub, sse_message
+from backend.core.security import get_current_user
+from backend.core.settings import settings
+from backend.db.apply_schema import get_db
+from backend.db.queries import accessible_project_ids
+from backend.routes.projects import verify_project_access
+
+router = APIRouter()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.get(
+    "/events",
+    status_code=status.HTTP_200_OK,
+    tags=["Events"],
+    response_class=StreamingResponse,
+)
+async def stream_events(
+    project_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+) -> StreamingResponse:
+    """Server-sent events announcing changes to the caller's projects, or to
+    one project when project_id is given.
+
+    Each `change` event names the entity, the operation, the project and the
+    id; GET /sync fetches the details. `ready` opens the stream, comment
+    lines keep idle connections alive, and `resync` (the listener fell
+    behind) or `closed` (the server is shutting down) end it, after which the
+    client reconnects and syncs.
+    """
+    if project_id is not None:
+        verify_project_access(db, project_id, current_user.id)
+        project_ids = [project_id]
+    else:
+        project_ids = db.scalars(accessible_project_ids(current_user.id)).all()
+    user_id = current_user.id
+
+    if event_hub.subscriber_count >= settings.EVENTS_MAX_SUBSCRIBERS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event listeners, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    subscription = await event_hub.subscribe(
+        user_id, project_ids, follow_memberships=project_id is None
+    )
+
+    async def stream():
+        try:
+            yield b"retry: 5000\n" + sse_message(
+                "ready", {"projects": len(project_ids)}
+            )
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is RESYNC or event is CLOSED:
+                    yield sse_message(event["type"], {})
+                    return
+                yield sse_message("change", event)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers=SSE_HEADERS
+    )
@@ -0,0 +1,60 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.fs_storage import (
+    FILES_ROUTE,
+    FilesystemStorage,
+    ZeroCopyFileResponse,
+    content_type_for,
+)
+from backend.core.storage import StorageBackend, get_storage
+
+router = APIRouter(tags=["Documents"])
+
+
+@router.get(
+    FILES_ROUTE + "/{key:path}",
+    summary="Download a file through a signed URL (filesystem storage)",
+)
+async def download_file(
+    key: str,
+    expires: int,
+    signature: str,
+    storage: StorageBackend = Depends(get_storage),
+):
+    if not isinstance(storage, FilesystemStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    if not storage.verify(key, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Download link is invalid or has expired",
+        )
+
+    path = storage.path_for(key)
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+
+    filename = key.rsplit("/", 1)[-1].split("_", 1)[-1]
+    media_type = content_type_for(key)
+
+    if storage.accel_redirect_prefix:
+        # nginx serves the file itself with sendfile, Range included
+        relative = path.relative_to(storage.root).as_posix()
+        return Response(
+            media_type=media_type,
+            headers={
+                "X-Accel-Redirect": f"{storage.accel_redirect_prefix.rstrip('/')}/{relative}"
+            },
+        )
+
+    return ZeroCopyFileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        stat_result=stat_result,
+    )
@@ -1,15 +1,69 @@
-from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile
-from backend.models.models import ProjectCreate, ProjectOut, DocumentOut, DocumentList
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    HTTPException,
+    status,
+    Depends,
+    File,
+    UploadFile,
+    Query,
+    Request,
+    Response,
+)
+from backend.models.models import (
+    BatchInvite,
+    DocumentList,
+    DocumentOut,
+    InviteResult,
+    ProjectCreate,
+    ProjectOut,
+)
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import backend.models.sql_models as db_models
 from backend.db.apply_schema import get_db
-from sqlalchemy.sql import or_
+from sqlalchemy import delete, insert, select
+import asyncio
 import logging
+import time
 
 
 from backend.core.security import get_current_user
-from backend.core.s3_utils import s3_store
-from typing import List
+from backend.core.storage import StorageBackend, delete_stored_objects, get_storage
+from backend.core.responses import DuplexStreamingResponse, FastJSONResponse
+from fastapi.responses import StreamingResponse
+from backend.core.export import ENCODERS, MEDIA_TYPES, export_records, gzip_chunks
+from backend.core.ndjson import NDJSON_MEDIA_TYPE, iter_lines, ndjson_line
+from backend.core.cache import response_cache
+from backend.core.singleflight import document_flights
+from backend.core.conditional import (
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
+from backend.core.settings import settings
+from backend.db.queries import (
+    accessible_projects_stmt,
+    accessible_projects_version_stmt,
+    insert_participants_stmt,
+    model_dict,
+    project_documents_stmt,
+    rows_as_dicts,
+)
+from backend.db.versioning import bump_project_version, mark_project_changed
+from backend.db.changes import (
+    DOCUMENT,
+    GRANT,
+    PARTICIPANT,
+    PROJECT,
+    change,
+    record_changes,
+    record_project_deleted,
+)
+from typing import List, Literal
 
 
 router = APIRouter()
@@ -27,11 +81,12 @@ def get_project_validation(db: Session, project_id: int):
     return db_project
 
 
-def verify_project_access(db: Session, project_id: int, user_id: int):
+def project_access(db: Session, project_id: int, user_id: int):
+    """the project and the caller's role in it, or 404/403"""
     db_project = get_project_validation(db, project_id)
 
     if db_project.owner_id == user_id:
-        return db_project
+        return db_project, "owner"
 
     participant = (
         db.query(db_models.ProjectParticipant)
@@ -39,7 +94,7 @@ def verify_project_access(db: Session, project_id: int, user_id: int):
         .first()
     )
     if participant:
-        return db_project
+        return db_project, participant.role
 
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN,
@@ -47,6 +102,15 @@ def verify_project_access(db: Session, project_id: int, user_id: int):
     )
 
 
+def verify_project_access(db: Session, project_id: int, user_id: int):
+    db_project, _ = project_access(db, project_id, user_id)
+    return db_project
+
+
+def json_bytes_response(body: bytes, headers: dict[str, str]) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.post(
     "",
     response_model=ProjectOut,
@@ -59,19 +123,123 @@ async def create_project(
     current_user: db_models.User = Depends(get_current_user),
 ) -> ProjectOut:
 
+    owner_id = current_user.id
     db_project = db_models.Project(
         name=project_in.name,
         description=project_in.description,
-        owner_id=current_user.id,
+        owner_id=owner_id,
     )
 
     db.add(db_project)
+    db.flush()
+    # addressed to the owner, the only one who can see it yet, so that their
+    # open event streams start following it
+    record_changes(
+        db, [change(db_project.id, PROJECT, db_project.id, user_id=owner_id)]
+    )
     db.commit()
     db.refresh(db_project)
 
     return db_project
 
 
+def _first_error(e: ValidationError) -> str:
+    error = e.errors(include_url=False)[0]
+    field = ".".join(str(part) for part in error["loc"])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+def _insert_projects(db: Session, owner_id: int, rows: list[dict]) -> list[int]:
+    try:
+        ids = db.scalars(
+            insert(db_models.Project).returning(
+                db_models.Project.id, sort_by_parameter_order=True
+            ),
+            rows,
+        ).all()
+        record_changes(db, (change(pid, PROJECT, pid, user_id=owner_id) for pid in ids))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return ids
+
+
+@router.post(
+    "/import",
+    status_code=status.HTTP_200_OK,
+    tags=["Projects"],
+    response_class=DuplexStreamingResponse,
+)
+async def import_projects(
+    request: Request,
+    batch_size: int | None = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+) -> DuplexStreamingResponse:
+    """Create projects from an NDJSON body, one ProjectCreate per line.
+
+    The body is read as it arrives and inserted in batches, each in its own
+    transaction, while one result line per input line is streamed back, so
+    neither side is held in memory. A failed batch does not undo earlier ones.
+    The last line is a summary.
+    """
+    owner_id = current_user.id
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+
+    async def results():
+        counts = {"created": 0, "failed": 0}
+        batch_lines: list[int] = []
+        batch_rows: list[dict] = []
+
+        def failure(line: int, error: str) -> bytes:
+            counts["failed"] += 1
+            return ndjson_line({"line": line, "status": "error", "error": error})
+
+        async def flush():
+            try:
+                ids = await run_in_threadpool(
+                    _insert_projects, db, owner_id, batch_rows
+                )
+            except SQLAlchemyError as e:
+                logger.error(f"Project import batch failed: {e}")
+                out = b"".join(
+                    failure(n, "Could not store project") for n in batch_lines
+                )
+            else:
+                counts["created"] += len(ids)
+                out = b"".join(
+                    ndjson_line({"line": n, "status": "created", "id": project_id})
+                    for n, project_id in zip(batch_lines, ids)
+                )
+            batch_lines.clear()
+            batch_rows.clear()
+            return out
+
+        try:
+            lines = iter_lines(request.stream(), settings.IMPORT_MAX_LINE_BYTES)
+            async for number, line in lines:
+                if line is None:
+                    yield failure(number, "Line too long")
+                    continue
+                try:
+                    project_in = ProjectCreate.model_validate_json(line)
+                except ValidationError as e:
+                    yield failure(number, _first_error(e))
+                    continue
+                batch_lines.append(number)
+                batch_rows.append({**project_in.model_dump(), "owner_id": owner_id})
+                if len(batch_rows) >= batch_size:
+                    yield await flush()
+            if batch_rows:
+                yield await flush()
+            yield ndjson_line({"summary": counts})
+        finally:
+            await run_in_threadpool(db.close)
+
+    return DuplexStreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.get(
     "",
     response_model=list[ProjectOut],
@@ -79,23 +247,61 @@ async def create_project(
     tags=["Projects"],
 )
 async def get_all_projects(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
-) -> list[ProjectOut]:
-
-    projects = (
-        db.query(db_models.Project)
-        .outerjoin(db_models.ProjectParticipant)
-        .filter(
-            or_(
-                db_models.Project.owner_id == current_user.id,
-                db_models.ProjectParticipant.user_id == current_user.id,
-            )
-        )
-        .distinct()
-        .all()
+) -> Response:
+
+    validators = db.execute(accessible_projects_version_stmt(current_user.id)).one()
+    etag = make_etag("projects", current_user.id, *validators)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    # plain column rows encoded straight to JSON, skipping ORM objects and the
+    # double pydantic validation of response_model
+    result = db.execute(accessible_projects_stmt(current_user.id))
+    return FastJSONResponse(rows_as_dicts(result), headers=validator_headers(etag))
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    tags=["Projects"],
+    response_class=StreamingResponse,
+)
+def export_projects(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    compression: Literal["gzip"] | None = None,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+) -> StreamingResponse:
+    """Everything the caller can access: projects, then participants, then
+    document metadata, as NDJSON records or CSV rows tagged with their type.
+
+    Rows are read from a server-side cursor and written out batch by batch,
+    gzip-compressed on the fly when asked, so the export starts at once and
+    memory stays flat however many documents there are.
+    """
+    user_id = current_user.id
+
+    def body():
+        try:
+            batches = export_records(db, user_id, settings.EXPORT_BATCH_SIZE)
+            chunks = ENCODERS[format](batches)
+            yield from gzip_chunks(chunks) if compression else chunks
+        finally:
+            db.close()
+
+    filename = f"projects-export.{format}"
+    media_type = MEDIA_TYPES[format]
+    if compression:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-    return [ProjectOut.model_validate(project) for project in projects]
 
 
 @router.get(
@@ -106,13 +312,23 @@ async def get_all_projects(
 )
 async def get_project(
     project_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
-):
+) -> Response:
 
-    db_project = verify_project_access(db, project_id, current_user.id)
+    db_project, role = project_access(db, project_id, current_user.id)
 
-    return db_project
+    etag = make_etag("project", db_project.id, db_project.version)
+    if is_not_modified(request, etag, db_project.updated_at):
+        return not_modified_response(etag, db_project.updated_at)
+
+    body = response_cache.get("project", project_id, role, db_project.version)
+    if body is None:
+        body = FastJSONResponse(model_dict(ProjectOut, db_project)).body
+        response_cache.set("project", project_id, role, body, db_project.version)
+
+    return json_bytes_response(body, validator_headers(etag, db_project.updated_at))
 
 
 @router.put(
@@ -132,6 +348,9 @@ async def update_project(
 
     db_project.name = project_update_data.name
     db_project.description = project_update_data.description
+    db_project.version = db_models.Project.version + 1
+    mark_project_changed(db, db_project.id)
+    record_changes(db, [change(db_project.id, PROJECT, db_project.id)])
 
     db.add(db_project)
     db.commit()
@@ -143,8 +362,10 @@ async def update_project(
 @router.delete("/{project_id}", status_code=status.HTTP_200_OK, tags=["Projects"])
 async def delete_project(
     project_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
 ):
     db_project = get_project_validation(db, project_id)
 
@@ -166,9 +387,21 @@ async def delete_project(
         f"Permission GRANTED: Project Owner {db_project.owner_id} == Current User {current_user.id}"
     )
 
-    db.delete(db_project)
+    record_project_deleted(db, db_project)
+    # one statement however many documents, handing back only their keys;
+    # participants go with the project through ON DELETE CASCADE
+    s3_keys = db.scalars(
+        delete(db_models.Document)
+        .where(db_models.Document.project_id == project_id)
+        .returning(db_models.Document.s3_key)
+    ).all()
+    db.execute(delete(db_models.Project).where(db_models.Project.id == project_id))
+    mark_project_changed(db, project_id)
     db.commit()
 
+    # objects go once the rows are gone for good, after the response
+    if s3_keys:
+        background_tasks.add_task(delete_stored_objects, storage, s3_keys)
     return {"message": "Project deleted"}
 
 
@@ -216,11 +449,87 @@ async def invite_user_to_project(
     )
 
     db.add(new_participant)
+    mark_project_changed(db, project_id)
+    # the grant first, so the invitee's event streams follow the project in time
+    # to hear of their own membership
+    record_changes(
+        db,
+        [
+            change(project_id, PROJECT, project_id, GRANT, user_id=invited_user.id),
+            change(project_id, PARTICIPANT, invited_user.id),
+        ],
+    )
     db.commit()
 
     return {"message": f"User '{user}' successfully invited to project {project_id}"}
 
 
+@router.post(
+    "/{project_id}/participants:batch",
+    response_model=list[InviteResult],
+    tags=["Projects"],
+    summary="Invite many users at once",
+)
+async def batch_invite_participants(
+    project_id: int,
+    batch: BatchInvite,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+) -> list[InviteResult]:
+    db_project = get_project_validation(db, project_id)
+
+    if db_project.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the owner can invite users",
+        )
+
+    # first occurrence of a login decides its role
+    roles: dict[str, str] = {}
+    for invite in batch.participants:
+        roles.setdefault(invite.login, invite.role)
+
+    user_ids = dict(
+        db.execute(
+            select(db_models.User.login, db_models.User.id).where(
+                db_models.User.login.in_(roles)
+            )
+        ).all()
+    )
+
+    rows = [
+        {"user_id": user_id, "project_id": project_id, "role": roles[login]}
+        for login, user_id in user_ids.items()
+        if user_id != db_project.owner_id
+    ]
+    added: set[int] = set()
+    if rows:
+        added = set(
+            db.scalars(insert_participants_stmt(db.get_bind().dialect.name, rows)).all()
+        )
+        mark_project_changed(db, project_id)
+        record_changes(
+            db,
+            [
+                change(project_id, PROJECT, project_id, GRANT, user_id=user_id)
+                for user_id in sorted(added)
+            ]
+            + [change(project_id, PARTICIPANT, user_id) for user_id in sorted(added)],
+        )
+    db.commit()
+
+    results = []
+    for login in roles:
+        if login not in user_ids:
+            outcome = "unknown"
+        elif user_ids[login] in added:
+            outcome = "added"
+        else:
+            outcome = "already_present"
+        results.append(InviteResult(login=login, status=outcome))
+    return results
+
+
 @router.post(
     "/{project_id}/documents",
     response_model=list[DocumentOut],
@@ -232,6 +541,7 @@ async def upload_documents(
     files: List[UploadFile] = File(..., description="One or more files to upload"),
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
 ) -> list[DocumentOut]:
 
     project = verify_project_access(db, project_id, current_user.id)
@@ -239,45 +549,52 @@ async def upload_documents(
     if not files:
         raise HTTPException(status_code=400, detail="No files provided for upload.")
 
-    created_docs: list[DocumentOut] = []
-    s3_keys: list[str] = []
-
-    for upload in files:
-        filename = upload.filename or "unnamed"
-        s3_key = s3_store.upload(upload, project.id)
-        s3_keys.append(s3_key)
-
-        doc = db_models.Document(
-            project_id=project.id,
-            file_name=filename,
-            s3_key=s3_key,
-            file_type=upload.content_type,
-            uploader_id=current_user.id,
-        )
-        created_docs.append(doc)
-
-        logger.info(
-            f"Successfully committed DB record for {upload.filename}, S3 key: {s3_key}, DB ID: {doc.id}"
-        )
-
-    if len(created_docs) != len(s3_keys):
-        for key in s3_keys:
-            s3_store.delete(key)
+    # all files go to storage concurrently
+    results = await asyncio.gather(
+        *(storage.upload(upload, project.id) for upload in files),
+        return_exceptions=True,
+    )
+    s3_keys = [key for key in results if isinstance(key, str)]
+    failures = [error for error in results if isinstance(error, BaseException)]
 
+    if failures:
+        await storage.delete_many(s3_keys)
+        if isinstance(failures[0], HTTPException):
+            raise failures[0]
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="One or more files failed to upload.",
         )
 
+    new_rows: list[dict] = []
+    for upload, s3_key in zip(files, s3_keys):
+        new_rows.append(
+            {
+                "project_id": project.id,
+                "file_name": upload.filename or "unnamed",
+                "s3_key": s3_key,
+                "file_type": upload.content_type,
+                "uploader_id": current_user.id,
+            }
+        )
+
+        logger.info(f"Successfully uploaded {upload.filename}, S3 key: {s3_key}")
+
     try:
-        db.add_all(created_docs)
+        # a single multi-row INSERT .. RETURNING instead of one refresh per document
+        inserted = db.scalars(
+            insert(db_models.Document).returning(db_models.Document), new_rows
+        ).all()
+        bump_project_version(db, project.id)
+        record_changes(db, (change(project.id, DOCUMENT, doc.id) for doc in inserted))
+        created_docs = [
+            DocumentOut.model_validate(doc)
+            for doc in sorted(inserted, key=lambda d: d.id)
+        ]
         db.commit()
-        for doc in created_docs:
-            db.refresh(doc)
 
     except Exception:
-        for key in s3_keys:
-            s3_store.delete(key)
+        await storage.delete_many(s3_keys)
         raise HTTPException(500, "Could not save file metadata. Rolled back.")
 
     return created_docs
@@ -291,38 +608,64 @@ async def upload_documents(
 )
 def list_project_documents(
     project_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
-) -> list[DocumentList]:
-
-    verify_project_access(db, project_id, current_user.id)
-
-    docs = (
-        db.query(db_models.Document)
-        .filter_by(project_id=project_id)
-        .order_by(db_models.Document.created_at.desc())
-        .all()
-    )
+    storage: StorageBackend = Depends(get_storage),
+) -> Response:
 
-    documents_list: List[DocumentList] = []
+    db_project, role = project_access(db, project_id, current_user.id)
 
-    # d is a sqlalchemy object
-    for d in docs:
-        url = s3_store.presign(d.s3_key)
+    # the tag also rolls over every half URL lifetime, so a client holding a
+    # cached list never gets told to keep download URLs that are about to expire
+    url_window = int(time.time() // max(1, settings.PRESIGNED_URL_EXPIRES_SECONDS // 2))
+    etag = make_etag("documents", project_id, db_project.version, url_window)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
 
-        if url is None:
-            raise HTTPException(
-                500, f"Could not generate download URL for document {d.id}"
-            )
-        # here we create a documents pydantic item
-        documents_list.append(
-            DocumentList(
-                id=d.id,
-                file_name=d.file_name,
-                file_type=d.file_type,
-                created_at=d.created_at,
-                download_url=url,
+    # download URLs are only reused within the same window as well
+    cached = response_cache.get(
+        "documents", project_id, role, db_project.version, url_window
+    )
+    if cached is not None:
+        return json_bytes_response(cached, validator_headers(etag))
+
+    def build_list() -> bytes:
+        rows = db.execute(project_documents_stmt(project_id)).all()
+        urls = storage.presign_many([row.s3_key for row in rows])
+
+        documents_list: list[dict] = []
+        for (file_name, file_type, doc_id, created_at, _), url in zip(rows, urls):
+            if url is None:
+                raise HTTPException(
+                    500, f"Could not generate download URL for document {doc_id}"
+                )
+            # same keys and order as DocumentList, encoded without a model per row
+            documents_list.append(
+                {
+                    "file_name": file_name,
+                    "file_type": file_type,
+                    "id": doc_id,
+                    "created_at": created_at,
+                    "download_url": url,
+                }
             )
-        )
 
-    return documents_list
+        body = FastJSONResponse(documents_list).body
+        response_cache.set(
+            "documents", project_id, role, body, db_project.version, url_window
+        )
+        return body
+
+    # access was checked above for this caller; teammates opening the project
+    # at the same moment share one query and one round of presigning
+    flight_key = (
+        "documents",
+        project_id,
+        role,
+        db_project.version,
+        url_window,
+        tuple(sorted(request.query_params.multi_items())),
+    )
+    body = document_flights.do(flight_key, build_list)
+    return json_bytes_response(body, validator_headers(etag))
@@ -0,0 +1,107 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+import backend.models.sql_models as db_models
+from backend.core.responses import FastJSONResponse
+from backend.core.security import get_current_user
+from backend.core.storage import StorageBackend, get_storage
+from backend.db.apply_schema import get_db
+from backend.db.queries import rows_as_dicts
+from backend.db.search import (
+    SQLITE_MIN_DOCUMENT_QUERY,
+    decode_cursor,
+    document_search_stmt,
+    encode_cursor,
+    fts5_query,
+    project_search_stmt,
+)
+from backend.models.models import DocumentSearchPage, ProjectSearchPage
+
+router = APIRouter()
+
+
+def search_after(cursor: Optional[str]) -> Optional[tuple[float, int]]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def search_page(rows: list[dict], limit: int) -> FastJSONResponse:
+    """the first limit rows, and a cursor when the extra row shows there is more"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["rank"], rows[-1]["id"])
+    return FastJSONResponse({"items": rows, "next_cursor": next_cursor})
+
+
+@router.get(
+    "/projects/search",
+    response_model=ProjectSearchPage,
+    status_code=status.HTTP_200_OK,
+    tags=["Projects"],
+)
+def search_projects(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+) -> FastJSONResponse:
+    """Full-text search over the names and descriptions of the projects the
+    caller can access, best matches first. Pass next_cursor back as cursor
+    for the following page."""
+    after = search_after(cursor)
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "sqlite" and fts5_query(q) is None:
+        return search_page([], limit)
+
+    stmt = project_search_stmt(dialect_name, current_user.id, q, limit + 1, after)
+    return search_page(rows_as_dicts(db.execute(stmt)), limit)
+
+
+@router.get(
+    "/documents/search",
+    response_model=DocumentSearchPage,
+    status_code=status.HTTP_200_OK,
+    tags=["Documents"],
+)
+def search_documents(
+    q: str = Query(..., min_length=2, max_length=255),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+    storage: StorageBackend = Depends(get_storage),
+) -> FastJSONResponse:
+    """Documents of the caller's projects by file name: substring matches, and
+    on PostgreSQL near matches too, closest first. Download URLs are signed
+    only for the returned page. SQLite needs at least three characters, the
+    shortest its trigram index can look up."""
+    after = search_after(cursor)
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "sqlite" and len(q) < SQLITE_MIN_DOCUMENT_QUERY:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"q must be at least {SQLITE_MIN_DOCUMENT_QUERY} characters",
+        )
+    stmt = document_search_stmt(dialect_name, current_user.id, q, limit + 1, after)
+    rows = rows_as_dicts(db.execute(stmt))
+
+    # the page shares its dicts with rows; a possible extra row only feeds the cursor
+    page = rows[:limit]
+    urls = storage.presign_many([row.pop("s3_key") for row in page])
+    for row, url in zip(page, urls):
+        if url is None:
+            raise HTTPException(
+                500, f"Could not generate download URL for document {row['id']}"
+            )
+        row["download_url"] = url
+    return search_page(rows, limit)
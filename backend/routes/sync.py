@@ -0,0 +1,37 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+import backend.models.sql_models as db_models
+from backend.core.responses import FastJSONResponse
+from backend.core.security import get_current_user
+from backend.db.apply_schema import get_db
+from backend.db.changes import decode_token, read_changes
+from backend.models.models import SyncResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/sync",
+    response_model=SyncResponse,
+    status_code=status.HTTP_200_OK,
+    tags=["Sync"],
+)
+def sync(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user),
+) -> FastJSONResponse:
+    """Projects, participants and documents created, changed or deleted since
+    the token of the previous sync, or everything when there is none. Pass
+    next_token as since next time, right away while has_more is true."""
+    try:
+        after = decode_token(since)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token"
+        )
+    return FastJSONResponse(read_changes(db, current_user.id, after, limit))
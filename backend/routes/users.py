@@ -1,7 +1,16 @@
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, HTTPException, status
+from sqlalchemy.orm import Session
+
 import backend.models.sql_models as db_models
-from backend.models.models import UserOut
-from backend.core.security import get_current_user
+from backend.db.apply_schema import get_db
+from backend.models.models import PasswordChange, Token, UserOut
+from backend.core.revocation import revoke_user_tokens
+from backend.core.security import (
+    create_access_token,
+    get_current_user,
+    hash_password,
+    verify_password,
+)
 
 
 router = APIRouter()
@@ -10,3 +19,24 @@ router = APIRouter()
 @router.get("/me", response_model=UserOut, tags=["Oauth2scheme"])
 async def get_me(current_user: db_models.User = Depends(get_current_user)):
     return current_user
+
+
+@router.put("/me/password", response_model=Token, tags=["Oauth2scheme"])
+def change_password(
+    change: PasswordChange,
+    current_user: db_models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Set a new password and log out every session, this one included; the
+    response carries a fresh token to continue with."""
+    if not verify_password(change.current_password, current_user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Current password is incorrect",
+        )
+    current_user.hashed_password = hash_password(change.new_password)
+    revoke_user_tokens(current_user)
+    db.commit()
+
+    access_token = create_access_token(subject=current_user.login)
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -4,10 +4,15 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from backend.db.apply_schema import Base, get_db
+from backend.db.apply_schema import Base, enable_sqlite_foreign_keys, get_db
 from backend.main import app
 import backend.models.sql_models as db_models
-from backend.core.s3_utils import s3_store
+from backend.core.storage import MemoryStorage, get_storage
+from backend.core.cache import response_cache
+from backend.core.admission import admission
+from backend.core.idempotency import idempotency_store
+from backend.core.revocation import revocations
+from backend.db.query_counter import QueryStats, add_observer, remove_observer
 
 from typing import Generator
 
@@ -22,7 +27,18 @@ os.environ["AWS_S3_ENDPOINT_URL"] = "http://localhost:9000"
 
 TEST_DATABASE_URL = "sqlite:///./test.db"
 
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries, max_repeats=None, endpoint=None, "
+        "allow_lazy_loads=False): fail the test if a request issues more SQL "
+        "statements than allowed",
+    )
+
+
 engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+enable_sqlite_foreign_keys(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -161,21 +177,90 @@ def third_authorized_client(third_token: str, client: TestClient):
     return client
 
 
-class MockS3Upload:
+class FakeKeys:
     def __init__(self):
         self.call_count = 0
 
-    def __call__(self, file, project_id):
+    def __call__(self, project_id, filename):
         self.call_count += 1
         return f"fake_key_proj_{project_id}_call_{self.call_count}"
 
 
 @pytest.fixture(autouse=True)
-def patch_s3_store(monkeypatch):
-    mock_uploader = MockS3Upload()
-    monkeypatch.setattr(s3_store, "upload", mock_uploader)
-    monkeypatch.setattr(
-        s3_store, "presign", lambda key: f"https://fake-minio.local/{key}?sig"
+def storage() -> Generator[MemoryStorage, None, None]:
+    """In-memory storage behind every route; keys and URLs look like MinIO's."""
+    memory = MemoryStorage(
+        base_url="https://fake-minio.local/", key_factory=FakeKeys(), url_suffix="?sig"
     )
-    monkeypatch.setattr(s3_store, "delete", lambda key: True)
+    app.dependency_overrides[get_storage] = lambda: memory
+    yield memory
+    del app.dependency_overrides[get_storage]
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # ids are reused after each test's rollback, so cached bodies must not survive
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_idempotency_store():
+    # stored responses name rows that each test's rollback removes
+    idempotency_store.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_admission():
+    # every test logs in as the same users; start each with full buckets
+    admission.reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_revocations():
+    # start loaded and empty; tests refresh it themselves
+    revocations.reset()
+
+
+@pytest.fixture(scope="function")
+def query_counter() -> Generator[list[QueryStats], None, None]:
+    """Collects the query stats of every request made during the test."""
+    recorded: list[QueryStats] = []
+    add_observer(recorded.append)
+    yield recorded
+    remove_observer(recorded.append)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def enforce_query_budget(request):
+    """Fails tests marked with query_budget when a request goes over budget."""
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is None:
+        yield
+        return
+
+    recorded: list[QueryStats] = []
+    add_observer(recorded.append)
     yield
+    remove_observer(recorded.append)
+
+    max_queries = marker.args[0] if marker.args else marker.kwargs["max_queries"]
+    max_repeats = marker.kwargs.get("max_repeats")
+    endpoint = marker.kwargs.get("endpoint")
+    allow_lazy_loads = marker.kwargs.get("allow_lazy_loads", False)
+
+    failures = []
+    for stats in recorded:
+        if endpoint is not None and stats.label != endpoint:
+            continue
+        if stats.count > max_queries:
+            failures.append(f"over budget ({max_queries}): {stats.summary()}")
+        if max_repeats is not None and stats.repeated(max_repeats + 1):
+            failures.append(f"N+1 pattern (max {max_repeats}): {stats.summary()}")
+        if stats.lazy_loads and not allow_lazy_loads:
+            failures.append(f"lazy loads: {stats.summary()}")
+    if failures:
+        pytest.fail("\n\n".join(failures), pytrace=False)
@@ -0,0 +1,89 @@
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.core.admission import (
+    EXPENSIVE,
+    READ,
+    WRITE,
+    PoolWaitMonitor,
+    admission,
+    classify,
+    pool_wait,
+)
+
+
+@pytest.fixture
+def project_id(authorized_client: TestClient) -> int:
+    response = authorized_client.post(
+        "/projects", json={"name": "P", "description": ""}
+    )
+    return response.json()["id"]
+
+
+def saturate_pool(wait: float) -> None:
+    for _ in range(50):
+        pool_wait.record(wait)
+
+
+def test_classify():
+    assert classify("POST", "/login") == EXPENSIVE
+    assert classify("POST", "/projects/3/documents") == EXPENSIVE
+    assert classify("PUT", "/documents/3") == EXPENSIVE
+    assert classify("DELETE", "/documents/3") == WRITE
+    assert classify("POST", "/projects") == WRITE
+    assert classify("GET", "/projects/3/documents") == READ
+
+
+def test_token_bucket_per_user(
+    authorized_client: TestClient, other_authorized_client: TestClient, monkeypatch
+):
+    monkeypatch.setattr(admission, "user_burst", 2)
+    monkeypatch.setattr(admission, "user_rate", 0.5)
+
+    assert authorized_client.get("/projects").status_code == 200
+    assert authorized_client.get("/projects").status_code == 200
+    limited = authorized_client.get("/projects")
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "2"
+
+    assert other_authorized_client.get("/projects").status_code == 200
+    assert authorized_client.get("/ping").status_code == 200
+
+
+def test_expensive_requests_are_shed_first_when_busy(
+    authorized_client: TestClient, project_id: int, monkeypatch
+):
+    monkeypatch.setattr(admission, "in_flight", admission.limits[EXPENSIVE])
+
+    upload = authorized_client.post(
+        f"/projects/{project_id}/documents",
+        files={"files": ("a.txt", io.BytesIO(b"a"), "text/plain")},
+    )
+    assert upload.status_code == 503
+    assert upload.headers["Retry-After"] == "1"
+    assert authorized_client.get(f"/projects/{project_id}").status_code == 200
+
+
+def test_pool_wait_sheds_writes_but_keeps_reads(
+    authorized_client: TestClient, project_id: int, monkeypatch
+):
+    saturate_pool(0.3)
+
+    assert authorized_client.post("/login", data={}).status_code == 503
+    response = authorized_client.put(
+        f"/projects/{project_id}", json={"name": "New", "description": ""}
+    )
+    assert response.status_code == 503
+    assert authorized_client.get(f"/projects/{project_id}").status_code == 200
+    assert admission.rejected[503] == 2
+
+
+def test_pool_wait_decays_without_samples(monkeypatch):
+    monitor = PoolWaitMonitor(alpha=1.0)
+    monkeypatch.setattr(PoolWaitMonitor, "HALF_LIFE", 0.01)
+    monitor.record(1.0)
+    time.sleep(0.1)
+    assert monitor.current() < 0.01
@@ -0,0 +1,156 @@
+import io
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+def create_project(client: TestClient, name: str = "Polled project") -> int:
+    response = client.post("/projects", json={"name": name, "description": "Desc"})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def upload(client: TestClient, project_id: int, name: str = "a.txt") -> int:
+    response = client.post(
+        f"/projects/{project_id}/documents",
+        files={"files": (name, io.BytesIO(b"data"), "text/plain")},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()[0]["id"]
+
+
+def revalidate(client: TestClient, url: str, etag: str):
+    return client.get(url, headers={"If-None-Match": etag})
+
+
+def test_project_detail_not_modified(authorized_client: TestClient):
+    project_id = create_project(authorized_client)
+    url = f"/projects/{project_id}"
+
+    first = authorized_client.get(url)
+    assert first.status_code == status.HTTP_200_OK
+    etag = first.headers["ETag"]
+    assert "Last-Modified" in first.headers
+
+    second = revalidate(authorized_client, url, etag)
+    assert second.status_code == status.HTTP_304_NOT_MODIFIED
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+    authorized_client.put(url, json={"name": "Renamed", "description": "Desc"})
+    third = revalidate(authorized_client, url, etag)
+    assert third.status_code == status.HTTP_200_OK
+    assert third.json()["name"] == "Renamed"
+    assert third.headers["ETag"] != etag
+
+
+def test_project_detail_if_modified_since(authorized_client: TestClient):
+    project_id = create_project(authorized_client)
+    url = f"/projects/{project_id}"
+    last_modified = authorized_client.get(url).headers["Last-Modified"]
+
+    response = authorized_client.get(url, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = authorized_client.get(
+        url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.query_budget(3, endpoint="GET /projects/{project_id}/documents")
+def test_document_list_not_modified_until_documents_change(
+    authorized_client: TestClient,
+):
+    project_id = create_project(authorized_client)
+    upload(authorized_client, project_id)
+    url = f"/projects/{project_id}/documents"
+
+    etag = authorized_client.get(url).headers["ETag"]
+    assert revalidate(authorized_client, url, etag).status_code == 304
+
+    upload(authorized_client, project_id, name="b.txt")
+    response = revalidate(authorized_client, url, etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 2
+
+    etag = response.headers["ETag"]
+    doc_id = response.json()[0]["id"]
+    authorized_client.delete(f"/documents/{doc_id}")
+    response = revalidate(authorized_client, url, etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+
+def test_document_list_not_modified_is_still_authorized(
+    authorized_client: TestClient, other_authorized_client: TestClient
+):
+    project_id = create_project(authorized_client)
+    url = f"/projects/{project_id}/documents"
+    etag = authorized_client.get(url).headers["ETag"]
+
+    assert revalidate(other_authorized_client, url, etag).status_code == 403
+
+
+def test_project_list_changes_with_membership(
+    authorized_client: TestClient, other_authorized_client: TestClient, other_user
+):
+    create_project(authorized_client)
+    etag = authorized_client.get("/projects").headers["ETag"]
+    assert revalidate(authorized_client, "/projects", etag).status_code == 304
+
+    shared_id = create_project(other_authorized_client, name="Shared with main")
+    assert revalidate(authorized_client, "/projects", etag).status_code == 304
+
+    other_authorized_client.post(
+        f"/projects/{shared_id}/invite",
+        params={"user": "testuser@fixture.com"},
+    )
+    response = revalidate(authorized_client, "/projects", etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert shared_id in {p["id"] for p in response.json()}
+
+
+def test_project_list_changes_when_swapping_projects_of_equal_sums(
+    authorized_client: TestClient, other_authorized_client: TestClient
+):
+    # lose projects {1, 4} and gain {2, 3}: same count, ids and versions
+    mine = [create_project(authorized_client)]
+    theirs = [create_project(other_authorized_client) for _ in range(2)]
+    mine.append(create_project(authorized_client))
+    assert sum(mine) == sum(theirs)
+    etag = authorized_client.get("/projects").headers["ETag"]
+
+    for project_id in mine:
+        authorized_client.delete(f"/projects/{project_id}")
+    for project_id in theirs:
+        other_authorized_client.post(
+            f"/projects/{project_id}/invite",
+            params={"user": "testuser@fixture.com"},
+        )
+
+    response = revalidate(authorized_client, "/projects", etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert {p["id"] for p in response.json()} == set(theirs)
+
+
+def test_document_list_with_a_one_second_url_lifetime(
+    authorized_client: TestClient, monkeypatch
+):
+    from backend.core.settings import settings
+
+    monkeypatch.setattr(settings, "PRESIGNED_URL_EXPIRES_SECONDS", 1)
+    project_id = create_project(authorized_client)
+
+    response = authorized_client.get(f"/projects/{project_id}/documents")
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_weak_and_listed_etags_match(authorized_client: TestClient):
+    create_project(authorized_client)
+    etag = authorized_client.get("/projects").headers["ETag"]
+
+    listed = f'"other", {etag.removeprefix("W/")}'
+    assert revalidate(authorized_client, "/projects", listed).status_code == 304
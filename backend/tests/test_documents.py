@@ -395,3 +395,60 @@ def test_list_documents_includes_only_owner_and_participant(
     resp_other2 = other_authorized_client.get(f"/projects/{project_id}/documents")
     assert resp_other2.status_code == 200
     assert len(resp_other2.json()) == 1
+
+
+def upload_files(client: TestClient, project_id: int, *names: str) -> list[int]:
+    files = [("files", (name, io.BytesIO(b"data"), "text/plain")) for name in names]
+    response = client.post(f"/projects/{project_id}/documents", files=files)
+    assert response.status_code == 201
+    return [doc["id"] for doc in response.json()]
+
+
+def test_batch_delete_reports_each_document(
+    authorized_client: TestClient,
+    other_authorized_client: TestClient,
+    token: str,
+    other_token: str,
+    other_user,
+    storage,
+):
+    # owner of mine, participant of theirs
+    mine = create_project(authorized_client, token)
+    theirs = create_project(other_authorized_client, other_token, name="Theirs")
+    other_authorized_client.post(f"/projects/{theirs}/invite?user=testuser@fixture.com")
+    owned = upload_files(authorized_client, mine, "a.txt", "b.txt")
+    authorized_client.post(f"/projects/{mine}/invite?user={other_user.login}")
+    by_other_in_mine = upload_files(other_authorized_client, mine, "c.txt")
+    uploaded_in_theirs = upload_files(authorized_client, theirs, "d.txt")
+    not_mine = upload_files(other_authorized_client, theirs, "e.txt")
+
+    ids = owned + by_other_in_mine + uploaded_in_theirs + not_mine + [999999, owned[0]]
+    response = authorized_client.post("/documents:batch-delete", json={"ids": ids})
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": owned[0], "status": "deleted"},
+        {"id": owned[1], "status": "deleted"},
+        {"id": by_other_in_mine[0], "status": "deleted"},
+        {"id": uploaded_in_theirs[0], "status": "deleted"},
+        {"id": not_mine[0], "status": "forbidden"},
+        {"id": 999999, "status": "not_found"},
+    ]
+    # only the forbidden document is left, in the database and in storage
+    listing = other_authorized_client.get(f"/projects/{theirs}/documents").json()
+    assert [doc["id"] for doc in listing] == not_mine
+    assert len(storage.objects) == 1
+    assert authorized_client.get(f"/projects/{mine}/documents").json() == []
+
+
+def test_batch_delete_validates_the_request(authorized_client: TestClient, client):
+    assert (
+        authorized_client.post("/documents:batch-delete", json={"ids": []}).status_code
+        == 422
+    )
+    too_many = {"ids": list(range(1001))}
+    assert (
+        authorized_client.post("/documents:batch-delete", json=too_many).status_code
+        == 422
+    )
+    assert client.post("/documents:batch-delete", json={"ids": [1]}).status_code == 401
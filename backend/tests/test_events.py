@@ -0,0 +1,356 @@
+import asyncio
+import sys
+import types
+from typing import Optional
+
+import httpx
+import orjson
+import pytest
+from fastapi import status
+
+from backend.core.events import (
+    CLOSED,
+    RESYNC,
+    EventHub,
+    LocalBroker,
+    RedisBroker,
+    event_hub,
+)
+from backend.main import app
+
+
+class EventStream:
+    """GET /events driven straight through the ASGI app, as TestClient would
+    wait for the endless body."""
+
+    def __init__(self, token: str, query: str = ""):
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.requested = False
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/events",
+            "raw_path": b"/events",
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Bearer {token}".encode()),
+            ],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80),
+        }
+        self.task = asyncio.create_task(app(scope, self._receive, self.messages.put))
+
+    async def _receive(self) -> dict:
+        if not self.requested:
+            self.requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def start(self) -> dict:
+        message = await asyncio.wait_for(self.messages.get(), 5)
+        assert message["type"] == "http.response.start"
+        assert message["status"] == status.HTTP_200_OK
+        return dict(message["headers"])
+
+    async def next_event(self) -> tuple[str, Optional[dict]]:
+        while True:
+            message = await asyncio.wait_for(self.messages.get(), 5)
+            body = message.get("body", b"")
+            if not message.get("more_body", False) and not body:
+                return "end", None
+            fields = dict(
+                line.split(": ", 1)
+                for line in body.decode().splitlines()
+                if line and not line.startswith(":") and not line.startswith("retry")
+            )
+            if fields:
+                return fields["event"], orjson.loads(fields["data"])
+
+    async def close(self) -> None:
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, 5)
+
+
+def run(test):
+    async def wrapper():
+        try:
+            await test()
+        finally:
+            await event_hub.close()
+
+    asyncio.run(wrapper())
+
+
+def api(token: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://testserver",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+def test_stream_announces_changes_of_own_projects(
+    authorized_client, other_authorized_client, token
+):
+    project_id = authorized_client.post(
+        "/projects", json={"name": "P", "description": "d"}
+    ).json()["id"]
+
+    async def test():
+        stream = EventStream(token)
+        headers = await stream.start()
+        assert headers[b"content-type"].startswith(b"text/event-stream")
+        assert await stream.next_event() == ("ready", {"projects": 1})
+
+        async with api(token) as client:
+            other_authorized_client.post(
+                "/projects", json={"name": "theirs", "description": "d"}
+            )
+            await client.put(
+                f"/projects/{project_id}", json={"name": "Q", "description": "d"}
+            )
+
+        assert await stream.next_event() == (
+            "change",
+            {
+                "entity": "project",
+                "op": "upsert",
+                "project_id": project_id,
+                "id": project_id,
+            },
+        )
+        await stream.close()
+        assert event_hub.subscriber_count == 0
+
+    run(test)
+
+
+def test_stream_follows_new_memberships(
+    authorized_client, token, other_token, other_user
+):
+    project_id = authorized_client.post(
+        "/projects", json={"name": "P", "description": "d"}
+    ).json()["id"]
+
+    async def test():
+        stream = EventStream(other_token)
+        await stream.start()
+        assert await stream.next_event() == ("ready", {"projects": 0})
+
+        async with api(token) as client:
+            await client.post(
+                f"/projects/{project_id}/participants:batch",
+                json={"participants": [{"login": other_user.login}]},
+            )
+            joined = [(await stream.next_event())[1] for _ in range(2)]
+            assert sorted((e["entity"], e["op"]) for e in joined) == [
+                ("participant", "upsert"),
+                ("project", "grant"),
+            ]
+
+            await client.delete(f"/projects/{project_id}")
+        assert await stream.next_event() == (
+            "change",
+            {
+                "entity": "project",
+                "op": "delete",
+                "project_id": project_id,
+                "id": project_id,
+            },
+        )
+        await stream.close()
+
+    run(test)
+
+
+def test_stream_ends_when_the_hub_closes(token):
+    async def test():
+        stream = EventStream(token)
+        await stream.start()
+        await stream.next_event()
+
+        await event_hub.close()
+
+        assert await stream.next_event() == ("closed", {})
+        assert await stream.next_event() == ("end", None)
+        await stream.close()
+
+    run(test)
+
+
+def test_stream_of_one_project_requires_access(
+    authorized_client, other_authorized_client
+):
+    project_id = other_authorized_client.post(
+        "/projects", json={"name": "theirs", "description": "d"}
+    ).json()["id"]
+
+    response = authorized_client.get(f"/events?project_id={project_id}")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_stream_requires_login(client):
+    assert client.get("/events").status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def hub(queue_size=8) -> EventHub:
+    return EventHub(LocalBroker, queue_size)
+
+
+def event(project_id, op="upsert", entity="document", user_id=None):
+    return {
+        "entity": entity,
+        "op": op,
+        "project_id": project_id,
+        "id": 1,
+        "user_id": user_id,
+    }
+
+
+def drain(subscription) -> list[dict]:
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_hub_routes_by_project_and_user():
+    async def test():
+        events = hub()
+        mine = await events.subscribe(1, [10])
+        fixed = await events.subscribe(1, [10], follow_memberships=False)
+        theirs = await events.subscribe(2, [20])
+
+        events.publish([event(10), event(20), event(11, "grant", "project", 1)])
+        await asyncio.sleep(0)
+        events.publish([event(11)])
+        await asyncio.sleep(0)
+
+        assert [e["project_id"] for e in drain(mine)] == [10, 11, 11]
+        assert [e["project_id"] for e in drain(fixed)] == [10]
+        assert [e["project_id"] for e in drain(theirs)] == [20]
+        assert "user_id" not in drain(mine) and mine.project_ids == {10, 11}
+
+        events.unsubscribe(mine)
+        events.unsubscribe(fixed)
+        events.unsubscribe(theirs)
+        assert events.subscriber_count == 0 and not events._by_project
+
+    asyncio.run(test())
+
+
+def test_hub_replaces_backlog_of_slow_listener_with_resync():
+    async def test():
+        events = hub(queue_size=2)
+        slow = await events.subscribe(1, [10])
+
+        events.publish([event(10)] * 3)
+        await asyncio.sleep(0)
+        events.publish([event(10)])
+        await asyncio.sleep(0)
+
+        assert drain(slow) == [RESYNC]
+        await events.close()
+
+    asyncio.run(test())
+
+
+def test_hub_close_ends_every_subscription():
+    async def test():
+        events = hub()
+        subscriptions = [await events.subscribe(user, [user]) for user in (1, 2)]
+
+        await events.close()
+
+        assert [drain(s) for s in subscriptions] == [[CLOSED], [CLOSED]]
+        assert events.subscriber_count == 0
+        events.publish([event(1)])  # stopped: dropped
+
+    asyncio.run(test())
+
+
+@pytest.mark.parametrize("kind", ["redis", "carrier-pigeon"])
+def test_unusable_broker_settings_fail_loudly(kind, monkeypatch):
+    from backend.core import events
+    from backend.core.settings import settings
+
+    monkeypatch.setattr(settings, "EVENTS_REDIS_URL", None)
+    with pytest.raises(RuntimeError):
+        events.create_broker(kind)
+
+
+class FakePubSub:
+    """a pub/sub connection fed through a queue; exceptions put in it are
+    raised, as by a dropped connection"""
+
+    def __init__(self, down: bool):
+        self.down = down
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        if self.down:
+            raise ConnectionError("connection refused")
+
+    async def listen(self):
+        while True:
+            message = await self.messages.get()
+            if isinstance(message, Exception):
+                raise message
+            yield {"data": orjson.dumps([message])}
+
+    async def aclose(self):
+        pass
+
+
+def test_redis_reader_reconnects_and_resyncs_listeners(monkeypatch):
+    # the first connection works, the next is refused, the third works
+    connections = [FakePubSub(down) for down in (False, True, False)]
+    pending = iter(connections)
+
+    class FakeRedis:
+        def pubsub(self, ignore_subscribe_messages):
+            return next(pending)
+
+        async def aclose(self):
+            pass
+
+    redis = types.ModuleType("redis")
+    redis.asyncio = types.SimpleNamespace(from_url=lambda url: FakeRedis())
+    monkeypatch.setitem(sys.modules, "redis", redis)
+    monkeypatch.setitem(sys.modules, "redis.asyncio", redis.asyncio)
+    monkeypatch.setattr(RedisBroker, "RECONNECT_DELAY", 0.01)
+
+    async def until(condition):
+        for _ in range(500):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("timed out")
+
+    async def test():
+        events = EventHub(lambda: RedisBroker("redis://", "events"), 8)
+        before = await events.subscribe(1, [10])
+        first, _, third = connections
+
+        first.messages.put_nowait(event(10))
+        await until(lambda: not before.queue.empty())
+        first.messages.put_nowait(ConnectionError("connection reset"))
+        await until(lambda: before.closed)
+        # events published meanwhile are lost: listeners have to resync
+        assert drain(before) == [RESYNC]
+
+        after = await events.subscribe(1, [10])
+        third.messages.put_nowait(event(10))
+        await until(lambda: not after.queue.empty())
+        assert [e["project_id"] for e in drain(after)] == [10]
+        await events.close()
+
+    asyncio.run(test())
@@ -0,0 +1,116 @@
+import asyncio
+import io
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.core.fs_storage import FilesystemStorage, ZeroCopyFileResponse
+from backend.core.storage import get_storage
+from backend.main import app
+
+
+@pytest.fixture
+def fs_storage(tmp_path, storage):
+    filesystem = FilesystemStorage(str(tmp_path), signing_key="secret")
+    app.dependency_overrides[get_storage] = lambda: filesystem
+    return filesystem
+
+
+def upload_one(client: TestClient, data: bytes, name: str = "report.pdf") -> dict:
+    project_id = client.post("/projects", json={"name": "On-prem", "description": ""})
+    response = client.post(
+        f"/projects/{project_id.json()['id']}/documents",
+        files={"files": (name, io.BytesIO(data), "application/pdf")},
+    )
+    assert response.status_code == 201
+    return response.json()[0]
+
+
+def test_files_are_sharded_and_written_atomically(
+    authorized_client: TestClient, fs_storage: FilesystemStorage, tmp_path
+):
+    doc = upload_one(authorized_client, b"%PDF-1.7 body")
+
+    path = fs_storage.path_for(doc["s3_key"])
+    assert path.read_bytes() == b"%PDF-1.7 body"
+    assert path.parent.parent.parent == tmp_path
+    assert "report.pdf" not in str(path)
+    assert not list(tmp_path.rglob(".tmp-*"))
+
+
+def test_signed_download_with_range(
+    authorized_client: TestClient, fs_storage: FilesystemStorage
+):
+    data = bytes(range(256)) * 64
+    doc = upload_one(authorized_client, data)
+
+    redirect = authorized_client.get(
+        f"/documents/{doc['id']}/download", follow_redirects=False
+    )
+    assert redirect.status_code == 307
+    url = redirect.headers["location"]
+    assert url.startswith("/files/projects/")
+
+    full = authorized_client.get(url)
+    assert full.status_code == 200
+    assert full.content == data
+    assert full.headers["content-type"] == "application/pdf"
+
+    part = authorized_client.get(url, headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.content == data[100:200]
+
+
+def test_tampered_or_expired_links_are_rejected(
+    client: TestClient, fs_storage: FilesystemStorage
+):
+    key = "projects/1/uploads/x_a.txt"
+    url = urlsplit(fs_storage.presign(key))
+    query = parse_qs(url.query)
+
+    forged = f"{url.path}?expires={int(query['expires'][0]) + 60}&signature={query['signature'][0]}"
+    assert client.get(forged).status_code == 403
+
+    expired = int(time.time()) - 1
+    signature = fs_storage.signature(key, expired)
+    response = client.get(f"{url.path}?expires={expired}&signature={signature}")
+    assert response.status_code == 403
+
+
+def test_accel_redirect_hands_the_file_to_nginx(
+    authorized_client: TestClient, fs_storage: FilesystemStorage
+):
+    fs_storage.accel_redirect_prefix = "/internal-files/"
+    doc = upload_one(authorized_client, b"data")
+    url = fs_storage.presign(doc["s3_key"])
+
+    response = authorized_client.get(url)
+    assert response.content == b""
+    relative = fs_storage.path_for(doc["s3_key"]).relative_to(fs_storage.root)
+    assert response.headers["x-accel-redirect"] == f"/internal-files/{relative}"
+
+
+def test_files_route_is_off_for_other_backends(client: TestClient):
+    assert client.get("/files/a?expires=1&signature=x").status_code == 404
+
+
+def test_pathsend_is_used_when_the_server_supports_it(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(b"x" * 10)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [],
+        "extensions": {"http.response.pathsend": {}},
+    }
+    asyncio.run(ZeroCopyFileResponse(path)(scope, None, send))
+
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[1] == {"type": "http.response.pathsend", "path": str(path)}
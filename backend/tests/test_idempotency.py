@@ -0,0 +1,174 @@
+import asyncio
+import io
+
+import httpx
+from fastapi import status
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from backend.core.idempotency import (
+    Fingerprint,
+    IdempotencyMiddleware,
+    MemoryIdempotencyStore,
+)
+
+
+def create(client, key, name="P"):
+    return client.post(
+        "/projects",
+        json={"name": name, "description": "d"},
+        headers={"Idempotency-Key": key},
+    )
+
+
+def test_repeated_create_returns_the_first_response(authorized_client):
+    first = create(authorized_client, "k1")
+    second = create(authorized_client, "k1")
+
+    assert first.status_code == second.status_code == status.HTTP_201_CREATED
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len(authorized_client.get("/projects").json()) == 1
+
+
+def test_key_reused_with_another_body_is_rejected(authorized_client):
+    create(authorized_client, "k1")
+
+    response = create(authorized_client, "k1", name="other")
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert len(authorized_client.get("/projects").json()) == 1
+
+
+def test_keys_are_scoped_per_user(authorized_client, other_authorized_client):
+    mine = create(authorized_client, "k1")
+    theirs = create(other_authorized_client, "k1")
+
+    assert theirs.status_code == status.HTTP_201_CREATED
+    assert "idempotent-replayed" not in theirs.headers
+    assert theirs.json()["id"] != mine.json()["id"]
+
+
+def test_invalid_key_is_refused(authorized_client):
+    assert create(authorized_client, "").status_code == status.HTTP_400_BAD_REQUEST
+    assert create(authorized_client, "k" * 256).status_code == 400
+
+
+def upload(client, project_id, key, content=b"%PDF-1.4 test"):
+    # httpx picks a new multipart boundary for every request
+    return client.post(
+        f"/projects/{project_id}/documents",
+        files={"files": ("file.pdf", io.BytesIO(content), "application/pdf")},
+        headers={"Idempotency-Key": key},
+    )
+
+
+def test_retried_upload_stores_the_file_once(authorized_client, storage):
+    project_id = create(authorized_client, "p").json()["id"]
+
+    first = upload(authorized_client, project_id, "u1")
+    second = upload(authorized_client, project_id, "u1")
+
+    assert first.status_code == status.HTTP_201_CREATED
+    assert second.json() == first.json()
+    assert len(storage.objects) == 1
+    assert upload(authorized_client, project_id, "u1", b"other").status_code == 422
+
+
+def test_refused_attempt_is_not_replayed(
+    authorized_client, other_authorized_client, other_user
+):
+    project_id = create(authorized_client, "p").json()["id"]
+    assert upload(other_authorized_client, project_id, "u1").status_code == 403
+
+    authorized_client.post(
+        f"/projects/{project_id}/invite", params={"user": other_user.login}
+    )
+
+    assert upload(other_authorized_client, project_id, "u1").status_code == 201
+
+
+def test_concurrent_duplicate_waits_for_the_first_attempt():
+    calls = []
+    release = asyncio.Event()
+
+    async def slow_create(request: Request):
+        calls.append(await request.body())
+        await release.wait()
+        return JSONResponse({"id": len(calls)}, status_code=201)
+
+    app = IdempotencyMiddleware(
+        Starlette(routes=[Route("/projects", slow_create, methods=["POST"])]),
+        store=MemoryIdempotencyStore(16),
+    )
+
+    async def test():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://testserver"
+        ) as client:
+
+            def post():
+                return client.post(
+                    "/projects", json={"name": "P"}, headers={"Idempotency-Key": "k"}
+                )
+
+            first = asyncio.create_task(post())
+            second = asyncio.create_task(post())
+            await asyncio.sleep(0.2)
+            assert len(calls) == 1
+            release.set()
+            return await first, await second
+
+    first, second = asyncio.run(test())
+
+    assert len(calls) == 1
+    assert first.json() == second.json() == {"id": 1}
+    assert [first.status_code, second.status_code] == [201, 201]
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def fingerprint(boundary: str, body: bytes, chunk_size: int) -> str:
+    result = Fingerprint(
+        {
+            "headers": [
+                (b"content-type", f"multipart/form-data; boundary={boundary}".encode())
+            ]
+        }
+    )
+    for start in range(0, len(body), chunk_size):
+        end = start + chunk_size
+        result.update(body[start:end])
+    result.finish()
+    return result.hexdigest()
+
+
+def multipart(boundary: str, content: bytes) -> bytes:
+    return (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=files; "
+        f'filename="a.txt"\r\n\r\n'.encode()
+        + content
+        + f"\r\n--{boundary}--\r\n".encode()
+    )
+
+
+def test_fingerprint_ignores_the_multipart_boundary():
+    one = fingerprint("aaaa1111", multipart("aaaa1111", b"data"), 5)
+    two = fingerprint("b2b2b2b2b2b2", multipart("b2b2b2b2b2b2", b"data"), 3)
+    other = fingerprint("aaaa1111", multipart("aaaa1111", b"date"), 5)
+
+    assert one == two
+    assert one != other
+
+
+def test_memory_store_claims_and_expires():
+    store = MemoryIdempotencyStore(2)
+
+    assert store.add("a", b"pending", 60)
+    assert not store.add("a", b"pending", 60)
+
+    store.set("a", b"done", 0)
+    assert store.get("a") is None
+    assert store.add("a", b"pending", 60)
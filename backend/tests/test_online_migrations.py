@@ -0,0 +1,174 @@
+import io
+from contextlib import contextmanager
+
+import pytest
+import sqlalchemy as sa
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+
+import backend.models.sql_models as db_models
+from backend.db import online_migrations as online
+from backend.db.apply_schema import Base
+
+
+@pytest.fixture
+def connection():
+    engine = sa.create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, upper_name TEXT)"
+        )
+        connection.execute(
+            sa.text("INSERT INTO items (id, name) VALUES (:id, :name)"),
+            [{"id": i, "name": f"item {i}"} for i in range(1, 26)],
+        )
+        connection.commit()
+        yield connection
+    engine.dispose()
+
+
+@contextmanager
+def migration(connection=None):
+    """op bound to connection, or writing a PostgreSQL script without one"""
+    if connection is None:
+        buffer = io.StringIO()
+        context = MigrationContext.configure(
+            dialect_name="postgresql",
+            opts={"as_sql": True, "output_buffer": buffer},
+        )
+        context.buffer = buffer
+    else:
+        # transactional like a migration run, whose transaction the helpers end
+        context = MigrationContext.configure(
+            connection, opts={"transactional_ddl": True}
+        )
+    with Operations.context(context), context.begin_transaction():
+        yield context
+
+
+def rows(connection):
+    return connection.execute(
+        sa.text("SELECT id, upper_name FROM items ORDER BY id")
+    ).all()
+
+
+def test_backfill_updates_every_row_in_batches(connection):
+    with migration(connection):
+        updated = online.backfill(
+            "items",
+            "upper_name = upper(name)",
+            where="upper_name IS NULL",
+            batch_size=10,
+            throttle=0,
+        )
+
+    assert updated == 25
+    assert rows(connection)[-1] == (25, "ITEM 25")
+    # a finished backfill leaves no checkpoint to resume from
+    assert connection.execute(sa.select(online.CHECKPOINTS)).all() == []
+
+
+def test_backfill_resumes_after_its_checkpoint(connection):
+    online.CHECKPOINTS.create(connection)
+    connection.execute(
+        online.CHECKPOINTS.insert().values(name="upper names", last_id=20)
+    )
+    connection.commit()
+
+    with migration(connection):
+        updated = online.backfill(
+            "items",
+            "upper_name = upper(name)",
+            batch_size=2,
+            throttle=0,
+            checkpoint="upper names",
+        )
+
+    assert updated == 5
+    assert [row.id for row in rows(connection) if row.upper_name] == [
+        21,
+        22,
+        23,
+        24,
+        25,
+    ]
+
+
+def test_backfill_of_an_empty_table(connection):
+    connection.exec_driver_sql("DELETE FROM items")
+    connection.commit()
+
+    with migration(connection):
+        assert online.backfill("items", "upper_name = name", throttle=0) == 0
+
+
+def test_required_columns_are_added_in_steps(connection):
+    with migration(connection):
+        with pytest.raises(ValueError):
+            online.add_column("items", sa.Column("code", sa.String(10), nullable=False))
+
+        online.add_column("items", sa.Column("code", sa.String(10)))
+        online.backfill("items", "code = 'x'", where="code IS NULL", throttle=0)
+        online.set_not_null("items", "code")
+        online.create_index_concurrently("ix_items_code", "items", ["code"])
+
+    columns = {c["name"]: c for c in sa.inspect(connection).get_columns("items")}
+    assert columns["code"]["nullable"] is False
+    assert [i["name"] for i in sa.inspect(connection).get_indexes("items")] == [
+        "ix_items_code"
+    ]
+
+
+def test_postgres_script_builds_indexes_concurrently():
+    with migration() as context:
+        online.create_index_concurrently(
+            "ix_items_name_trgm", "items", ["name gin_trgm_ops"], using="GIN"
+        )
+        online.backfill("items", "upper_name = upper(name)", where="upper_name IS NULL")
+        online.set_not_null("items", "upper_name")
+    sql = context.buffer.getvalue()
+
+    assert (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_name_trgm "
+        "ON items USING GIN (name gin_trgm_ops)"
+    ) in sql
+    # the build runs outside a transaction and without the statement timeout
+    assert sql.index("COMMIT") < sql.index("SET statement_timeout = 0")
+    assert sql.index("SET statement_timeout = 0") < sql.index("CREATE INDEX")
+    assert "UPDATE items SET upper_name = upper(name) WHERE upper_name IS NULL" in sql
+    assert "CHECK (upper_name IS NOT NULL) NOT VALID" in sql
+    assert "VALIDATE CONSTRAINT items_upper_name_not_null" in sql
+
+
+def test_rebuilding_a_parent_table_keeps_its_children():
+    # a connection like the one alembic/env.py opens
+    engine = sa.create_engine("sqlite://", poolclass=sa.pool.StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        connection.execute(
+            sa.insert(db_models.User).values(id=1, login="u", hashed_password="x")
+        )
+        connection.execute(
+            sa.insert(db_models.Project).values(
+                id=1, name="p", description="d", owner_id=1
+            )
+        )
+        connection.execute(
+            sa.insert(db_models.Document).values(
+                project_id=1, file_name="f", s3_key="k", uploader_id=1
+            )
+        )
+        connection.execute(
+            sa.insert(db_models.ProjectParticipant).values(project_id=1, user_id=1)
+        )
+        connection.commit()
+
+        with migration(connection):
+            online.add_column("projects", sa.Column("code", sa.String(10)))
+            online.backfill("projects", "code = 'x'", throttle=0)
+            online.set_not_null("projects", "code")
+
+        count = "SELECT count(*) FROM {}"
+        assert connection.scalar(sa.text(count.format("documents"))) == 1
+        assert connection.scalar(sa.text(count.format("project_participants"))) == 1
+    engine.dispose()
@@ -1,6 +1,9 @@
+import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
+import backend.models.sql_models as db_models
+
 
 def create_test_project(
     client: TestClient, name: str = "Default Test Project", desc: str = "Default Desc"
@@ -152,3 +155,73 @@ def test_delete_project_forbidden_participant(
 
     response = other_authorized_client.delete(f"/projects/{project_id}")
     assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+BATCH_ENDPOINT = "POST /projects/{project_id}/participants:batch"
+
+
+# one multi-row statement each for the memberships and their change_log rows
+@pytest.mark.query_budget(6, max_repeats=1, endpoint=BATCH_ENDPOINT)
+def test_batch_invite_team_in_one_request(
+    authorized_client, db_session, test_user, other_user
+):
+    team = [
+        db_models.User(login=f"member{i}@team.com", hashed_password="x")
+        for i in range(500)
+    ]
+    db_session.add_all(team)
+    db_session.commit()
+    project_id = create_test_project(authorized_client, name="Onboarding")
+    authorized_client.post(f"/projects/{project_id}/invite?user={other_user.login}")
+
+    participants = [{"login": user.login} for user in team]
+    participants += [
+        {"login": other_user.login},
+        {"login": test_user.login},
+        {"login": "ghost@team.com"},
+        {"login": "member0@team.com", "role": "viewer"},
+    ]
+    response = authorized_client.post(
+        f"/projects/{project_id}/participants:batch",
+        json={"participants": participants},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    results = {r["login"]: r["status"] for r in response.json()}
+    assert len(results) == 503
+    assert sum(s == "added" for s in results.values()) == 500
+    assert results[other_user.login] == "already_present"
+    assert results[test_user.login] == "already_present"
+    assert results["ghost@team.com"] == "unknown"
+
+    rows = db_session.query(db_models.ProjectParticipant).filter_by(
+        project_id=project_id
+    )
+    assert rows.count() == 501
+    assert rows.filter_by(user_id=team[0].id).one().role == "participant"
+
+
+def test_batch_invite_is_idempotent(authorized_client, other_user):
+    project_id = create_test_project(authorized_client)
+    url = f"/projects/{project_id}/participants:batch"
+    body = {"participants": [{"login": other_user.login, "role": "viewer"}]}
+
+    assert authorized_client.post(url, json=body).json()[0]["status"] == "added"
+    assert (
+        authorized_client.post(url, json=body).json()[0]["status"] == "already_present"
+    )
+
+
+def test_batch_invite_owner_only_and_validated(
+    authorized_client, other_authorized_client, other_user
+):
+    project_id = create_test_project(authorized_client)
+    url = f"/projects/{project_id}/participants:batch"
+
+    body = {"participants": [{"login": other_user.login}]}
+    response = other_authorized_client.post(url, json=body)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    body = {"participants": [{"login": other_user.login, "role": "owner"}]}
+    assert authorized_client.post(url, json=body).status_code == 422
+    assert authorized_client.post(url, json={"participants": []}).status_code == 422
@@ -0,0 +1,109 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi import status
+
+from backend.core.export import CSV_COLUMNS, gzip_chunks
+from backend.core.settings import settings
+
+
+def create_project(client, name):
+    response = client.post("/projects", json={"name": name, "description": "d"})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def upload(client, project_id, *names):
+    files = [("files", (name, io.BytesIO(b"data"), "text/plain")) for name in names]
+    response = client.post(f"/projects/{project_id}/documents", files=files)
+    assert response.status_code == status.HTTP_201_CREATED
+    return [doc["id"] for doc in response.json()]
+
+
+@pytest.fixture
+def exported_data(authorized_client, other_authorized_client, other_user):
+    mine = create_project(authorized_client, "mine")
+    shared = create_project(other_authorized_client, "shared")
+    hidden = create_project(other_authorized_client, "hidden")
+    response = other_authorized_client.post(
+        f"/projects/{shared}/participants:batch",
+        json={"participants": [{"login": "testuser@fixture.com"}]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    documents = upload(authorized_client, mine, "a.txt", "b.txt", "c.txt")
+    documents += upload(other_authorized_client, shared, "d.txt")
+    upload(other_authorized_client, hidden, "secret.txt")
+    return {"projects": [mine, shared], "documents": documents}
+
+
+def ndjson_records(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.query_budget(4, max_repeats=1, endpoint="GET /projects/export")
+def test_export_ndjson(authorized_client, exported_data, test_user, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+
+    response = authorized_client.get("/projects/export")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "projects-export.ndjson" in response.headers["content-disposition"]
+
+    records = ndjson_records(response)
+    kinds = [record["type"] for record in records]
+    assert kinds == ["project"] * 2 + ["participant"] + ["document"] * 4
+
+    projects = [r for r in records if r["type"] == "project"]
+    assert [p["id"] for p in projects] == exported_data["projects"]
+    participant = records[2]
+    assert participant["project_id"] == exported_data["projects"][1]
+    assert participant["login"] == "testuser@fixture.com"
+    documents = [r for r in records if r["type"] == "document"]
+    assert [d["id"] for d in documents] == exported_data["documents"]
+    assert "s3_key" not in documents[0]
+    assert "secret.txt" not in response.text
+
+
+def test_export_csv(authorized_client, exported_data):
+    response = authorized_client.get("/projects/export?format=csv")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == CSV_COLUMNS
+    assert [row["type"] for row in rows].count("document") == 4
+    assert rows[0]["name"] == "mine"
+    assert rows[0]["file_name"] == ""
+
+
+def test_export_gzip(authorized_client, exported_data):
+    plain = authorized_client.get("/projects/export")
+    response = authorized_client.get("/projects/export?compression=gzip")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/gzip"
+    assert "projects-export.ndjson.gz" in response.headers["content-disposition"]
+    assert gzip.decompress(response.content) == plain.content
+
+
+def test_export_empty(authorized_client):
+    response = authorized_client.get("/projects/export?format=csv")
+    assert response.text.strip() == ",".join(CSV_COLUMNS)
+
+
+def test_export_rejects_unknown_format(authorized_client):
+    response = authorized_client.get("/projects/export?format=xml")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_export_requires_auth(client):
+    assert client.get("/projects/export").status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_gzip_chunks_round_trip():
+    chunks = [b"x" * 100_000, b"", b"tail"]
+    assert gzip.decompress(b"".join(gzip_chunks(iter(chunks)))) == b"".join(chunks)
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from fastapi import status
+
+from backend.core.ndjson import iter_lines
+from backend.core.settings import settings
+import backend.models.sql_models as db_models
+
+
+def ndjson(*items) -> bytes:
+    return b"".join(json.dumps(item).encode() + b"\n" for item in items)
+
+
+def import_projects(client, body, **params):
+    response = client.post(
+        "/projects/import",
+        content=body,
+        params=params,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def collect(chunks, max_line_bytes=100):
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    return [item async for item in iter_lines(source(), max_line_bytes)]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])
+async def test_iter_lines_splits_across_chunks(anyio_backend):
+    lines = await collect([b'{"a"', b':1}\n\n{"b":2', b"}\n", b'{"c":3}'])
+
+    assert lines == [(1, b'{"a":1}'), (3, b'{"b":2}'), (4, b'{"c":3}')]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])
+async def test_iter_lines_drops_oversized_line(anyio_backend):
+    lines = await collect([b"x" * 8, b"x" * 8, b"x\nok\n", b"y" * 20], 10)
+
+    assert lines == [(1, None), (2, b"ok"), (3, None)]
+
+
+def test_import_creates_projects(authorized_client, test_user, db_session):
+    owner_id = test_user.id
+    body = ndjson(*({"name": f"P{i}", "description": f"d{i}"} for i in range(5)))
+
+    results = import_projects(authorized_client, body, batch_size=2)
+
+    assert [r["line"] for r in results[:-1]] == [1, 2, 3, 4, 5]
+    assert all(r["status"] == "created" for r in results[:-1])
+    assert results[-1] == {"summary": {"created": 5, "failed": 0}}
+
+    ids = [r["id"] for r in results[:-1]]
+    projects = db_session.query(db_models.Project).filter(db_models.Project.id.in_(ids))
+    by_id = {p.id: p for p in projects}
+    assert [by_id[i].name for i in ids] == [f"P{i}" for i in range(5)]
+    assert all(p.owner_id == owner_id for p in by_id.values())
+
+    listed = authorized_client.get("/projects").json()
+    assert {p["id"] for p in listed} == set(ids)
+
+
+def test_import_reports_invalid_lines(authorized_client, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_MAX_LINE_BYTES", 200)
+    body = (
+        ndjson({"name": "ok", "description": "fine"})
+        + b"not json\n"
+        + ndjson({"name": "no description"})
+        + ndjson({"name": "x", "description": "y", "owner_id": 1})
+        + ndjson({"name": "long", "description": "z" * 500})
+        + ndjson({"name": "also ok", "description": "fine"})
+    )
+
+    results = import_projects(authorized_client, body)
+
+    by_line = {r["line"]: r for r in results[:-1]}
+    assert by_line[1]["status"] == "created"
+    assert by_line[6]["status"] == "created"
+    assert by_line[2]["status"] == "error"
+    assert by_line[3]["error"].startswith("description:")
+    assert by_line[4]["error"].startswith("owner_id:")
+    assert by_line[5]["error"] == "Line too long"
+    assert results[-1] == {"summary": {"created": 2, "failed": 4}}
+
+
+def test_import_empty_body(authorized_client):
+    assert import_projects(authorized_client, b"") == [
+        {"summary": {"created": 0, "failed": 0}}
+    ]
+
+
+def test_import_batch_size_is_bounded(authorized_client):
+    response = authorized_client.post("/projects/import?batch_size=0", content=b"")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_import_requires_auth(client):
+    body = ndjson({"name": "P", "description": "d"})
+    response = client.post("/projects/import", content=body)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
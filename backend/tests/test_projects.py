@@ -2,7 +2,9 @@ from fastapi.testclient import TestClient
 
 
 from fastapi import status
-from backend.models.sql_models import User
+from sqlalchemy import select
+
+from backend.models.sql_models import Document, ProjectParticipant, User
 
 
 def create_test_project(
@@ -143,3 +145,24 @@ def test_delete_project_unauthorized(client: TestClient, authorized_client: Test
 def test_delete_project_not_found(authorized_client):
     response = authorized_client.delete("/projects/99999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_delete_project_removes_documents_participants_and_objects(
+    authorized_client: TestClient, other_user: User, db_session, storage
+):
+    project_id = create_test_project(authorized_client)
+    files = [("files", (f"{i}.txt", b"data", "text/plain")) for i in range(3)]
+    authorized_client.post(f"/projects/{project_id}/documents", files=files)
+    authorized_client.post(f"/projects/{project_id}/invite?user={other_user.login}")
+    assert len(storage.objects) == 3
+
+    response = authorized_client.delete(f"/projects/{project_id}")
+
+    assert response.status_code == status.HTTP_200_OK
+    for table in (Document, ProjectParticipant):
+        remaining = db_session.scalars(
+            select(table).where(table.project_id == project_id)
+        ).all()
+        assert remaining == []
+    # removed from storage by a background task once the rows were gone
+    assert storage.objects == {}
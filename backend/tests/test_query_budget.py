@@ -0,0 +1,129 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import backend.models.sql_models as db_models
+from backend.db.query_counter import track_queries
+
+
+def create_project(client: TestClient, name="Budget project"):
+    response = client.post("/projects", json={"name": name, "description": "Desc"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def upload(client: TestClient, project_id: int, count: int = 1):
+    files = [
+        ("files", (f"file_{i}.txt", io.BytesIO(b"data"), "text/plain"))
+        for i in range(count)
+    ]
+    response = client.post(f"/projects/{project_id}/documents", files=files)
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_requests_are_counted(authorized_client: TestClient, query_counter):
+    project_id = create_project(authorized_client)
+    authorized_client.get(f"/projects/{project_id}")
+
+    labels = [stats.label for stats in query_counter]
+    assert labels == ["POST /projects", "GET /projects/{project_id}"]
+    assert all(stats.count > 0 for stats in query_counter)
+
+
+@pytest.mark.query_budget(5, endpoint="GET /projects/{project_id}/documents")
+def test_list_documents_query_count_is_constant(authorized_client: TestClient):
+    project_id = create_project(authorized_client)
+    upload(authorized_client, project_id, count=5)
+
+    response = authorized_client.get(f"/projects/{project_id}/documents")
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+
+@pytest.mark.query_budget(
+    5, max_repeats=1, endpoint="POST /projects/{project_id}/documents"
+)
+def test_upload_query_count_does_not_grow_with_files(authorized_client: TestClient):
+    project_id = create_project(authorized_client)
+    docs = upload(authorized_client, project_id, count=10)
+
+    assert len(docs) == 10
+    assert all(doc["id"] and doc["created_at"] for doc in docs)
+
+
+@pytest.mark.query_budget(5, endpoint="DELETE /documents/{document_id}")
+def test_delete_document_does_not_lazy_load(authorized_client: TestClient):
+    project_id = create_project(authorized_client)
+    doc_id = upload(authorized_client, project_id)[0]["id"]
+
+    response = authorized_client.delete(f"/documents/{doc_id}")
+    assert response.status_code == 204
+
+
+def test_repeated_statements_are_flagged(db_session: Session, test_user):
+    with track_queries("loop") as stats:
+        for _ in range(3):
+            db_session.execute(
+                select(db_models.User).where(db_models.User.id == test_user.id)
+            ).scalar_one()
+
+    assert stats.count == 3
+    assert list(stats.repeated(3).values()) == [3]
+
+
+def test_lazy_loads_are_recorded(
+    authorized_client: TestClient, db_session: Session, test_user
+):
+    project_id = create_project(authorized_client)
+    doc_id = upload(authorized_client, project_id)[0]["id"]
+    db_session.expunge_all()
+
+    with track_queries("lazy") as stats:
+        doc = db_session.get(db_models.Document, doc_id)
+        assert doc.project.id == project_id
+
+    assert stats.count == 2
+    assert len(stats.lazy_loads) == 1
+    assert stats.lazy_loads == ["Document.project"]
+
+
+@pytest.mark.query_budget(6, max_repeats=1, endpoint="DELETE /projects/{project_id}")
+def test_delete_project_leaves_children_to_the_database(
+    authorized_client: TestClient, other_user
+):
+    project_id = create_project(authorized_client)
+    upload(authorized_client, project_id, count=10)
+    authorized_client.post(f"/projects/{project_id}/invite?user={other_user.login}")
+
+    response = authorized_client.delete(f"/projects/{project_id}")
+    assert response.status_code == 200
+
+
+@pytest.mark.query_budget(5, max_repeats=1, endpoint="POST /documents:batch-delete")
+def test_batch_delete_query_count_does_not_grow(authorized_client: TestClient):
+    # spread over several projects, whose versions are bumped together
+    project_ids = [create_project(authorized_client, f"P{i}") for i in range(5)]
+    ids = [
+        doc["id"]
+        for project_id in project_ids
+        for doc in upload(authorized_client, project_id, count=10)
+    ]
+    versions = {
+        project_id: authorized_client.get(f"/projects/{project_id}").headers["ETag"]
+        for project_id in project_ids
+    }
+
+    response = authorized_client.post(
+        "/documents:batch-delete", json={"ids": ids + [10**9]}
+    )
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()].count("deleted") == 50
+    for project_id, etag in versions.items():
+        response = authorized_client.get(
+            f"/projects/{project_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
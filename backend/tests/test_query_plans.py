@@ -0,0 +1,190 @@
+"""EXPLAIN QUERY PLAN of every hot query against a seeded SQLite database.
+
+A query fails if it reads a whole table (SCAN), makes SQLite build a
+throwaway index (AUTOMATIC INDEX), or sorts (TEMP B-TREE) where an index
+could return the rows in order. Sorting is only allowed where the rows come
+from several index ranges at once, e.g. all projects a user owns or joined,
+or are ranked by relevance.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import backend.models.sql_models as db_models
+from backend.core.revocation import is_revoked_stmt, revocations_stmt
+from backend.db.apply_schema import Base
+from backend.db.changes import changes_stmt
+from backend.db.queries import (
+    accessible_projects_stmt,
+    accessible_projects_version_stmt,
+    export_documents_stmt,
+    export_participants_stmt,
+    project_documents_stmt,
+)
+from backend.db.search import document_search_stmt, project_search_stmt
+
+USERS, PROJECTS, DOCUMENTS = 200, 1000, 10_000
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.execute(
+            insert(db_models.User),
+            [
+                {"id": i, "login": f"user{i}", "hashed_password": "x"}
+                for i in range(1, USERS + 1)
+            ],
+        )
+        db.execute(
+            insert(db_models.Project),
+            [
+                {
+                    "id": i,
+                    "name": f"project {i}",
+                    "description": "",
+                    "owner_id": i % USERS + 1,
+                }
+                for i in range(1, PROJECTS + 1)
+            ],
+        )
+        db.execute(
+            insert(db_models.ProjectParticipant),
+            [
+                {"user_id": (i * 7) % USERS + 1, "project_id": i, "role": "participant"}
+                for i in range(1, PROJECTS + 1)
+                if (i * 7) % USERS != i % USERS
+            ],
+        )
+        db.execute(
+            insert(db_models.Document),
+            [
+                {
+                    "project_id": i % PROJECTS + 1,
+                    "file_name": f"scan-{i}.pdf",
+                    "s3_key": f"key-{i}",
+                    "uploader_id": i % USERS + 1,
+                }
+                for i in range(DOCUMENTS)
+            ],
+        )
+        db.execute(
+            insert(db_models.ChangeLog),
+            [
+                {
+                    "project_id": i % PROJECTS + 1,
+                    "user_id": None if i % 10 else i % USERS + 1,
+                    "entity": "document",
+                    "entity_id": i,
+                    "op": "upsert",
+                }
+                for i in range(DOCUMENTS)
+            ],
+        )
+        db.execute(
+            insert(db_models.RevokedToken),
+            [
+                {
+                    "jti": f"{i:032x}",
+                    "user_id": i % USERS + 1,
+                    "expires_at": datetime(2100, 1, 1) + timedelta(minutes=i),
+                }
+                for i in range(DOCUMENTS)
+            ],
+        )
+        db.commit()
+        db.execute(text("ANALYZE"))
+        yield db
+    engine.dispose()
+
+
+def query_plan(db: Session, stmt) -> list[str]:
+    sql = stmt.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    return [row.detail for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+HOT_QUERIES = {
+    # name: (statement, may sort)
+    "list project documents": (project_documents_stmt(5), False),
+    "list projects": (accessible_projects_stmt(5), True),
+    "projects version": (accessible_projects_version_stmt(5), False),
+    "export participants": (export_participants_stmt(5), False),
+    "export documents": (export_documents_stmt(5), False),
+    "sync feed": (changes_stmt(5, (0, 100), (0, DOCUMENTS), 101), True),
+    "search projects": (project_search_stmt("sqlite", 5, "project", 21), True),
+    "search documents": (document_search_stmt("sqlite", 5, "scan", 21), True),
+    "revocations since": (revocations_stmt("sqlite", (0, DOCUMENTS - 20)), False),
+    "revocation check": (is_revoked_stmt("0" * 32), False),
+    "user by login": (
+        select(db_models.User).where(db_models.User.login == "user5"),
+        False,
+    ),
+    "project members": (
+        select(db_models.ProjectParticipant.user_id).where(
+            db_models.ProjectParticipant.project_id == 5
+        ),
+        False,
+    ),
+    "membership check": (
+        select(db_models.ProjectParticipant).where(
+            db_models.ProjectParticipant.project_id == 5,
+            db_models.ProjectParticipant.user_id == 5,
+        ),
+        False,
+    ),
+}
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_indexes(seeded, name):
+    stmt, may_sort = HOT_QUERIES[name]
+    plan = query_plan(seeded, stmt)
+
+    full_scans = [
+        step
+        for step in plan
+        if step.startswith("SCAN ") and "VIRTUAL TABLE" not in step
+    ]
+    assert not full_scans, plan
+    assert not [step for step in plan if "AUTOMATIC" in step], plan
+    if not may_sort:
+        assert not [step for step in plan if "TEMP B-TREE" in step], plan
+
+
+def test_project_documents_are_read_in_index_order(seeded):
+    plan = query_plan(seeded, project_documents_stmt(5))
+
+    assert plan == [
+        "SEARCH documents USING INDEX ix_documents_project_created (project_id=?)"
+    ]
+
+
+def test_document_search_is_driven_by_the_trigram_index(seeded):
+    plan = query_plan(seeded, document_search_stmt("sqlite", 5, "scan-42", 21))
+
+    # matching rowids first, then documents by primary key: not every
+    # document of the user's projects checked against documents_fts
+    assert plan[:3] == [
+        "SEARCH documents USING INTEGER PRIMARY KEY (rowid=?)",
+        "LIST SUBQUERY 1",
+        "SCAN documents_fts VIRTUAL TABLE INDEX 0:L0",
+    ]
+    assert not [step for step in plan if "ix_documents_project_created" in step]
+
+
+def test_sync_feed_reads_project_rows_through_the_project_index(seeded):
+    plan = query_plan(seeded, changes_stmt(5, (0, 100), (0, DOCUMENTS), 101))
+
+    assert any("ix_change_log_project_position" in step for step in plan), plan
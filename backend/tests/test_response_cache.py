@@ -0,0 +1,148 @@
+import io
+import time
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from backend.core.cache import CacheBackend, LRUCacheBackend, ResponseCache
+
+
+class SharedDictBackend(CacheBackend):
+    """stand-in for a key-value service several workers talk to"""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self.data[key] = value
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def presign_calls(monkeypatch, storage) -> list[str]:
+    calls: list[str] = []
+    presign = storage.presign
+
+    def counting_presign(key, expires=None):
+        calls.append(key)
+        return presign(key, expires)
+
+    monkeypatch.setattr(storage, "presign", counting_presign)
+    return calls
+
+
+def create_project(client: TestClient) -> int:
+    response = client.post("/projects", json={"name": "Cached", "description": "d"})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def upload(client: TestClient, project_id: int, name: str) -> None:
+    response = client.post(
+        f"/projects/{project_id}/documents",
+        files={"files": (name, io.BytesIO(b"x"), "text/plain")},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def test_document_list_hit_skips_query_and_presign(
+    authorized_client: TestClient, presign_calls, query_counter
+):
+    project_id = create_project(authorized_client)
+    upload(authorized_client, project_id, "a.txt")
+    url = f"/projects/{project_id}/documents"
+
+    first = authorized_client.get(url)
+    assert len(presign_calls) == 1
+    query_counter.clear()
+
+    second = authorized_client.get(url)
+    assert second.status_code == status.HTTP_200_OK
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["content-type"] == "application/json"
+    assert len(presign_calls) == 1
+    # user lookup and access check only
+    assert query_counter[0].count == 2
+
+
+def test_writes_invalidate_document_list(authorized_client: TestClient, presign_calls):
+    project_id = create_project(authorized_client)
+    upload(authorized_client, project_id, "a.txt")
+    url = f"/projects/{project_id}/documents"
+    authorized_client.get(url)
+
+    upload(authorized_client, project_id, "b.txt")
+    listed = authorized_client.get(url).json()
+    assert {d["file_name"] for d in listed} == {"a.txt", "b.txt"}
+
+    authorized_client.delete(f"/documents/{listed[0]['id']}")
+    assert len(authorized_client.get(url).json()) == 1
+
+
+def test_update_invalidates_project(authorized_client: TestClient):
+    project_id = create_project(authorized_client)
+    url = f"/projects/{project_id}"
+    assert authorized_client.get(url).json()["name"] == "Cached"
+
+    authorized_client.put(url, json={"name": "Renamed", "description": "d"})
+    assert authorized_client.get(url).json()["name"] == "Renamed"
+
+
+def test_participants_are_cached_separately(
+    authorized_client: TestClient, other_authorized_client: TestClient
+):
+    project_id = create_project(authorized_client)
+    url = f"/projects/{project_id}"
+    owner_view = authorized_client.get(url)
+
+    assert other_authorized_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+    authorized_client.post(
+        f"/projects/{project_id}/invite", params={"user": "otheruser@fixture.com"}
+    )
+    participant_view = other_authorized_client.get(url)
+    assert participant_view.status_code == status.HTTP_200_OK
+    assert participant_view.content == owner_view.content
+
+
+def test_stale_version_is_a_miss_on_other_workers():
+    shared = SharedDictBackend()
+    worker_a = ResponseCache(shared, ttl=60)
+    worker_b = ResponseCache(shared, ttl=60)
+
+    worker_a.set("project", 1, "owner", b'{"v":1}', version=1)
+    assert worker_b.get("project", 1, "owner", version=1) == b'{"v":1}'
+    assert worker_b.get("project", 1, "owner", version=2) is None
+
+    worker_b.invalidate_project(1)
+    assert worker_a.get("project", 1, "owner", version=1) is None
+
+
+def test_lru_evicts_oldest_and_expires():
+    backend = LRUCacheBackend(max_entries=2)
+    backend.set("a", b"1", ttl=60)
+    backend.set("b", b"2", ttl=60)
+    backend.get("a")
+    backend.set("c", b"3", ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+
+    backend.set("d", b"4", ttl=0)
+    time.sleep(0.001)
+    assert backend.get("d") is None
+
+
+def test_explicit_zero_ttl_is_kept():
+    cache = ResponseCache(LRUCacheBackend(max_entries=8), ttl=60)
+
+    cache.set("project", 1, "owner", b"{}", version=1, ttl=0)
+    time.sleep(0.001)
+
+    assert cache.get("project", 1, "owner", version=1) is None
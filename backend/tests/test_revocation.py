@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+
+import backend.models.sql_models as db_models
+from backend.core.revocation import BloomFilter, revocations, revoke_token
+from backend.core.security import create_access_token, decode_token
+
+
+def me(client, token):
+    return client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_logout_revokes_only_that_token(client, token, test_user):
+    other_session = create_access_token(subject=test_user.login)
+
+    response = client.post("/logout", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert me(client, token).status_code == status.HTTP_401_UNAUTHORIZED
+    assert me(client, other_session).status_code == status.HTTP_200_OK
+
+
+def test_valid_token_costs_no_revocation_query(client, token, query_counter):
+    assert me(client, token).status_code == status.HTTP_200_OK
+
+    # the user lookup only
+    assert query_counter[-1].count == 1
+
+
+def revoke_elsewhere(db_session, user, token):
+    """a revocation committed through another worker"""
+    payload = decode_token(token)
+    db_session.add(
+        db_models.RevokedToken(
+            jti=payload["jti"],
+            user_id=user.id,
+            expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+        )
+    )
+    db_session.commit()
+
+
+def test_revocations_of_other_workers_arrive_with_the_refresh(
+    client, token, test_user, db_session
+):
+    revoke_elsewhere(db_session, test_user, token)
+    assert me(client, token).status_code == status.HTTP_200_OK
+
+    revocations.refresh(db_session)
+
+    assert me(client, token).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_refresh_runs_in_the_background(token, test_user, db_session, monkeypatch):
+    revoke_elsewhere(db_session, test_user, token)
+    monkeypatch.setattr(revocations, "refresh_interval", 0.01)
+    monkeypatch.setattr(
+        revocations, "_sync_in_own_session", lambda: revocations.sync(db_session)
+    )
+
+    async def test():
+        await revocations.start()
+        await asyncio.sleep(0.1)
+        await revocations.close()
+
+    asyncio.run(test())
+
+    assert revocations.check(decode_token(token)["jti"]) is True
+
+
+def test_rebuild_skips_expired_revocations(client, test_user, db_session):
+    live = create_access_token(subject=test_user.login)
+    revoke_elsewhere(db_session, test_user, live)
+    db_session.add(
+        db_models.RevokedToken(
+            jti="0" * 32,
+            user_id=test_user.id,
+            expires_at=datetime.now(timezone.utc) - timedelta(minutes=1),
+        )
+    )
+    db_session.commit()
+
+    revocations.rebuild(db_session)
+
+    assert me(client, live).status_code == status.HTTP_401_UNAUTHORIZED
+    assert revocations._filter.count == 1
+
+
+def test_false_positive_is_settled_once(client, token, query_counter):
+    bits = revocations._filter._bits
+    bits[:] = b"\xff" * len(bits)
+    lookups = revocations.stats["lookups"]
+
+    assert me(client, token).status_code == status.HTTP_200_OK
+    assert me(client, token).status_code == status.HTTP_200_OK
+
+    assert revocations.stats["lookups"] == lookups + 1
+    assert [stats.count for stats in query_counter] == [2, 1]
+
+
+def test_bloom_filter_error_rate_and_size():
+    bloom = BloomFilter(10_000, 0.01)
+    for i in range(10_000):
+        bloom.add(f"revoked-{i}")
+
+    assert all(f"revoked-{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"valid-{i}" in bloom for i in range(10_000))
+    assert false_positives < 200
+    # a million revoked ids in the low megabytes
+    assert BloomFilter(1_000_000, 0.01).nbytes < 1.25 * 2**20
+
+
+def test_revoking_a_token_twice_is_not_an_error(db_session, token, test_user):
+    payload = decode_token(token)
+
+    # two workers logging the same token out before either refreshed
+    revoke_token(db_session, payload, test_user.id)
+    revoke_token(db_session, payload, test_user.id)
+
+    assert db_session.query(db_models.RevokedToken).count() == 1
+
+
+def test_password_change_revokes_every_token(client, token, test_user):
+    other_session = create_access_token(subject=test_user.login)
+
+    response = client.put(
+        "/users/me/password",
+        json={"current_password": "Password123", "new_password": "Newpass456"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert me(client, token).status_code == status.HTTP_401_UNAUTHORIZED
+    assert me(client, other_session).status_code == status.HTTP_401_UNAUTHORIZED
+    assert me(client, response.json()["access_token"]).status_code == 200
+    login = client.post(
+        "/login", data={"username": test_user.login, "password": "Newpass456"}
+    )
+    assert login.status_code == status.HTTP_200_OK
+
+
+def test_password_change_needs_the_current_password(client, token):
+    response = client.put(
+        "/users/me/password",
+        json={"current_password": "wrong", "new_password": "Newpass456"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert me(client, token).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.parametrize("weak", ["aaaaaaaa", "AAAAAAA1", "aaaaaaa1", "Aaaaaaaa"])
+def test_password_change_refuses_weak_passwords(client, token, weak):
+    response = client.put(
+        "/users/me/password",
+        json={"current_password": "Password123", "new_password": weak},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert me(client, token).status_code == status.HTTP_200_OK
@@ -0,0 +1,98 @@
+import logging
+
+from botocore.awsrequest import AWSResponse
+
+import backend.core.s3_utils as s3_utils
+from backend.core.s3_utils import S3PoolMetrics, S3Store
+
+
+def test_client_uses_pool_timeouts_and_retry_settings(monkeypatch):
+    monkeypatch.setattr(s3_utils.settings, "THREADPOOL_SIZE", 24)
+    monkeypatch.setattr(s3_utils.settings, "S3_TRANSFER_MAX_CONCURRENCY", 6)
+    monkeypatch.setattr(s3_utils.settings, "S3_READ_TIMEOUT", 12.5)
+
+    config = s3_utils.create_s3_client().meta.config
+
+    assert config.max_pool_connections == 30
+    assert config.tcp_keepalive is True
+    assert config.read_timeout == 12.5
+    assert config.retries["mode"] == "adaptive"
+
+
+def test_explicit_pool_size_wins(monkeypatch):
+    monkeypatch.setattr(s3_utils.settings, "S3_MAX_POOL_CONNECTIONS", 7)
+    assert s3_utils.s3_pool_size() == 7
+
+
+def test_uploads_pass_the_transfer_config():
+    store = S3Store()
+    calls = []
+
+    class Client:
+        def upload_fileobj(self, *args, **kwargs):
+            calls.append(kwargs)
+
+    class Upload:
+        filename = "big.bin"
+        content_type = "application/octet-stream"
+        file = None
+
+    store.client = Client()
+    store.upload(Upload(), project_id=1)
+
+    config = calls[0]["Config"]
+    assert config.multipart_threshold == s3_utils.settings.S3_MULTIPART_THRESHOLD
+    assert config.max_request_concurrency == (
+        s3_utils.settings.S3_TRANSFER_MAX_CONCURRENCY
+    )
+
+
+def test_metrics_track_in_flight_calls(monkeypatch):
+    metrics = S3PoolMetrics()
+    monkeypatch.setattr(s3_utils, "s3_pool_metrics", metrics)
+    client = s3_utils.create_s3_client()
+    metrics.pool_size = 1
+
+    class Raw:
+        def stream(self, **kwargs):
+            yield b""
+
+    # answer at the HTTP layer so the whole call path runs without a network
+    client.meta.events.register(
+        "before-send.s3",
+        lambda request, **kwargs: AWSResponse(request.url, 200, {}, Raw()),
+    )
+    client.head_bucket(Bucket="b")
+
+    assert metrics.snapshot()["requests"] == 1
+    assert metrics.snapshot()["in_flight"] == 0
+
+    metrics.request_started()
+    metrics.request_started()
+    assert metrics.snapshot()["saturated_requests"] == 1
+    assert metrics.snapshot()["peak_in_flight"] == 2
+
+
+def test_pool_full_warnings_are_counted():
+    before = s3_utils.s3_pool_metrics.pool_full_discards
+    logging.getLogger("urllib3.connectionpool").warning(
+        "Connection pool is full, discarding connection: %s. Connection pool size: %s",
+        "s3.local",
+        10,
+    )
+    assert s3_utils.s3_pool_metrics.pool_full_discards == before + 1
+
+
+def test_ping_reports_the_pool_once_s3_is_in_use(client, monkeypatch):
+    from backend.core import storage
+
+    assert "s3_pool" not in client.get("/ping").json()
+
+    monkeypatch.setattr(storage, "_storage", storage.ThreadedS3Storage(S3Store()))
+    metrics = S3PoolMetrics()
+    metrics.pool_size = 48
+    monkeypatch.setattr(s3_utils, "s3_pool_metrics", metrics)
+
+    response = client.get("/ping")
+
+    assert response.json()["s3_pool"]["pool_size"] == 48
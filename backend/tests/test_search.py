@@ -0,0 +1,243 @@
+import io
+
+import pytest
+from fastapi import status
+from sqlalchemy.dialects import postgresql
+
+import backend.models.sql_models as db_models
+from backend.db.search import (
+    decode_cursor,
+    document_search_stmt,
+    encode_cursor,
+    fts5_query,
+    project_search_stmt,
+)
+
+
+def create_project(client, name, description="nothing to see"):
+    response = client.post("/projects", json={"name": name, "description": description})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def search(client, q, **params):
+    response = client.get("/projects/search", params={"q": q, **params})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()
+
+
+def test_search_ranks_name_matches_first(authorized_client):
+    in_description = create_project(authorized_client, "Other", "the rocket engine")
+    in_name = create_project(authorized_client, "Rocket launch", "plans")
+    create_project(authorized_client, "Unrelated")
+
+    page = search(authorized_client, "rocket")
+
+    assert [hit["id"] for hit in page["items"]] == [in_name, in_description]
+    assert page["items"][0]["rank"] > page["items"][1]["rank"]
+    assert set(page["items"][0]) >= {"name", "description", "owner_id", "created_at"}
+    assert page["next_cursor"] is None
+
+
+def test_search_stems_and_ands_words(authorized_client):
+    both = create_project(authorized_client, "Launching rockets", "from the moon")
+    create_project(authorized_client, "Rocket", "on earth")
+
+    page = search(authorized_client, "rocket moon")
+
+    assert [hit["id"] for hit in page["items"]] == [both]
+
+
+def test_search_only_accessible_projects(
+    authorized_client, other_authorized_client, test_user
+):
+    mine = create_project(authorized_client, "Secret mine")
+    shared = create_project(other_authorized_client, "Secret shared")
+    create_project(other_authorized_client, "Secret hidden")
+    other_authorized_client.post(
+        f"/projects/{shared}/participants:batch",
+        json={"participants": [{"login": test_user.login}]},
+    )
+
+    page = search(authorized_client, "secret")
+
+    assert {hit["id"] for hit in page["items"]} == {mine, shared}
+
+
+def test_search_keyset_pagination(authorized_client):
+    ids = {create_project(authorized_client, f"Alpha {i}") for i in range(5)}
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = search(authorized_client, "alpha", **params)
+        seen += [hit["id"] for hit in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 5 and set(seen) == ids
+
+
+def test_search_reflects_updates_and_deletes(authorized_client):
+    project_id = create_project(authorized_client, "Before")
+    authorized_client.put(
+        f"/projects/{project_id}", json={"name": "After", "description": "x"}
+    )
+
+    assert search(authorized_client, "before")["items"] == []
+    assert [h["id"] for h in search(authorized_client, "after")["items"]] == [
+        project_id
+    ]
+
+    authorized_client.delete(f"/projects/{project_id}")
+    assert search(authorized_client, "after")["items"] == []
+
+
+def test_search_input_is_not_query_syntax(authorized_client):
+    create_project(authorized_client, "Quote")
+    for q in ['"', "NEAR(", "name:quote", "*", "a OR"]:
+        search(authorized_client, q)
+
+
+def test_search_bad_requests(authorized_client, client):
+    assert authorized_client.get("/projects/search?q=").status_code == 422
+    response = authorized_client.get("/projects/search?q=x&cursor=nope")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/projects/search?q=x").status_code == 401
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(0.25, 7)) == (0.25, 7)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("x", 7))
+
+
+def test_fts5_query_quotes_words():
+    assert fts5_query(' a "b ') == '"a" """b"'
+    assert fts5_query("   ") is None
+
+
+def test_postgres_statement_uses_search_vector():
+    stmt = project_search_stmt("postgresql", 1, "rocket", 21, after=(0.5, 10))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "projects.search_vector @@ websearch_to_tsquery" in sql
+    assert "ts_rank_cd(projects.search_vector" in sql
+    assert "LIMIT" in sql
+
+
+def test_postgres_pages_through_tied_ranks_in_double_precision():
+    # ts_rank_cd is real; compared as such, a cursor rank read back as e.g.
+    # 0.1 never equals the column and the rest of a tied run is lost
+    stmt = project_search_stmt("postgresql", 1, "rocket", 2, after=(0.1, 10))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    ranked = "CAST(ts_rank_cd(projects.search_vector, websearch_to_tsquery("
+
+    assert ranked in sql.split("FROM", 1)[0]
+    assert sql.count(ranked) == 3  # selected, keyset comparison, order
+    assert sql.count("AS FLOAT(53))") == 3
+
+
+def upload(client, project_id, *names):
+    files = [("files", (name, io.BytesIO(b"data"), "text/plain")) for name in names]
+    response = client.post(f"/projects/{project_id}/documents", files=files)
+    assert response.status_code == status.HTTP_201_CREATED
+    return {doc["file_name"]: doc["id"] for doc in response.json()}
+
+
+def search_documents(client, q, **params):
+    response = client.get("/documents/search", params={"q": q, **params})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()
+
+
+def test_document_search_substring(authorized_client, other_authorized_client):
+    mine = create_project(authorized_client, "Mine")
+    theirs = create_project(other_authorized_client, "Theirs")
+    ids = upload(authorized_client, mine, "Report_2024.pdf", "q3-report.docx", "x.txt")
+    upload(other_authorized_client, theirs, "report.pdf")
+
+    page = search_documents(authorized_client, "REPORT")
+
+    hits = page["items"]
+    assert [hit["id"] for hit in hits] == [
+        ids["q3-report.docx"],
+        ids["Report_2024.pdf"],
+    ]
+    assert hits[0]["project_id"] == mine
+    assert hits[0]["download_url"].startswith("https://fake-minio.local/")
+    assert "s3_key" not in hits[0]
+
+
+def test_document_search_treats_wildcards_literally(authorized_client):
+    project_id = create_project(authorized_client, "Mine")
+    ids = upload(authorized_client, project_id, "a_b.txt", "axb.txt", "100%.csv")
+
+    assert [h["id"] for h in search_documents(authorized_client, "a_b")["items"]] == [
+        ids["a_b.txt"]
+    ]
+    assert [h["id"] for h in search_documents(authorized_client, "00%")["items"]] == [
+        ids["100%.csv"]
+    ]
+
+
+def test_document_search_presigns_only_the_page(authorized_client, storage):
+    project_id = create_project(authorized_client, "Mine")
+    upload(authorized_client, project_id, *(f"scan-{i}.png" for i in range(5)))
+    presigned = []
+    original = storage.presign_many
+
+    def recording_presign_many(keys, expires=None):
+        presigned.append(len(keys))
+        return original(keys, expires)
+
+    storage.presign_many = recording_presign_many
+
+    first = search_documents(authorized_client, "scan", limit=2)
+    second = search_documents(
+        authorized_client, "scan", limit=2, cursor=first["next_cursor"]
+    )
+
+    assert presigned == [2, 2]
+    assert not {h["id"] for h in first["items"]} & {h["id"] for h in second["items"]}
+
+
+def test_document_search_reflects_renames(authorized_client, db_session):
+    project_id = create_project(authorized_client, "Mine")
+    doc_id = upload(authorized_client, project_id, "draft.txt")["draft.txt"]
+    document = db_session.get(db_models.Document, doc_id)
+    document.file_name = "final.txt"
+    db_session.flush()
+
+    assert search_documents(authorized_client, "draft")["items"] == []
+    assert search_documents(authorized_client, "final")["items"][0]["id"] == doc_id
+
+
+def test_document_search_short_query(authorized_client):
+    response = authorized_client.get("/documents/search?q=a")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    # below the trigram length, which SQLite could only answer by a full scan
+    response = authorized_client.get("/documents/search?q=ab")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_postgres_document_statement_uses_trigrams():
+    stmt = document_search_stmt("postgresql", 1, "50%_off", 21)
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+
+    assert "documents.file_name ILIKE" in sql and "ESCAPE" in sql
+    assert "<%% documents.file_name" in sql  # % doubled for pyformat
+    assert "word_similarity(" in sql
+    assert "%50\\%\\_off%" in compiled.params.values()
+
+
+def test_postgres_document_ranks_are_compared_in_double_precision():
+    stmt = document_search_stmt("postgresql", 1, "report", 2, after=(0.5, 10))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    ranked = "CAST(word_similarity(%(word_similarity_1)s, documents.file_name)"
+
+    assert ranked in sql.split("FROM", 1)[0]
+    assert sql.count(f"{ranked} AS FLOAT(53))") == 3
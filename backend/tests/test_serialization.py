@@ -0,0 +1,98 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+import backend.models.sql_models as db_models
+from backend.core.responses import FastJSONResponse
+from backend.models.models import DocumentList, ProjectOut
+
+
+def default_encoding(models) -> bytes:
+    """what FastAPI produces for a response_model list"""
+    return JSONResponse(content=jsonable_encoder(models)).body
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        datetime(2025, 1, 1, 10, 0, 0),
+        datetime(2025, 1, 1, 10, 0, 0, 123000),
+        datetime(2025, 1, 1, tzinfo=timezone.utc),
+        datetime(2025, 1, 1, tzinfo=timezone(timedelta(0))),
+        datetime(2025, 1, 1, 1, 2, 3, 5, tzinfo=timezone(timedelta(hours=-3.5))),
+    ],
+)
+def test_fast_json_matches_default_encoding_for_datetimes(value):
+    project = {
+        "name": 'Ünïcode ✓ "quoted" </script>\n\t\x01',
+        "description": "",
+        "id": 1,
+        "owner_id": 2,
+        "created_at": value,
+        "updated_at": value,
+    }
+
+    assert FastJSONResponse([project]).body == default_encoding([ProjectOut(**project)])
+
+
+def test_project_list_is_byte_identical(
+    authorized_client: TestClient, db_session: Session, test_user
+):
+    for name in ["Plain", "Ünïcode ✓", 'Quote " and \\ backslash']:
+        response = authorized_client.post(
+            "/projects", json={"name": name, "description": f"about {name}\n"}
+        )
+        assert response.status_code == 201
+
+    response = authorized_client.get("/projects")
+    assert response.status_code == 200
+
+    projects = (
+        db_session.query(db_models.Project)
+        .filter_by(owner_id=test_user.id)
+        .order_by(db_models.Project.id)
+        .all()
+    )
+    expected = [ProjectOut.model_validate(p) for p in projects]
+    assert response.content == default_encoding(expected)
+
+
+def test_document_list_is_byte_identical(
+    authorized_client: TestClient, db_session: Session
+):
+    project_id = authorized_client.post(
+        "/projects", json={"name": "Docs", "description": "d"}
+    ).json()["id"]
+    files = [
+        ("files", ("résumé.pdf", io.BytesIO(b"a"), "application/pdf")),
+        ("files", ("notes.txt", io.BytesIO(b"b"), "text/plain")),
+    ]
+    assert (
+        authorized_client.post(f"/projects/{project_id}/documents", files=files)
+    ).status_code == 201
+
+    response = authorized_client.get(f"/projects/{project_id}/documents")
+    assert response.status_code == 200
+
+    docs = (
+        db_session.query(db_models.Document)
+        .filter_by(project_id=project_id)
+        .order_by(db_models.Document.created_at.desc())
+        .all()
+    )
+    expected = [
+        DocumentList(
+            id=d.id,
+            file_name=d.file_name,
+            file_type=d.file_type,
+            created_at=d.created_at,
+            download_url=f"https://fake-minio.local/{d.s3_key}?sig",
+        )
+        for d in docs
+    ]
+    assert response.content == default_encoding(expected)
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.routes.projects as projects_routes
+from backend.core.singleflight import SingleFlight
+
+
+def run_concurrently(n: int, target) -> list:
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight(max_keys=10, wait_timeout=5)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return b"body"
+
+    results = run_concurrently(8, lambda: flights.do("k", compute))
+
+    assert results == [b"body"] * 8
+    assert len(calls) == 1
+    assert flights.stats["shared"] == 7
+    assert len(flights) == 0
+
+
+def test_errors_fan_out_and_are_not_remembered():
+    flights = SingleFlight(max_keys=10, wait_timeout=5)
+
+    def fail():
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    results = run_concurrently(4, lambda: flights.do("k", fail))
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flights.do("k", lambda: "fresh") == "fresh"
+
+
+def test_bounded_number_of_keys():
+    flights = SingleFlight(max_keys=1, wait_timeout=5)
+    inner = []
+
+    def outer():
+        inner.append(flights.do("other", lambda: "own"))
+        return "outer"
+
+    assert flights.do("k", outer) == "outer"
+    assert inner == ["own"]
+    assert flights.stats["bypassed"] == 1
+
+
+def test_follower_stops_waiting_for_a_stuck_leader():
+    flights = SingleFlight(max_keys=10, wait_timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flights.do, args=("k", release.wait))
+    leader.start()
+    time.sleep(0.02)
+
+    assert flights.do("k", lambda: "own") == "own"
+    release.set()
+    leader.join()
+
+
+@pytest.fixture
+def recorded_keys(monkeypatch) -> list:
+    keys = []
+    do = projects_routes.document_flights.do
+
+    def recording_do(key, fn):
+        keys.append(key)
+        return do(key, fn)
+
+    monkeypatch.setattr(projects_routes.document_flights, "do", recording_do)
+    return keys
+
+
+def test_callers_are_authorized_before_joining(
+    authorized_client: TestClient,
+    other_authorized_client: TestClient,
+    recorded_keys: list,
+):
+    project_id = authorized_client.post(
+        "/projects", json={"name": "Team", "description": ""}
+    ).json()["id"]
+    url = f"/projects/{project_id}/documents"
+
+    assert other_authorized_client.get(url).status_code == 403
+    assert recorded_keys == []
+
+    assert authorized_client.get(url).status_code == 200
+    route, key_project, role, *_ = recorded_keys[0]
+    assert (route, key_project, role) == ("documents", project_id, "owner")
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+import backend.core.s3_utils as s3_utils
+from backend.core import startup
+from backend.core.s3_utils import S3Store
+from backend.core.storage import MemoryStorage
+from backend.main import app
+
+
+def test_importing_the_app_does_not_load_boto3():
+    code = "import sys, backend.main; print('boto3' in sys.modules)"
+    output = subprocess.check_output(
+        [sys.executable, "-c", code], env=dict(os.environ), text=True
+    )
+    assert output.strip().splitlines()[-1] == "False"
+
+
+def test_client_is_created_once_under_concurrency(monkeypatch):
+    created = []
+    barrier = threading.Barrier(8)
+
+    def create():
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(s3_utils, "create_s3_client", create)
+    store = S3Store()
+    seen = []
+
+    def use():
+        barrier.wait()
+        seen.append(store.client)
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in seen)
+
+
+def test_lifespan_warm_up(monkeypatch):
+    calls = []
+
+    async def warm_up():
+        calls.append("warm")
+
+    monkeypatch.setattr(startup.settings, "STARTUP_WARMUP", True)
+    monkeypatch.setattr(startup, "warm_up", warm_up)
+
+    with TestClient(app) as client:
+        assert calls == ["warm"]
+        assert client.get("/ping").status_code == 200
+
+
+def test_warm_up_survives_unreachable_storage(monkeypatch):
+    class Unreachable(MemoryStorage):
+        async def warm_up(self):
+            raise ConnectionError("no route to host")
+
+    monkeypatch.setattr(startup, "get_storage", Unreachable)
+    asyncio.run(startup.warm_up())
@@ -0,0 +1,121 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from backend.core.fs_storage import FilesystemStorage
+from backend.core.s3_utils import S3Store
+from backend.core.storage import (
+    MemoryStorage,
+    ThreadedS3Storage,
+    create_storage,
+    parse_range,
+)
+from benchmarks.s3_standin import S3StandIn
+
+
+def make_upload(data: bytes, name: str = "a.bin") -> UploadFile:
+    return UploadFile(
+        io.BytesIO(data),
+        filename=name,
+        headers=Headers({"content-type": "application/octet-stream"}),
+    )
+
+
+async def read_all(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.fixture
+def threaded_s3() -> ThreadedS3Storage:
+    store = S3Store()
+    store.client = S3StandIn()
+    return ThreadedS3Storage(store)
+
+
+@pytest.fixture
+def filesystem(tmp_path) -> FilesystemStorage:
+    return FilesystemStorage(str(tmp_path), signing_key="k")
+
+
+@pytest.mark.parametrize("backend", ["memory", "threaded_s3", "filesystem"])
+def test_backend_round_trip(backend, request):
+    storage = (
+        MemoryStorage() if backend == "memory" else request.getfixturevalue(backend)
+    )
+    data = bytes(range(256)) * 1000
+
+    async def scenario():
+        key = await storage.upload(make_upload(data), project_id=7)
+        assert key.startswith("projects/7/uploads/")
+
+        info = await storage.head(key)
+        assert info.size == len(data)
+        assert info.content_type == "application/octet-stream"
+
+        assert await read_all(storage.open_range(key)) == data
+        assert await read_all(storage.open_range(key, "bytes=10-19")) == data[10:20]
+        assert await read_all(storage.open_range(key, "bytes=-5")) == data[-5:]
+
+        other = await storage.upload(make_upload(b"x", "b.bin"), project_id=7)
+        assert await storage.delete_many([key, other]) == []
+        assert await storage.head(key) is None
+        assert await storage.head(other) is None
+
+    asyncio.run(scenario())
+
+
+def test_parse_range():
+    assert parse_range(None, 10) == (0, 10)
+    assert parse_range("bytes=2-", 10) == (2, 10)
+    assert parse_range("bytes=2-4", 10) == (2, 5)
+    assert parse_range("bytes=5-100", 10) == (5, 10)
+    assert parse_range("bytes=-3", 10) == (7, 10)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(RuntimeError):
+        create_storage("tape")
+
+
+def test_routes_use_the_injected_backend(authorized_client: TestClient, storage):
+    project_id = authorized_client.post(
+        "/projects", json={"name": "Stored", "description": "d"}
+    ).json()["id"]
+    files = [
+        ("files", ("one.txt", io.BytesIO(b"1"), "text/plain")),
+        ("files", ("two.txt", io.BytesIO(b"22"), "text/plain")),
+    ]
+    uploaded = authorized_client.post(
+        f"/projects/{project_id}/documents", files=files
+    ).json()
+    assert [storage.objects[d["s3_key"]].data for d in uploaded] == [b"1", b"22"]
+
+    response = authorized_client.delete(f"/documents/{uploaded[0]['id']}")
+    assert response.status_code == 204
+    assert uploaded[0]["s3_key"] not in storage.objects
+
+
+def test_failed_upload_removes_the_other_files(authorized_client: TestClient, storage):
+    project_id = authorized_client.post(
+        "/projects", json={"name": "Stored", "description": "d"}
+    ).json()["id"]
+    upload = storage.upload
+
+    async def flaky_upload(file, project_id):
+        if file.filename == "bad.txt":
+            raise OSError("disk full")
+        return await upload(file, project_id)
+
+    storage.upload = flaky_upload
+    files = [
+        ("files", ("good.txt", io.BytesIO(b"1"), "text/plain")),
+        ("files", ("bad.txt", io.BytesIO(b"2"), "text/plain")),
+    ]
+    response = authorized_client.post(f"/projects/{project_id}/documents", files=files)
+
+    assert response.status_code == 500
+    assert storage.objects == {}
@@ -0,0 +1,181 @@
+import io
+
+import pytest
+from fastapi import status
+from sqlalchemy.dialects import postgresql
+
+from backend.db.changes import MAX_SEQ, changes_stmt, decode_token, encode_token
+
+
+def create_project(client, name="P"):
+    response = client.post("/projects", json={"name": name, "description": "d"})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def upload(client, project_id, *names):
+    files = [("files", (name, io.BytesIO(b"data"), "text/plain")) for name in names]
+    response = client.post(f"/projects/{project_id}/documents", files=files)
+    assert response.status_code == status.HTTP_201_CREATED
+    return [doc["id"] for doc in response.json()]
+
+
+def sync(client, since=None, **params):
+    if since is not None:
+        params["since"] = since
+    response = client.get("/sync", params=params)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()
+
+
+def ids(items):
+    return sorted(item["id"] for item in items)
+
+
+def test_first_sync_returns_everything_then_nothing(authorized_client):
+    project_id = create_project(authorized_client)
+    doc_ids = upload(authorized_client, project_id, "a.txt", "b.txt")
+
+    first = sync(authorized_client)
+
+    assert ids(first["projects"]) == [project_id]
+    assert ids(first["documents"]) == sorted(doc_ids)
+    assert first["documents"][0]["file_name"] == "a.txt"
+    assert first["deleted"] == [] and first["has_more"] is False
+
+    again = sync(authorized_client, first["next_token"])
+    assert again["has_more"] is False
+    assert again["projects"] == again["documents"] == again["deleted"] == []
+    assert again["next_token"] == first["next_token"]
+
+
+def test_sync_returns_only_changes(authorized_client):
+    kept = create_project(authorized_client, "kept")
+    changed = create_project(authorized_client, "changed")
+    upload(authorized_client, kept, "old.txt")
+    token = sync(authorized_client)["next_token"]
+
+    for name in ("renamed", "renamed again"):
+        authorized_client.put(
+            f"/projects/{changed}", json={"name": name, "description": "d"}
+        )
+    new_doc = upload(authorized_client, changed, "new.txt")
+
+    delta = sync(authorized_client, token)
+
+    assert [p["name"] for p in delta["projects"]] == ["renamed again"]
+    assert ids(delta["documents"]) == new_doc
+    assert delta["deleted"] == []
+
+
+def test_deletes_become_tombstones(
+    authorized_client, other_authorized_client, other_user
+):
+    project_id = create_project(authorized_client)
+    doomed = create_project(authorized_client, "doomed")
+    authorized_client.post(f"/projects/{doomed}/invite?user={other_user.login}")
+    doc_id = upload(authorized_client, project_id, "gone.txt")[0]
+    token = sync(authorized_client)["next_token"]
+    other_token = sync(other_authorized_client)["next_token"]
+
+    authorized_client.delete(f"/documents/{doc_id}")
+    authorized_client.delete(f"/projects/{doomed}")
+
+    delta = sync(authorized_client, token)
+    assert sorted(delta["deleted"], key=lambda t: t["entity"]) == [
+        {"entity": "document", "id": doc_id, "project_id": project_id},
+        {"entity": "project", "id": doomed, "project_id": doomed},
+    ]
+    assert delta["documents"] == []
+
+    other_delta = sync(other_authorized_client, other_token)
+    assert other_delta["deleted"] == [
+        {"entity": "project", "id": doomed, "project_id": doomed}
+    ]
+
+
+def test_invite_brings_the_whole_project(
+    authorized_client, other_authorized_client, other_user, third_user
+):
+    project_id = create_project(authorized_client)
+    doc_ids = upload(authorized_client, project_id, "a.txt", "b.txt")
+    authorized_client.post(f"/projects/{project_id}/invite?user={third_user.login}")
+    token = sync(other_authorized_client)["next_token"]
+
+    response = authorized_client.post(
+        f"/projects/{project_id}/participants:batch",
+        json={"participants": [{"login": other_user.login}]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    delta = sync(other_authorized_client, token)
+    assert ids(delta["projects"]) == [project_id]
+    assert ids(delta["documents"]) == sorted(doc_ids)
+    assert sorted(p["login"] for p in delta["participants"]) == sorted(
+        [other_user.login, third_user.login]
+    )
+
+    # the owner only learns about the new participant
+    owner_delta = sync(authorized_client, token)
+    assert [p["login"] for p in owner_delta["participants"]] == [other_user.login]
+
+
+def test_sync_hides_other_users_changes(authorized_client, other_authorized_client):
+    create_project(other_authorized_client, "theirs")
+    mine = create_project(authorized_client, "mine")
+
+    delta = sync(authorized_client)
+    assert ids(delta["projects"]) == [mine]
+
+    # a caught-up token moves past other users' rows as well
+    create_project(other_authorized_client, "theirs too")
+    token = sync(authorized_client, delta["next_token"])["next_token"]
+    assert token != delta["next_token"]
+
+
+def test_sync_pages_through_changes(authorized_client):
+    project_id = create_project(authorized_client)
+    doc_ids = upload(authorized_client, project_id, *(f"{i}.txt" for i in range(5)))
+
+    seen, token, pages = [], None, 0
+    while True:
+        page = sync(authorized_client, token, limit=2)
+        seen += page["documents"]
+        token = page["next_token"]
+        pages += 1
+        if not page["has_more"]:
+            break
+
+    assert pages == 3
+    assert ids(seen) == sorted(doc_ids)
+
+
+@pytest.mark.query_budget(6, max_repeats=1, endpoint="GET /sync")
+def test_sync_queries_do_not_grow_with_changes(authorized_client):
+    project_id = create_project(authorized_client)
+    upload(authorized_client, project_id, *(f"{i}.txt" for i in range(20)))
+    authorized_client.put(
+        f"/projects/{project_id}", json={"name": "x", "description": "y"}
+    )
+
+    assert len(sync(authorized_client)["documents"]) == 20
+
+
+def test_sync_rejects_bad_token(authorized_client, client):
+    response = authorized_client.get("/sync?since=garbage")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/sync").status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_token_round_trip():
+    assert decode_token(encode_token((123, 45))) == (123, 45)
+    assert decode_token(None) == (-1, 0)
+
+
+def test_postgres_feed_stops_at_running_transactions():
+    stmt = changes_stmt(1, (5, 10), (41, MAX_SEQ), 101)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "(change_log.txid, change_log.seq) >" in sql
+    assert "(change_log.txid, change_log.seq) <=" in sql
+    assert "ORDER BY change_log.txid, change_log.seq" in sql
@@ -0,0 +1,313 @@
+"""Offline API benchmark.
+
+Boots the app in-process against SQLite (default) or the Postgres given with
+--database-url, swaps the S3 client for an in-memory stand-in, seeds data and
+drives concurrent load on the hot endpoints. Results are written as JSON so
+runs can be compared between commits with ``python -m benchmarks.compare``.
+Only an empty database is seeded unless --reset is given.
+
+    python -m benchmarks.api_bench --reset --requests 500 --concurrency 16 -o bench.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from benchmarks.generate_data import BENCH_PASSWORD
+
+SCENARIOS = (
+    "login",
+    "list_projects",
+    "list_documents",
+    "upload",
+    "download",
+    "search_documents",
+)
+
+
+def configure_environment(database_url: str) -> None:
+    """settings are read at import time, so this must run before importing backend"""
+    os.environ.setdefault("JWT_KEY", "benchmark-jwt-key")
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("S3_BUCKET_NAME", "bench-bucket")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench-secret")
+    os.environ.setdefault("AWS_S3_ENDPOINT_URL", "http://s3-standin.local:9000")
+    os.environ.setdefault("PUBLIC_S3_HOST", "http://localhost:9005")
+    # a handful of sampled users drive all the load; per-user limits would
+    # turn the benchmark into a rate limiter test
+    os.environ.setdefault("ADMISSION_CONTROL_ENABLED", "false")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    ms = [v * 1000 for v in ordered]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "mean": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "max": round(ms[-1], 3) if ms else 0.0,
+        },
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_fixtures(args) -> dict:
+    """pick the users, projects and documents the load generator will touch"""
+    from backend.core.security import create_access_token
+    from backend.db.apply_schema import SessionLocal
+    import backend.models.sql_models as db_models
+
+    rng = random.Random(args.seed)
+    with SessionLocal() as db:
+        owners = [
+            row[0]
+            for row in db.query(db_models.Project.owner_id)
+            .distinct()
+            .order_by(db_models.Project.owner_id)
+            .limit(args.sample_users * 10)
+        ]
+        owners = rng.sample(owners, min(len(owners), args.sample_users))
+        users = db.query(db_models.User).filter(db_models.User.id.in_(owners)).all()
+
+        fixtures = {
+            "logins": [u.login for u in users],
+            "tokens": {u.id: create_access_token(subject=u.login) for u in users},
+            "projects_by_owner": defaultdict(list),
+            "documents_by_owner": defaultdict(list),
+        }
+        for user in users:
+            project_ids = [
+                row[0]
+                for row in db.query(db_models.Project.id)
+                .filter_by(owner_id=user.id)
+                .limit(100)
+            ]
+            fixtures["projects_by_owner"][user.id] = project_ids
+            fixtures["documents_by_owner"][user.id] = [
+                row[0]
+                for row in db.query(db_models.Document.id)
+                .filter(db_models.Document.project_id.in_(project_ids))
+                .limit(1000)
+            ]
+    return fixtures
+
+
+def build_request(scenario: str, fixtures: dict, rng: random.Random, args):
+    """returns (method, url, kwargs) for one request of the scenario"""
+    owner_id = rng.choice(list(fixtures["tokens"]))
+    headers = {"Authorization": f"Bearer {fixtures['tokens'][owner_id]}"}
+
+    if scenario == "login":
+        login = rng.choice(fixtures["logins"])
+        data = {"username": login, "password": args.password}
+        return "POST", "/login", {"data": data}
+    if scenario == "list_projects":
+        return "GET", "/projects", {"headers": headers}
+    if scenario == "list_documents":
+        project_id = rng.choice(fixtures["projects_by_owner"][owner_id])
+        return "GET", f"/projects/{project_id}/documents", {"headers": headers}
+    if scenario == "upload":
+        project_id = rng.choice(fixtures["projects_by_owner"][owner_id])
+        payload = rng.randbytes(args.upload_size)
+        files = {"files": ("bench.bin", io.BytesIO(payload), "application/pdf")}
+        return (
+            "POST",
+            f"/projects/{project_id}/documents",
+            {"headers": headers, "files": files},
+        )
+    if scenario == "download":
+        doc_ids = fixtures["documents_by_owner"][owner_id]
+        if not doc_ids:
+            return build_request("list_documents", fixtures, rng, args)
+        url = f"/documents/{rng.choice(doc_ids)}/download"
+        return "GET", url, {"headers": headers}
+    if scenario == "search_documents":
+        from benchmarks.generate_data import WORDS
+
+        params = {"q": rng.choice(WORDS)}
+        return "GET", "/documents/search", {"headers": headers, "params": params}
+    raise ValueError(f"unknown scenario {scenario}")
+
+
+async def run_scenario(client, scenario: str, fixtures: dict, args) -> dict:
+    rng = random.Random(f"{args.seed}-{scenario}")
+    latencies: list[float] = []
+    errors = 0
+    remaining = args.requests + args.warmup
+    done = 0
+
+    async def worker():
+        nonlocal remaining, errors, done
+        while remaining > 0:
+            remaining -= 1
+            method, url, kwargs = build_request(scenario, fixtures, rng, args)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - started
+            done += 1
+            if done <= args.warmup:
+                continue
+            if response.status_code >= 400:
+                errors += 1
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def has_users(engine) -> bool:
+    from sqlalchemy import inspect, select
+
+    import backend.models.sql_models as db_models
+
+    if not inspect(engine).has_table(db_models.User.__tablename__):
+        return False
+    with engine.connect() as connection:
+        return connection.scalar(select(db_models.User.id).limit(1)) is not None
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from backend.core.s3_utils import s3_store
+    from backend.db.apply_schema import Base, engine
+    from backend.db.query_counter import add_observer
+    from backend.main import app
+
+    from benchmarks.s3_standin import S3StandIn
+
+    from benchmarks.generate_data import generate
+
+    standin = S3StandIn(presigner=s3_store.client)
+    s3_store.client = standin
+    args.bucket = s3_store.bucket
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        generate(engine, args)
+    elif not args.no_seed:
+        if has_users(engine):
+            # never wipe a database nobody asked to wipe
+            print(
+                "database already holds data: benchmarking it as is "
+                "(--reset drops and reseeds it)",
+                file=sys.stderr,
+            )
+        else:
+            Base.metadata.create_all(bind=engine)
+            generate(engine, args)
+    if args.s3_manifest:
+        standin.load_manifest(args.s3_manifest)
+    fixtures = load_fixtures(args)
+
+    queries = defaultdict(list)
+    add_observer(lambda stats: queries[stats.label].append(stats.count))
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", follow_redirects=False
+    ) as client:
+        for scenario in args.scenarios:
+            queries.clear()
+            results[scenario] = await run_scenario(client, scenario, fixtures, args)
+            counts = [n for per_label in queries.values() for n in per_label]
+            results[scenario]["queries_per_request"] = (
+                round(sum(counts) / len(counts), 2) if counts else 0.0
+            )
+            print(f"{scenario:>15}: {json.dumps(results[scenario])}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "config": {
+                k: v for k, v in vars(args).items() if k not in ("output", "scenarios")
+            },
+        },
+        "endpoints": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="drop every table of --database-url and reseed it; without it "
+        "only an empty database is seeded",
+    )
+    parser.add_argument(
+        "--no-seed",
+        action="store_true",
+        help="benchmark the existing database, e.g. one filled by generate_data",
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=250)
+    parser.add_argument("--participants", type=int, default=750)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--sample-users", type=int, default=20)
+    parser.add_argument("--s3-manifest", help="objects written by generate_data")
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument("--upload-size", type=int, default=64 * 1024)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    configure_environment(args.database_url)
+    report = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare two api_bench result files.
+
+    python -m benchmarks.compare baseline.json candidate.json --max-regression 10
+
+Exits with status 1 when p95 latency or throughput of any endpoint regressed by
+more than --max-regression percent.
+"""
+
+import argparse
+import json
+import sys
+
+
+def pct_change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+
+def compare(baseline: dict, candidate: dict, max_regression: float) -> list[str]:
+    regressions = []
+    header = (
+        f"{'endpoint':>15} {'rps':>18} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}"
+    )
+    print(header)
+    for name, new in candidate["endpoints"].items():
+        old = baseline["endpoints"].get(name)
+        if old is None:
+            print(f"{name:>15} (new)")
+            continue
+        cells = []
+        rps_delta = pct_change(old["throughput_rps"], new["throughput_rps"])
+        cells.append(f"{new['throughput_rps']:>9.1f} {rps_delta:+7.1f}%")
+        for key in ("p50", "p95", "p99"):
+            delta = pct_change(old["latency_ms"][key], new["latency_ms"][key])
+            cells.append(f"{new['latency_ms'][key]:>9.2f} {delta:+7.1f}%")
+        print(f"{name:>15} " + " ".join(cells))
+
+        p95_delta = pct_change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        if p95_delta > max_regression:
+            regressions.append(f"{name}: p95 latency {p95_delta:+.1f}%")
+        if -rps_delta > max_regression:
+            regressions.append(f"{name}: throughput {rps_delta:+.1f}%")
+    return regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-regression", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    with open(args.candidate, encoding="utf-8") as fh:
+        candidate = json.load(fh)
+
+    print(f"baseline {baseline['meta']['commit']} -> {candidate['meta']['commit']}")
+    regressions = compare(baseline, candidate, args.max_regression)
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
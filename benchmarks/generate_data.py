@@ -0,0 +1,346 @@
+"""Bulk synthetic data generator for scale testing.
+
+Writes users, projects, project_participants and documents straight into the
+tables declared in backend.models.sql_models, in large batches: COPY on
+Postgres, executemany on SQLite. Output is fully determined by --seed. Project
+sizes, owners and participants follow power laws, so a few tenants are huge and
+most are small.
+
+    python -m benchmarks.generate_data --database-url postgresql://... \\
+        --users 200000 --projects 1000000 --participants 3000000 \\
+        --documents 10000000 --s3-manifest objects.ndjson
+
+Rows are appended after the current maximum ids, so runs can be stacked.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, text
+
+BENCH_PASSWORD = "BenchPassword1"
+
+FILE_TYPES = [
+    ("pdf", "application/pdf"),
+    ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ("png", "image/png"),
+    ("jpg", "image/jpeg"),
+    ("txt", "text/plain"),
+]
+
+WORDS = (
+    "alpha beta gamma delta roadmap budget launch design review migration "
+    "marketing finance legal hiring audit research platform mobile billing "
+    "analytics onboarding security infra data warehouse customer partner"
+).split()
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SPAN_SECONDS = 365 * 24 * 3600
+
+
+def zipf_cum_weights(n: int, alpha: float, rng: random.Random) -> list[float]:
+    """cumulative weights of n items with power-law popularity, randomly placed"""
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(itertools.accumulate(1.0 / r**alpha for r in ranks))
+
+
+class Writer:
+    """Batches rows for one table and flushes them with the fastest bulk path."""
+
+    def __init__(self, connection, table, columns: list[str], batch_size: int):
+        self.connection = connection
+        self.dialect = connection.dialect.name
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.rows: list[tuple] = []
+        self.written = 0
+
+    def add(self, row: tuple) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        dbapi_conn = self.connection.connection.dbapi_connection
+        cursor = dbapi_conn.cursor()
+        cols = ", ".join(self.columns)
+        if self.dialect == "postgresql":
+            buf = io.StringIO()
+            csv.writer(buf).writerows(self.rows)
+            buf.seek(0)
+            cursor.copy_expert(
+                f"COPY {self.table.name} ({cols}) FROM STDIN WITH (FORMAT csv)", buf
+            )
+        else:
+            placeholders = ", ".join("?" for _ in self.columns)
+            cursor.executemany(
+                f"INSERT INTO {self.table.name} ({cols}) VALUES ({placeholders})",
+                self.rows,
+            )
+        cursor.close()
+        self.connection.commit()
+        self.written += len(self.rows)
+        self.rows.clear()
+
+
+def next_id(connection, table) -> int:
+    return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def reset_sequences(connection, tables) -> None:
+    for table in tables:
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+            )
+        )
+    connection.commit()
+
+
+def timestamp(dialect: str, offset: int) -> str:
+    value = EPOCH + timedelta(seconds=offset)
+    if dialect == "postgresql":
+        return value.isoformat()
+    # the storage format SQLAlchemy uses for DateTime on SQLite
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def log(message: str) -> None:
+    print(message, file=sys.stderr)
+
+
+def generate(engine, args) -> dict:
+    """write the requested number of rows; returns the counts actually written"""
+    from backend.core.security import hash_password
+    import backend.models.sql_models as db_models
+
+    rng = random.Random(args.seed)
+    users_t = db_models.User.__table__
+    projects_t = db_models.Project.__table__
+    participants_t = db_models.ProjectParticipant.__table__
+    documents_t = db_models.Document.__table__
+    counts = {}
+
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+            connection.exec_driver_sql("PRAGMA journal_mode = WAL")
+
+        first_user = next_id(connection, users_t)
+        first_project = next_id(connection, projects_t)
+        first_document = next_id(connection, documents_t)
+        connection.commit()
+
+        # users: one bcrypt hash shared by everyone, hashing millions would take days
+        started = time.perf_counter()
+        hashed = hash_password(args.password)
+        writer = Writer(
+            connection,
+            users_t,
+            ["id", "login", "hashed_password", "created_at", "updated_at"],
+            args.batch_size,
+        )
+        for i in range(args.users):
+            user_id = first_user + i
+            created = timestamp(dialect, rng.randrange(SPAN_SECONDS))
+            writer.add((user_id, f"user_{user_id}", hashed, created, created))
+        writer.flush()
+        counts["users"] = writer.written
+        log(f"users: {writer.written} in {time.perf_counter() - started:.1f}s")
+
+        # projects: owners follow a power law, a few users own thousands of projects
+        started = time.perf_counter()
+        owner_weights = zipf_cum_weights(args.users, 1.1, rng)
+        user_ids = range(first_user, first_user + args.users)
+        owners = array("q")
+        writer = Writer(
+            connection,
+            projects_t,
+            ["id", "name", "description", "owner_id", "created_at", "updated_at"],
+            args.batch_size,
+        )
+        remaining = args.projects
+        while remaining:
+            k = min(remaining, args.batch_size)
+            remaining -= k
+            for owner_id in rng.choices(user_ids, cum_weights=owner_weights, k=k):
+                project_id = first_project + len(owners)
+                owners.append(owner_id)
+                name = " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).title()
+                description = " ".join(rng.choices(WORDS, k=rng.randint(5, 40)))
+                created = timestamp(dialect, rng.randrange(SPAN_SECONDS))
+                writer.add((project_id, name, description, owner_id, created, created))
+        writer.flush()
+        counts["projects"] = writer.written
+        log(f"projects: {writer.written} in {time.perf_counter() - started:.1f}s")
+
+        # participants: per-project counts are long-tailed and a small set of
+        # heavy users shows up in many projects
+        started = time.perf_counter()
+        member_weights = zipf_cum_weights(args.users, 0.9, rng)
+        mean = args.participants / args.projects if args.projects else 0
+        writer = Writer(
+            connection,
+            participants_t,
+            ["user_id", "project_id", "role", "added_at"],
+            args.batch_size,
+        )
+        for offset, owner_id in enumerate(owners):
+            wanted = min(round(mean * rng.paretovariate(1.5) / 3), args.users - 1)
+            if wanted <= 0:
+                continue
+            members = set(rng.choices(user_ids, cum_weights=member_weights, k=wanted))
+            members.discard(owner_id)
+            added = timestamp(dialect, rng.randrange(SPAN_SECONDS))
+            for user_id in sorted(members):
+                writer.add((user_id, first_project + offset, "participant", added))
+        writer.flush()
+        counts["project_participants"] = writer.written
+        log(f"participants: {writer.written} in {time.perf_counter() - started:.1f}s")
+
+        # documents: project sizes follow a power law as well
+        started = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            manifest = None
+            if args.s3_manifest:
+                manifest = stack.enter_context(open(f"{args.s3_manifest}.part", "w"))
+            project_weights = zipf_cum_weights(len(owners), 1.2, rng)
+            project_offsets = range(len(owners))
+            writer = Writer(
+                connection,
+                documents_t,
+                [
+                    "id",
+                    "project_id",
+                    "file_name",
+                    "s3_key",
+                    "file_type",
+                    "created_at",
+                    "updated_at",
+                    "uploader_id",
+                ],
+                args.batch_size,
+            )
+            doc_id = first_document
+            remaining = args.documents if owners else 0
+            while remaining:
+                k = min(remaining, args.batch_size)
+                remaining -= k
+                picks = rng.choices(project_offsets, cum_weights=project_weights, k=k)
+                for offset in picks:
+                    project_id = first_project + offset
+                    ext, content_type = FILE_TYPES[rng.randrange(len(FILE_TYPES))]
+                    file_name = f"{rng.choice(WORDS)}_{doc_id}.{ext}"
+                    s3_key = f"projects/{project_id}/uploads/seed-{doc_id}_{file_name}"
+                    created = timestamp(dialect, rng.randrange(SPAN_SECONDS))
+                    writer.add(
+                        (
+                            doc_id,
+                            project_id,
+                            file_name,
+                            s3_key,
+                            content_type,
+                            created,
+                            created,
+                            owners[offset],
+                        )
+                    )
+                    if manifest:
+                        size = int(rng.paretovariate(1.1) * 20_000)
+                        manifest.write(
+                            json.dumps(
+                                {
+                                    "bucket": args.bucket,
+                                    "key": s3_key,
+                                    "size": size,
+                                    "content_type": content_type,
+                                }
+                            )
+                            + "\n"
+                        )
+                    doc_id += 1
+            writer.flush()
+            if manifest:
+                # only a complete manifest takes the final name
+                manifest.close()
+                os.replace(manifest.name, args.s3_manifest)
+        counts["documents"] = writer.written
+        log(f"documents: {writer.written} in {time.perf_counter() - started:.1f}s")
+
+        if dialect == "postgresql":
+            reset_sequences(connection, [users_t, projects_t, documents_t])
+            connection.execute(
+                text("ANALYZE users, projects, project_participants, documents")
+            )
+        else:
+            connection.exec_driver_sql("ANALYZE")
+        connection.commit()
+
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--projects", type=int, default=50_000)
+    parser.add_argument("--participants", type=int, default=150_000)
+    parser.add_argument("--documents", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument(
+        "--s3-manifest",
+        help="write matching fake objects for the S3 stand-in to this NDJSON file",
+    )
+    parser.add_argument("--bucket", default=os.getenv("S3_BUCKET_NAME", "bench-bucket"))
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="create missing tables from the SQLAlchemy models first",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if not args.database_url:
+        sys.exit("--database-url or DATABASE_URL is required")
+
+    from benchmarks.api_bench import configure_environment
+
+    configure_environment(args.database_url)
+
+    from backend.db.apply_schema import Base, engine
+    import backend.models.sql_models  # noqa: F401 - registers the tables
+
+    if args.create_schema:
+        Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    counts = generate(engine, args)
+    print(
+        f"done in {time.perf_counter() - started:.1f}s: {json.dumps(counts)}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
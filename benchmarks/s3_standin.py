@@ -0,0 +1,146 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+
+@dataclass
+class StoredObject:
+    size: int
+    content_type: Optional[str]
+    body: Optional[bytes] = None  # None for registered placeholder objects
+    last_modified: Optional[datetime] = None
+
+
+def _not_found(key: str, operation: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": f"{key} not found"}}, operation
+    )
+
+
+class S3StandIn:
+    """In-process stand-in for the part of the boto3 S3 client the app uses.
+
+    Objects are kept in memory. Presigning is delegated to a real boto3 client
+    when one is given: botocore signs locally without any network access, so
+    download URLs keep their real CPU cost.
+    """
+
+    def __init__(self, presigner=None):
+        self.presigner = presigner
+        self._objects: dict[tuple[str, str], StoredObject] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        body = Fileobj.read()
+        content_type = (ExtraArgs or {}).get("ContentType")
+        self._store(Bucket, Key, body, content_type)
+
+    def put_object(self, Bucket, Key, Body=b"", ContentType=None, **kwargs):
+        body = Body if isinstance(Body, bytes) else Body.read()
+        self._store(Bucket, Key, body, ContentType)
+        return {"ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def register(self, bucket: str, key: str, size: int, content_type=None) -> None:
+        """add a placeholder object without keeping its bytes in memory"""
+        with self._lock:
+            self._objects[(bucket, key)] = StoredObject(
+                size, content_type, None, datetime.now(timezone.utc)
+            )
+
+    def head_object(self, Bucket, Key, **kwargs):
+        obj = self._get(Bucket, Key, "HeadObject")
+        return {
+            "ContentLength": obj.size,
+            "ContentType": obj.content_type,
+            "LastModified": obj.last_modified,
+        }
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        from backend.core.storage import parse_range
+
+        obj = self._get(Bucket, Key, "GetObject")
+        body = obj.body if obj.body is not None else bytes(obj.size)
+        start, stop = parse_range(Range, obj.size)
+        return {"Body": _Body(body[start:stop]), "ContentLength": stop - start}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self._objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        deleted = []
+        with self._lock:
+            for entry in Delete["Objects"]:
+                self._objects.pop((Bucket, entry["Key"]), None)
+                deleted.append({"Key": entry["Key"]})
+        return {"Deleted": deleted}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600):
+        if self.presigner is not None:
+            return self.presigner.generate_presigned_url(
+                ClientMethod, Params=Params, ExpiresIn=ExpiresIn
+            )
+        return f"http://s3-standin.local/{Params['Bucket']}/{Params['Key']}"
+
+    def save_manifest(self, path: str) -> None:
+        """write object metadata as NDJSON so another process can load it"""
+        with open(path, "w", encoding="utf-8") as fh:
+            for (bucket, key), obj in self._objects.items():
+                record = {
+                    "bucket": bucket,
+                    "key": key,
+                    "size": obj.size,
+                    "content_type": obj.content_type,
+                }
+                fh.write(json.dumps(record) + "\n")
+
+    def load_manifest(self, path: str) -> int:
+        count = 0
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                record = json.loads(line)
+                self.register(
+                    record["bucket"],
+                    record["key"],
+                    record["size"],
+                    record["content_type"],
+                )
+                count += 1
+        return count
+
+    def _store(self, bucket, key, body: bytes, content_type) -> None:
+        with self._lock:
+            self._objects[(bucket, key)] = StoredObject(
+                len(body), content_type, body, datetime.now(timezone.utc)
+            )
+
+    def _get(self, bucket, key, operation) -> StoredObject:
+        obj = self._objects.get((bucket, key))
+        if obj is None:
+            raise _not_found(key, operation)
+        return obj
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        start = self._pos
+        end = len(self._data) if amt is None else start + amt
+        chunk = self._data[start:end]
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,92 @@
+"""Worker cold-start benchmark.
+
+Starts fresh interpreters and measures how long each takes to import the app,
+run its lifespan startup and answer the first /ping, which is what an
+autoscaled worker pays before it can serve.
+
+    python -m benchmarks.startup_bench --runs 10 --warmup -o startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.api_bench import configure_environment, git_commit
+
+# runs inside the child interpreter; prints one JSON line with the timings
+PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+
+async def main():
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://s") as c:
+            response = await c.get("/ping")
+            response.raise_for_status()
+    return ready, time.perf_counter()
+
+ready, first_response = asyncio.run(main())
+print(json.dumps({
+    "import_s": imported - started,
+    "ready_s": ready - started,
+    "first_response_s": first_response - started,
+    "boto3_loaded": "boto3" in sys.modules,
+}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE], env=env, text=True, stderr=subprocess.DEVNULL
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs: list[dict]) -> dict:
+    summary = {}
+    for key in ("import_s", "ready_s", "first_response_s"):
+        values = sorted(run[key] for run in runs)
+        summary[key] = {
+            "median": round(statistics.median(values), 4),
+            "max": round(values[-1], 4),
+        }
+    summary["boto3_loaded"] = any(run["boto3_loaded"] for run in runs)
+    return summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="enable STARTUP_WARMUP, the database and S3 must be reachable",
+    )
+    parser.add_argument("-o", "--output")
+    args = parser.parse_args(argv)
+
+    configure_environment(args.database_url)
+    env = dict(os.environ, STARTUP_WARMUP=str(args.warmup).lower())
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    report = {
+        "meta": {"commit": git_commit(), "runs": args.runs, "warmup": args.warmup},
+        "startup": summarize(runs),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
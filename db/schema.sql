@@ -1,19 +1,24 @@
 CREATE TABLE users (
-	id BIGSERIAL PRIMARY KEY,
-	login VARCHAR(55) UNIQUE NOT NULL,
+	id SERIAL PRIMARY KEY,
+	login VARCHAR(255) NOT NULL,
 	hashed_password VARCHAR(255) NOT NULL,
+	-- tokens issued before this are refused (alembic revision b6f2d8a4c9e3)
+	tokens_valid_after TIMESTAMPTZ,
 	created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
 	updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+CREATE UNIQUE INDEX ix_users_login ON users(login);
+
 
 CREATE TABLE projects (
-	id BIGSERIAL PRIMARY KEY,
-	name VARCHAR(100) NOT NULL,
-	description TEXT,
-	owner_id BIGINT NOT NULL,
+	id SERIAL PRIMARY KEY,
+	name VARCHAR(255) NOT NULL,
+	description TEXT NOT NULL,
+	owner_id INTEGER NOT NULL,
 	created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
 	updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+	version INTEGER NOT NULL DEFAULT 1,
 
 	CONSTRAINT fk_owner
 		FOREIGN KEY(owner_id)
@@ -22,14 +27,14 @@ CREATE TABLE projects (
 );
 
 CREATE TABLE documents(
-	id BIGSERIAL PRIMARY KEY,
-	project_id BIGINT NOT NULL,
-	file_name VARCHAR(255),
+	id SERIAL PRIMARY KEY,
+	project_id INTEGER NOT NULL,
+	file_name VARCHAR(255) NOT NULL,
 	s3_key VARCHAR(1024) UNIQUE NOT NULL,
 	file_type VARCHAR(50),
 	created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
 	updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    uploader_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
+	uploader_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
 
 	CONSTRAINT fk_project
 		FOREIGN KEY (project_id)
@@ -38,9 +43,9 @@ CREATE TABLE documents(
 );
 
 CREATE TABLE project_participants (
-	user_id BIGINT NOT NULL,
-	project_id BIGINT NOT NULL,
-	role VARCHAR(50) NOT NULL DEFAULT 'participant',
+	user_id INTEGER NOT NULL,
+	project_id INTEGER NOT NULL,
+	role VARCHAR(50) NOT NULL,
 	added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
 
 	PRIMARY KEY (user_id, project_id),
@@ -56,10 +61,11 @@ CREATE TABLE project_participants (
 
 );
 
-CREATE INDEX idx_projects_owner_id ON projects(owner_id);
-CREATE INDEX idx_documents_projects_id ON documents(project_id);
-CREATE INDEX idx_project_participants_user_id ON project_participants(user_id);
-CREATE INDEX idx_project_participants_project_id ON project_participants(project_id);
+-- the primary key of project_participants serves lookups by user
+-- (alembic revision f7c3a9e1b4d6 for the composite ones)
+CREATE INDEX ix_projects_owner_id ON projects(owner_id);
+CREATE INDEX ix_documents_project_created ON documents(project_id, created_at, id);
+CREATE INDEX ix_project_participants_project_user ON project_participants(project_id, user_id);
 
 CREATE OR REPLACE FUNCTION trigger_set_timestamp()
 RETURNS TRIGGER AS $$
@@ -82,4 +88,47 @@ EXECUTE FUNCTION trigger_set_timestamp();
 CREATE TRIGGER set_timestamp_documents
 BEFORE UPDATE ON documents
 FOR EACH ROW
-EXECUTE FUNCTION trigger_set_timestamp();
\ No newline at end of file
+EXECUTE FUNCTION trigger_set_timestamp();
+
+-- full-text search over projects (alembic revision c41d8e7a9f20)
+ALTER TABLE projects ADD COLUMN search_vector tsvector
+GENERATED ALWAYS AS (
+	setweight(to_tsvector('english', coalesce(name, '')), 'A')
+	|| setweight(to_tsvector('english', coalesce(description, '')), 'B')
+) STORED;
+
+CREATE INDEX ix_projects_search_vector ON projects USING GIN (search_vector);
+
+-- substring and fuzzy filename search (alembic revision d5a0f3c2b8e1)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX ix_documents_file_name_trgm ON documents USING GIN (file_name gin_trgm_ops);
+
+-- feed behind GET /sync (alembic revision e8b2c6d4a1f3)
+CREATE TABLE change_log (
+	seq BIGSERIAL PRIMARY KEY,
+	txid BIGINT NOT NULL,
+	project_id BIGINT NOT NULL,
+	user_id BIGINT,
+	entity VARCHAR(20) NOT NULL,
+	entity_id BIGINT NOT NULL,
+	op VARCHAR(10) NOT NULL,
+	changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX ix_change_log_project_position ON change_log(project_id, txid, seq);
+CREATE INDEX ix_change_log_user_position ON change_log(user_id, txid, seq)
+	WHERE user_id IS NOT NULL;
+
+-- tokens revoked before they expire (alembic revision a3e9c5d7b2f1)
+CREATE TABLE revoked_tokens (
+	seq BIGSERIAL PRIMARY KEY,
+	txid BIGINT NOT NULL,
+	jti VARCHAR(32) NOT NULL UNIQUE,
+	user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+	expires_at TIMESTAMPTZ NOT NULL,
+	revoked_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX ix_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+CREATE INDEX ix_revoked_tokens_position ON revoked_tokens(txid, seq);